@@ -0,0 +1,294 @@
+import gzip
+import threading
+import time
+
+from database import crud
+from utils import dump_tree_json
+
+
+# Уровень сжатия закэшированного JSON дерева: сжатие выполняется один раз
+# на версию каталога, поэтому можно позволить себе уровень выше, чем у GZipMiddleware
+TREE_GZIP_LEVEL = 6
+
+# Уже сжатые форматы (xlsx — zip-архив, в PDF сжаты потоки страниц):
+# middleware не сжимает их повторно
+COMPRESSED_MEDIA_TYPES = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/pdf",
+)
+
+
+class TreeCache:
+    """
+    Кэш построенного дерева деталей и его JSON-представления в памяти процесса.
+
+    Кэш привязан к версии каталога, хранящейся в базе данных: при каждом
+    обращении считывается текущая версия (один запрос по первичному ключу),
+    и если она изменилась, дерево перестраивается. Поэтому несколько процессов
+    uvicorn не отдают устаревшие данные после записи в другом процессе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._version = None
+        self._tree = None
+        self._body = None
+        self._compressed = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuild_seconds_total = 0.0
+        self.rebuild_seconds_last = 0.0
+
+    def get(self, db):
+        """
+        Получить дерево деталей актуальной версии.
+
+        Одновременные промахи в разных потоках перестраивают дерево один раз.
+
+        Аргументы:
+            db (Session): Сессия базы данных.
+
+        Возвращает:
+            tuple: (версия каталога, дерево в формате crud.get_tree, JSON в байтах).
+        """
+        version = crud.get_version(db)
+        with self._rebuild_lock:
+            cached = self.lookup(version)
+            if cached is not None:
+                return (version, *cached)
+
+            started = time.perf_counter()
+            tree = crud.get_tree(db)
+            body = self.store(version, tree, started)
+            return version, tree, body
+
+    def lookup(self, version):
+        """
+        Найти в кэше дерево указанной версии и учесть попадание или промах.
+
+        Аргументы:
+            version (int): Версия каталога.
+
+        Возвращает:
+            tuple | None: (дерево, JSON в байтах) или None при промахе.
+        """
+        with self._lock:
+            if self._version == version:
+                self.hits += 1
+                return self._tree, self._body
+            self.misses += 1
+            return None
+
+    def store(self, version, tree, started):
+        """
+        Сохранить перестроенное дерево и его JSON-представление.
+
+        Аргументы:
+            version (int): Версия каталога, для которой построено дерево.
+            tree (List[dict]): Дерево в формате crud.get_tree.
+            started (float): Момент начала перестроения по time.perf_counter().
+
+        Возвращает:
+            bytes: JSON-представление дерева.
+        """
+        body = dump_tree_json(tree)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.rebuild_seconds_last = elapsed
+            self.rebuild_seconds_total += elapsed
+            self._version, self._tree, self._body = version, tree, body
+            self._compressed = None
+        return body
+
+    def compressed(self, version, body):
+        """
+        Получить JSON дерева, сжатый gzip, сжимая его не чаще раза на версию.
+
+        Сжатие выполняется вне блокировки, чтобы не задерживать lookup();
+        результат сохраняется, только если в кэше всё ещё эта же версия.
+
+        Аргументы:
+            version (int): Версия каталога.
+            body (bytes): JSON-представление дерева этой версии.
+
+        Возвращает:
+            bytes: Сжатое JSON-представление.
+        """
+        with self._lock:
+            if self._version == version and self._compressed is not None:
+                return self._compressed
+
+        compressed = gzip.compress(body, compresslevel=TREE_GZIP_LEVEL, mtime=0)
+        with self._lock:
+            if self._version == version:
+                self._compressed = compressed
+        return compressed
+
+    def stats(self):
+        """
+        Получить метрики кэша.
+
+        Возвращает:
+            dict: Версия закэшированного дерева, количество попаданий и промахов,
+                  время последней и суммарное время перестроений в секундах.
+        """
+        return {
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuild_seconds_last": self.rebuild_seconds_last,
+            "rebuild_seconds_total": self.rebuild_seconds_total,
+        }
+
+
+class ExportCache:
+    """
+    Кэш сгенерированных файлов экспорта, привязанный к версии каталога.
+
+    Для каждого формата хранится только файл последней версии каталога:
+    после любой записи версия увеличивается, и файл формируется заново.
+    Общая блокировка удерживается только на время поиска и сохранения;
+    формирование файла выполняется под отдельной блокировкой формата и версии,
+    поэтому долгое построение PDF не задерживает попадания в кэш и построение
+    других форматов, а одновременные промахи по одному ключу строят файл один раз.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._files = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, version, build):
+        """
+        Получить файл экспорта для версии каталога, сформировав его при промахе.
+
+        Аргументы:
+            kind (str): Формат экспорта.
+            version (int): Версия каталога.
+            build (Callable[[], bytes]): Функция формирования файла.
+
+        Возвращает:
+            bytes: Содержимое файла.
+        """
+        content = self.lookup(kind, version)
+        if content is not None:
+            return content
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault((kind, version), threading.Lock())
+        try:
+            with build_lock:
+                content = self.lookup(kind, version)
+                if content is not None:
+                    return content
+                content = build()
+                with self._lock:
+                    self.misses += 1
+                    self._files[kind] = (version, content)
+                return content
+        finally:
+            with self._lock:
+                if self._build_locks.get((kind, version)) is build_lock:
+                    del self._build_locks[(kind, version)]
+
+    def lookup(self, kind, version):
+        """
+        Найти в кэше файл формата для версии каталога и учесть попадание.
+
+        Аргументы:
+            kind (str): Формат экспорта.
+            version (int): Версия каталога.
+
+        Возвращает:
+            bytes | None: Содержимое файла или None при промахе.
+        """
+        with self._lock:
+            cached = self._files.get(kind)
+            if cached and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+            return None
+
+
+tree_cache = TreeCache()
+export_cache = ExportCache()
+
+
+def make_etag(kind, version):
+    """
+    Построить строгий ETag для представления каталога указанной версии.
+
+    Аргументы:
+        kind (str): Тип представления ("tree", "excel", "pdf").
+        version (int): Версия каталога.
+
+    Возвращает:
+        str: Значение заголовка ETag.
+    """
+    return f'"{kind}-{version}"'
+
+
+def representation_etag(request, kind, version, media_type="application/json"):
+    """
+    Построить ETag представления, которое сжимается для клиентов с gzip.
+
+    Сжатое и несжатое представления — разные байты, поэтому их строгие ETag
+    различаются суффиксом "-gzip"; для уже сжатых форматов суффикс не нужен.
+
+    Аргументы:
+        request (Request): Входящий запрос.
+        kind (str): Тип представления.
+        version (int): Версия каталога.
+        media_type (str): Тип содержимого ответа.
+
+    Возвращает:
+        str: Значение заголовка ETag.
+    """
+    if accepts_gzip(request) and is_compressible(media_type):
+        kind = f"{kind}-gzip"
+    return make_etag(kind, version)
+
+
+def is_compressible(media_type):
+    """
+    Проверить, имеет ли смысл сжимать ответ с указанным типом содержимого.
+    """
+    return not media_type.startswith(COMPRESSED_MEDIA_TYPES)
+
+
+def is_not_modified(request, etag):
+    """
+    Проверить, совпадает ли заголовок If-None-Match запроса с ETag.
+
+    Аргументы:
+        request (Request): Входящий запрос.
+        etag (str): Текущий ETag представления.
+
+    Возвращает:
+        bool: True, если клиенту можно ответить 304 Not Modified.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def accepts_gzip(request):
+    """
+    Проверить, принимает ли клиент ответ, сжатый gzip.
+
+    Аргументы:
+        request (Request): Входящий запрос.
+
+    Возвращает:
+        bool: True, если gzip указан в Accept-Encoding без q=0.
+    """
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
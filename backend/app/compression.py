@@ -0,0 +1,74 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.requests import Request
+
+from cache import accepts_gzip, is_compressible
+
+
+class SkipCompressedMixin:
+    """
+    Не сжимать ответы уже сжатых форматов (COMPRESSED_MEDIA_TYPES).
+    """
+
+    async def send_with_compression(self, message):
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.content_type_is_excluded = self.content_type_is_excluded or not is_compressible(content_type)
+
+
+class SkipCompressedGZipResponder(SkipCompressedMixin, GZipResponder):
+    pass
+
+
+class SkipCompressedIdentityResponder(SkipCompressedMixin, IdentityResponder):
+    pass
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware для ответов приложения.
+
+    В отличие от стандартного middleware:
+    - файлы xlsx и PDF не сжимаются повторно: это тратит процессор
+      и почти не уменьшает размер;
+    - решение о сжатии принимается так же, как в cache.accepts_gzip, поэтому
+      совпадает с ETag, выбранным обработчиком (cache.representation_etag);
+    - ко всем ответам сжимаемых форматов, включая короткие и 304 Not Modified,
+      добавляется ровно один Vary: Accept-Encoding, так как их ETag
+      и содержимое зависят от Accept-Encoding.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if accepts_gzip(Request(scope)):
+            responder = SkipCompressedGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        else:
+            responder = SkipCompressedIdentityResponder(self.app, self.minimum_size)
+
+        async def send_with_vary(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if is_compressible(headers.get("content-type", "")):
+                    add_vary(headers, "Accept-Encoding")
+            await send(message)
+
+        await responder(scope, receive, send_with_vary)
+
+
+def add_vary(headers, name):
+    """
+    Добавить поле в заголовок Vary, не повторяя уже перечисленные поля.
+
+    :param headers: Изменяемые заголовки ответа
+    :param name: Имя заголовка запроса
+    """
+    fields = [field.strip() for field in headers.get("vary", "").split(",") if field.strip()]
+    unique = []
+    for field in fields + [name]:
+        if field.lower() not in (existing.lower() for existing in unique):
+            unique.append(field)
+    headers["vary"] = ", ".join(unique)
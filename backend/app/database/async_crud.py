@@ -0,0 +1,63 @@
+import asyncio
+import contextlib
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .async_database import async_engine
+from schemas import PartCreate, PartUpdate
+
+
+# Асинхронные версии функций crud. Логика операций не дублируется: синхронные
+# функции выполняются через AsyncSession.run_sync, при этом обращения к базе
+# идут через асинхронный драйвер и не занимают потоки пула Starlette.
+
+# SQLite допускает одного писателя. Транзакция записи выполняется через await
+# и удерживает блокировку базы, пока цикл событий обслуживает другие запросы,
+# поэтому одновременные записи ждали её дольше busy_timeout и завершались
+# ошибкой "database is locked". Записи процесса выполняются по очереди,
+# ожидая в цикле событий, а не на блокировке SQLite.
+_write_lock = (
+    asyncio.Lock() if async_engine is not None and async_engine.dialect.name == "sqlite"
+    else contextlib.nullcontext()
+)
+
+
+async def get_version(db: AsyncSession):
+    return await db.run_sync(crud.get_version)
+
+
+async def create_part(db: AsyncSession, new_part: PartCreate):
+    async with _write_lock:
+        return await db.run_sync(crud.create_part, new_part)
+
+
+async def edit_part(db: AsyncSession, part_id: int, part_update: PartUpdate):
+    async with _write_lock:
+        return await db.run_sync(crud.edit_part, part_id, part_update)
+
+
+async def delete_part(db: AsyncSession, part_id: int):
+    async with _write_lock:
+        return await db.run_sync(crud.delete_part, part_id)
+
+
+async def delete_subtree(db: AsyncSession, part_id: int):
+    async with _write_lock:
+        return await db.run_sync(crud.delete_subtree, part_id)
+
+
+async def get_tree(db: AsyncSession, version: int = None):
+    return await db.run_sync(crud.get_tree, version)
+
+
+async def get_subtree(db: AsyncSession, part_id: int, depth: int = None):
+    return await db.run_sync(crud.get_subtree, part_id, depth)
+
+
+async def get_children_page(db: AsyncSession, parent_id: int = None, limit: int = 100, cursor: str = None):
+    return await db.run_sync(crud.get_children_page, parent_id, limit, cursor)
+
+
+async def get_changes(db: AsyncSession, since: int, until: int = None):
+    return await db.run_sync(crud.get_changes, since, until)
@@ -0,0 +1,20 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .database import ASYNC_DATABASE, DATABASE_URL, configure_sqlite, engine_options
+
+
+# Асинхронный движок создаётся, только если DATABASE_URL указывает
+# асинхронный драйвер (sqlite+aiosqlite, postgresql+asyncpg).
+async_engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL)) if ASYNC_DATABASE else None
+if async_engine is not None:
+    configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+) if ASYNC_DATABASE else None
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,20 +1,264 @@
-from sqlalchemy import func
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from sqlalchemy import DateTime, column, func, insert, literal, or_, select, table, text
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from utils import update_parent_prices
+from utils import ROLLUP_MODE, update_ancestors_prices, update_parent_prices
 from enums import DeletePartResult
-from .models import Part
+from .models import NAME_INDEX, CatalogVersion, Part, PartChange, PartLink, Snapshot, normalize_name
+from .hierarchy import assign_path, descendants_filter, make_path, move_subtree, path_to_ids
+from .history import parts_at
+from .links import close_links, dag_ancestors, has_links, linked_subtrees, links_at, load_links
+from .search import SEARCH_TABLE, has_search_index, make_match_query, search_tokens
+from .migrations import NAME_INDEX_MISSING, database_key
 from schemas import PartCreate, PartUpdate
 
 
 
+def get_version(db: Session):
+    """
+    Получить текущую версию каталога.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        int: Номер версии, увеличивающийся при каждом изменении деталей.
+    """
+    return db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+
+
+def bump_version(db: Session):
+    """
+    Увеличить версию каталога в рамках текущей транзакции.
+
+    Вызывается в начале каждой операции записи, чтобы кэши всех процессов
+    увидели изменение сразу после фиксации транзакции. Новая версия также
+    сохраняется в db.info["catalog_version"], чтобы после операции можно было
+    получить список изменений именно этой версии.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        int: Новая версия каталога.
+    """
+    db.query(CatalogVersion).filter(CatalogVersion.id == 1).update(
+        {CatalogVersion.version: CatalogVersion.version + 1},
+        synchronize_session=False,
+    )
+    version = get_version(db)
+    db.info["catalog_version"] = version
+    return version
+
+
+def record_changes(db: Session, updated_ids=(), deleted_ids=()):
+    """
+    Записать изменённые и удалённые детали в журнал изменений текущей версии.
+
+    Аргументы:
+        db (Session): Сессия базы данных, в которой уже вызван bump_version.
+        updated_ids (Iterable[int]): Созданные или изменённые детали.
+        deleted_ids (Iterable[int]): Удалённые детали.
+    """
+    version = db.info["catalog_version"]
+    values = [
+        {"version": version, "part_id": part_id, "deleted": False}
+        for part_id in dict.fromkeys(updated_ids)
+    ] + [
+        {"version": version, "part_id": part_id, "deleted": True}
+        for part_id in dict.fromkeys(deleted_ids)
+    ]
+    if values:
+        db.execute(insert(PartChange), values)
+
+
+def get_changes(db: Session, since: int, until: int = None):
+    """
+    Получить детали, изменённые после указанной версии каталога.
+
+    По журналу изменений определяется последнее состояние каждой затронутой
+    детали: удалённые возвращаются списком id, остальные — текущими данными
+    без вложенных элементов. Объём работы пропорционален числу изменений,
+    а не размеру каталога.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        since (int): Версия, уже известная клиенту.
+        until (int | None): Последняя включаемая версия (по умолчанию текущая).
+
+    Возвращает:
+        dict: {"version": версия, до которой включены изменения,
+               "updated": список деталей в формате get_tree без дочерних элементов,
+               "deleted": список id удалённых деталей}.
+    """
+    if until is None:
+        until = get_version(db)
+    changes = db.query(PartChange.part_id, PartChange.deleted).filter(
+        PartChange.version > since,
+        PartChange.version <= until,
+    ).order_by(PartChange.id).all()
+
+    latest = {}
+    for part_id, deleted in changes:
+        latest.pop(part_id, None)
+        latest[part_id] = deleted
+
+    updated_ids = [part_id for part_id, deleted in latest.items() if not deleted]
+    rows = db.query(
+        Part.id,
+        Part.name,
+        Part.unit_price,
+        Part.quantity,
+        Part.parent_id,
+    ).filter(Part.id.in_(updated_ids)).order_by(Part.id).all() if updated_ids else []
+
+    found_ids = {row.id for row in rows}
+    deleted_ids = [
+        part_id for part_id, deleted in latest.items()
+        if deleted or part_id not in found_ids
+    ]
+    children_counts = count_children(db, list(found_ids))
+    return {
+        "version": until,
+        "updated": [build_tree(row, {}, children_counts) for row in rows],
+        "deleted": deleted_ids,
+    }
+
+
+def create_snapshot(db: Session, name: str = None):
+    """
+    Создать снимок текущей версии каталога.
+
+    Данные деталей не копируются: снимок только закрепляет номер версии,
+    а её состояние восстанавливается по истории деталей.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        name (str | None): Название снимка.
+
+    Возвращает:
+        Snapshot: Созданный снимок.
+    """
+    try:
+        snapshot = Snapshot(name=name, version=get_version(db))
+        db.add(snapshot)
+        db.commit()
+        db.refresh(snapshot)
+        return snapshot
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def get_snapshots(db: Session):
+    """
+    Получить все снимки каталога.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        List[Snapshot]: Снимки в порядке создания.
+    """
+    return db.query(Snapshot).order_by(Snapshot.id).all()
+
+
+def resolve_version(db: Session, snapshot_id: int = None, as_of: datetime = None):
+    """
+    Определить версию каталога по снимку или по моменту времени.
+
+    Момент времени сопоставляется с последней версией, изменения которой
+    записаны в журнал не позже него (поиск по индексу created_at).
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        snapshot_id (int | None): Идентификатор снимка.
+        as_of (datetime | None): Момент времени (без часового пояса — UTC).
+
+    Возвращает:
+        int: Версия каталога.
+        DeletePartResult.NOT_FOUND: Если снимок не найден.
+        DeletePartResult.UNAVAILABLE: Если история на эту версию не сохранилась.
+    """
+    if snapshot_id is not None:
+        version = db.query(Snapshot.version).filter(Snapshot.id == snapshot_id).scalar()
+        if version is None:
+            return DeletePartResult.NOT_FOUND
+    else:
+        if as_of.tzinfo is not None:
+            as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+        version = db.query(PartChange.version).filter(
+            PartChange.created_at <= as_of
+        ).order_by(PartChange.created_at.desc(), PartChange.version.desc()).limit(1).scalar() or 0
+
+    if version == get_version(db):
+        return version
+    history_from = db.query(CatalogVersion.history_from).filter(CatalogVersion.id == 1).scalar()
+    if history_from is None or version < history_from:
+        return DeletePartResult.UNAVAILABLE
+    return version
+
+
+def has_name_index(db: Session):
+    """
+    Проверить, создан ли в базе уникальный индекс наименований NAME_INDEX.
+
+    Миграция не создаёт индекс, пока в базе есть дубликаты наименований;
+    до их устранения уникальность проверяется запросом name_taken. Наличие
+    индекса определяется один раз при запуске (migrations.create_missing_indexes),
+    поэтому проверка не обращается к базе.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        bool: True, если индекс есть.
+    """
+    return database_key(db.get_bind().url) not in NAME_INDEX_MISSING
+
+
+def name_taken(db: Session, parent_id, name_normalized, part_id=None):
+    """
+    Проверить запросом, есть ли у родителя другая деталь с таким наименованием.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        parent_id (int | None): Родитель детали.
+        name_normalized (str): Нормализованное наименование.
+        part_id (int | None): Проверяемая деталь, которая не считается дубликатом.
+
+    Возвращает:
+        bool: True, если наименование уже занято.
+    """
+    query = db.query(Part.id).filter(
+        func.coalesce(Part.parent_id, 0) == (parent_id or 0),
+        Part.name_normalized == name_normalized,
+    )
+    if part_id is not None:
+        query = query.filter(Part.id != part_id)
+    return query.first() is not None
+
+
+def is_name_conflict(error: IntegrityError):
+    """
+    Проверить, что ошибка вызвана нарушением уникальности наименования (NAME_INDEX),
+    а не другим ограничением базы.
+    """
+    return NAME_INDEX in str(error.orig)
+
+
 def create_part(db: Session, new_part: PartCreate):
     """
     Создать новую деталь в базе данных.
 
-    Проверяет, существует ли уже деталь с таким же именем (без учёта регистра)
-    и тем же parent_id. Иначе создаёт новую запись, сохраняет её в базе, обновляет цены родительской детали (если она есть) и возвращает объект созданной детали.
+    Создаёт новую запись, сохраняет её в базе, обновляет цены родительской детали (если она есть) и возвращает объект созданной детали.
+    Уникальность имени (без учёта регистра) среди деталей с тем же parent_id обеспечивается
+    уникальным индексом по нормализованному наименованию, поэтому одновременные вставки
+    не могут создать дубликат. Если индекс не создан из-за дубликатов в базе,
+    наименование проверяется отдельным запросом.
 
     Аргументы:
         db (Session): Сессия базы данных для выполнения операций.
@@ -24,24 +268,25 @@ def create_part(db: Session, new_part: PartCreate):
         Part: Объект созданной детали при успешном сохранении.
         DeletePartResult.EXISTS: Если деталь с тем же именем и parent_id уже имеется в базе.
     """
-
-    existing_part = db.query(Part).filter(
-        func.lower(Part.name) == new_part.name.lower(),
-        Part.parent_id == new_part.parent_id
-    ).first()
-    if existing_part:
-        return DeletePartResult.EXISTS 
-    
     try: 
         db_part = Part(**new_part.model_dump())
         db_part.name = db_part.name.capitalize()
+        if not has_name_index(db) and name_taken(db, db_part.parent_id, db_part.name_normalized):
+            return DeletePartResult.EXISTS
+        bump_version(db)
         db.add(db_part)
+        db.flush()
+        assign_path(db, db_part)
+        ancestor_ids = update_parent_prices(db, db_part.parent_id)
+        record_changes(db, [db_part.id, *ancestor_ids])
         db.commit()
         db.refresh(db_part)
-
-        if db_part.parent_id:
-            update_parent_prices(db, db_part.parent_id)
         return db_part
+    except IntegrityError as e:
+        db.rollback()
+        if not is_name_conflict(e):
+            raise e
+        return DeletePartResult.EXISTS
     except SQLAlchemyError as e:
         db.rollback()  
         raise e  
@@ -55,6 +300,8 @@ def edit_part(db: Session, part_id: int, part_update: PartUpdate):
 
     Проверяет наличие детали. Если деталь найдена — обновляет указанные поля,
     сохраняет изменения и обновляет цены родительской детали (если нужно).
+    При смене parent_id пересчитываются цены и прежней, и новой цепочки предков.
+    Все изменения фиксируются одной транзакцией.
 
     Аргументы:
         db (Session): Сессия базы данных.
@@ -63,30 +310,187 @@ def edit_part(db: Session, part_id: int, part_update: PartUpdate):
 
     Возвращает:
         Part: Обновлённый объект детали.
-        None: Если деталь не найдена.
+        DeletePartResult.NOT_FOUND: Если деталь или новый родитель не найдены.
+        DeletePartResult.EXISTS: Если у родителя уже есть деталь с таким именем.
+        DeletePartResult.CYCLE: Если новый родитель находится в поддереве детали.
     """
     existing_part = db.query(Part).get(part_id)
     if not existing_part:
         return DeletePartResult.NOT_FOUND
 
-    for field, value in part_update.model_dump(exclude_unset=True).items():
-        setattr(existing_part, field, value)
-
-    if part_update.name is not None:
-        existing_part.name = existing_part.name.capitalize()
-
     try:
+        bump_version(db)
+        parent_ids = apply_part_update(db, existing_part, part_update.model_dump(exclude_unset=True))
+        if isinstance(parent_ids, DeletePartResult):
+            db.rollback()
+            return parent_ids
+        changed_ids = [existing_part.id, *update_ancestors_prices(db, parent_ids)]
+        record_changes(db, changed_ids)
         db.commit()
         db.refresh(existing_part)
-
-        if existing_part.parent_id:
-            update_parent_prices(db, existing_part.parent_id)
         return existing_part
+    except IntegrityError as e:
+        db.rollback()
+        if not is_name_conflict(e):
+            raise e
+        return DeletePartResult.EXISTS
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def edit_parts(db: Session, part_updates):
+    """
+    Отредактировать несколько деталей одной транзакцией.
+
+    Изменения применяются по порядку, поэтому проверка циклов для каждого
+    перемещения учитывает уже выполненные перемещения пакета. Цены предков
+    всех затронутых родителей пересчитываются один раз в конце.
+    При любой ошибке транзакция откатывается целиком.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_updates (List[PartBatchUpdate]): Изменения с идентификаторами деталей.
+
+    Возвращает:
+        tuple: (DeletePartResult.SUCCESS, None) при успехе либо
+               (NOT_FOUND | EXISTS | CYCLE, id детали, на которой произошла ошибка).
+    """
+    part_ids = {part_update.id for part_update in part_updates}
+    parts = {part.id: part for part in db.query(Part).filter(Part.id.in_(part_ids))}
+
+    part_id = None
+    try:
+        bump_version(db)
+        parent_ids = set()
+        for part_update in part_updates:
+            part_id = part_update.id
+            part = parts.get(part_id)
+            if part is None:
+                db.rollback()
+                return DeletePartResult.NOT_FOUND, part_id
+
+            old_parent_id = part.parent_id
+            result = apply_part_update(db, part, part_update.model_dump(exclude_unset=True, exclude={"id"}))
+            if isinstance(result, DeletePartResult):
+                db.rollback()
+                return result, part_id
+            if part.parent_id != old_parent_id:
+                # пути перемещённого поддерева переписаны в обход сессии
+                for loaded_part in parts.values():
+                    db.expire(loaded_part, ["path", "depth"])
+            parent_ids |= result
+
+        changed_ids = [*parts, *update_ancestors_prices(db, parent_ids)]
+        record_changes(db, changed_ids)
+        db.commit()
+        return DeletePartResult.SUCCESS, None
+    except IntegrityError as e:
+        db.rollback()
+        if not is_name_conflict(e):
+            raise e
+        return DeletePartResult.EXISTS, part_id
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
 
+def move_part(db: Session, part_id: int, parent_id: int = None):
+    """
+    Переместить деталь вместе с поддеревом под нового родителя.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор перемещаемой детали.
+        parent_id (int | None): Новый родитель (None — перенести в корень).
+
+    Возвращает:
+        Part | DeletePartResult: То же, что edit_part.
+    """
+    return edit_part(db, part_id, PartUpdate(parent_id=parent_id))
+
+
+def apply_part_update(db: Session, part, values):
+    """
+    Применить изменения к детали без пересчёта цен и фиксации транзакции.
+
+    При смене parent_id проверяет, что новый родитель существует и не лежит
+    в поддереве детали, и переписывает пути всего поддерева. Без уникального
+    индекса наименований занятость нового имени у родителя проверяется запросом.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part (Part): Изменяемая деталь.
+        values (dict): Новые значения полей.
+
+    Возвращает:
+        set[int]: id родителей, цены предков которых нужно пересчитать.
+        DeletePartResult.NOT_FOUND | DeletePartResult.CYCLE: При недопустимом родителе.
+        DeletePartResult.EXISTS: Если наименование занято (проверка без индекса).
+    """
+    old_parent_id = part.parent_id
+    old_path = part.path
+    moved = "parent_id" in values and values["parent_id"] != old_parent_id
+    if moved:
+        result = check_new_parent(db, old_path, values["parent_id"])
+        if result is not None:
+            return result
+
+    for field, value in values.items():
+        setattr(part, field, value)
+    if values.get("name") is not None:
+        part.name = part.name.capitalize()
+    if (
+        (moved or values.get("name") is not None)
+        and not has_name_index(db)
+        and name_taken(db, part.parent_id, part.name_normalized, part.id)
+    ):
+        return DeletePartResult.EXISTS
+
+    db.flush()
+    # сборки, использующие деталь по ссылке, пересчитываются вместе с родителем
+    link_parent_ids = {
+        parent_id for (parent_id,) in db.query(PartLink.parent_id).filter(
+            links_at(), PartLink.child_id == part.id
+        )
+    }
+    if not moved:
+        return {part.parent_id, *link_parent_ids}
+    move_subtree(db, part, old_path)
+    return {old_parent_id, part.parent_id, *link_parent_ids}
+
+
+def check_new_parent(db: Session, path, parent_id):
+    """
+    Проверить, что деталь с путём path можно перенести под parent_id.
+
+    Перенос внутрь собственного поддерева (в том числе под саму деталь)
+    создал бы цикл, поэтому путь нового родителя не должен начинаться
+    с пути детали. Если в каталоге есть общие узлы, новый родитель также
+    не должен входить в деталь по ссылкам.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        path (str): Текущий материализованный путь детали.
+        parent_id (int | None): Новый родитель.
+
+    Возвращает:
+        None: Если перенос допустим.
+        DeletePartResult.NOT_FOUND: Если новый родитель не найден.
+        DeletePartResult.CYCLE: Если новый родитель находится в поддереве детали.
+    """
+    if parent_id is None:
+        return None
+    parent_path = db.query(Part.path).filter(Part.id == parent_id).scalar()
+    if parent_path is None:
+        return DeletePartResult.NOT_FOUND
+    if parent_path.startswith(path):
+        return DeletePartResult.CYCLE
+    if has_links(db) and path_to_ids(path)[-1] in dag_ancestors(db, [parent_id]):
+        return DeletePartResult.CYCLE
+    return None
+
+
 
 def delete_part(db: Session, part_id: int):
     """
@@ -94,7 +498,8 @@ def delete_part(db: Session, part_id: int):
 
     Проверяет наличие детали и наличие дочерних элементов.
     Если деталь существует и не имеет дочерних элементов, удаляет её из базы данных
-    и обновляет цену родительской детали.
+    и обновляет цену родительской детали. Ссылки на деталь как на общий узел
+    закрываются, цены использовавших её сборок пересчитываются.
 
     Аргументы:
         db (Session): Сессия базы данных.
@@ -110,62 +515,796 @@ def delete_part(db: Session, part_id: int):
         return DeletePartResult.HAS_CHILDREN
 
     try:
+        version = bump_version(db)
         parent_id = existing_part.parent_id
+        link_parent_ids = close_links(db, [part_id], version)
         db.delete(existing_part)
+        db.flush()
+        ancestor_ids = update_ancestors_prices(db, [parent_id, *link_parent_ids])
+        record_changes(db, [*link_parent_ids, *ancestor_ids], [part_id])
         db.commit()
-        if parent_id:
-            update_parent_prices(db, parent_id)
         return DeletePartResult.SUCCESS
     except SQLAlchemyError as e:
         db.rollback()  
         raise e
 
 
-def get_tree(db: Session):
+def delete_subtree(db: Session, part_id: int):
+    """
+    Удалить деталь вместе со всеми потомками.
+
+    Поддерево удаляется одним DELETE по диапазону индекса пути, а записи
+    журнала изменений добавляются одним INSERT ... SELECT по тому же диапазону,
+    поэтому детали поддерева не загружаются в сессию и расход памяти
+    не зависит от размера поддерева. Цены предков пересчитываются один раз;
+    ссылки, в которых участвуют детали поддерева, закрываются, а цены сборок
+    вне поддерева, использовавших их, пересчитываются тем же проходом.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор корня удаляемого поддерева.
+
+    Возвращает:
+        int: Количество удалённых деталей.
+        DeletePartResult.NOT_FOUND: Если деталь не найдена.
+    """
+    existing = db.query(Part.path, Part.parent_id).filter(Part.id == part_id).first()
+    if existing is None:
+        return DeletePartResult.NOT_FOUND
+
+    try:
+        version = bump_version(db)
+        subtree = descendants_filter(existing.path, include_self=True)
+        link_parent_ids = close_links(db, select(Part.id).where(subtree), version)
+        db.execute(
+            insert(PartChange).from_select(
+                ["version", "part_id", "deleted", "created_at"],
+                select(
+                    literal(version),
+                    Part.id,
+                    literal(True),
+                    literal(datetime.now(timezone.utc), DateTime(timezone=True)),
+                ).where(subtree),
+            )
+        )
+        removed = db.query(Part).filter(subtree).delete(synchronize_session=False)
+        ancestor_ids = update_ancestors_prices(db, [existing.parent_id, *link_parent_ids])
+        record_changes(db, [*link_parent_ids, *ancestor_ids])
+        db.commit()
+        return removed
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def create_link(db: Session, part_id: int, parent_id: int, quantity: int = 1):
+    """
+    Добавить деталь в сборку как общий узел.
+
+    Деталь остаётся в своём месте дерева и дополнительно входит в сборку
+    parent_id со своим количеством; её поддерево не копируется. Цены сборки
+    и всех сборок, зависящих от неё, пересчитываются.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор общей детали.
+        parent_id (int): Идентификатор сборки.
+        quantity (int): Количество детали в единице сборки.
+
+    Возвращает:
+        PartLink: Созданная ссылка.
+        DeletePartResult.NOT_FOUND: Если деталь или сборка не найдены.
+        DeletePartResult.EXISTS: Если деталь уже входит в сборку.
+        DeletePartResult.CYCLE: Если сборка сама входит в деталь.
+    """
+    part = db.query(Part.id, Part.parent_id).filter(Part.id == part_id).first()
+    if part is None or db.query(Part.id).filter(Part.id == parent_id).first() is None:
+        return DeletePartResult.NOT_FOUND
+    if part.parent_id == parent_id:
+        return DeletePartResult.EXISTS
+    if part_id in dag_ancestors(db, [parent_id]):
+        return DeletePartResult.CYCLE
+
+    try:
+        version = bump_version(db)
+        link = PartLink(parent_id=parent_id, child_id=part_id, quantity=quantity, valid_from=version)
+        db.add(link)
+        db.flush()
+        ancestor_ids = update_ancestors_prices(db, [parent_id])
+        record_changes(db, [parent_id, *ancestor_ids])
+        db.commit()
+        db.refresh(link)
+        return link
+    except IntegrityError:
+        db.rollback()
+        return DeletePartResult.EXISTS
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def delete_link(db: Session, part_id: int, parent_id: int):
+    """
+    Исключить общую деталь из сборки.
+
+    Ссылка закрывается текущей версией каталога и остаётся доступной
+    для чтения снимков.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор общей детали.
+        parent_id (int): Идентификатор сборки.
+
+    Возвращает:
+        DeletePartResult.SUCCESS | DeletePartResult.NOT_FOUND
+    """
+    link = db.query(PartLink).filter(
+        links_at(), PartLink.parent_id == parent_id, PartLink.child_id == part_id
+    ).first()
+    if link is None:
+        return DeletePartResult.NOT_FOUND
+
+    try:
+        link.valid_to = bump_version(db)
+        db.flush()
+        ancestor_ids = update_ancestors_prices(db, [parent_id])
+        record_changes(db, [parent_id, *ancestor_ids])
+        db.commit()
+        return DeletePartResult.SUCCESS
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def where_used(db: Session, part_id: int):
+    """
+    Найти сборки, в которые входит деталь.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор детали.
+
+    Возвращает:
+        dict: {"id", "name",
+               "usages": непосредственные сборки ({"id", "name", "quantity", "shared"},
+                         shared=True для вхождений по ссылке),
+               "assemblies": все сборки, включающие деталь прямо или косвенно
+                             ({"id", "name"}, по возрастанию id)}.
+        DeletePartResult.NOT_FOUND: Если деталь не найдена.
+    """
+    part = db.query(Part.id, Part.name, Part.quantity, Part.parent_id).filter(Part.id == part_id).first()
+    if part is None:
+        return DeletePartResult.NOT_FOUND
+
+    links = db.query(PartLink.parent_id, PartLink.quantity).filter(
+        links_at(), PartLink.child_id == part_id
+    ).order_by(PartLink.parent_id).all()
+    assembly_ids = dag_ancestors(db, [part_id]) - {part_id}
+    names = dict(
+        db.query(Part.id, Part.name).filter(Part.id.in_(assembly_ids)).all()
+    ) if assembly_ids else {}
+
+    usages = [(part.parent_id, part.quantity, False)] if part.parent_id is not None else []
+    usages += [(parent_id, quantity, True) for parent_id, quantity in links]
+    return {
+        "id": part.id,
+        "name": part.name,
+        "usages": [
+            {"id": parent_id, "name": names.get(parent_id), "quantity": quantity, "shared": shared}
+            for parent_id, quantity, shared in usages
+        ],
+        "assemblies": [
+            {"id": assembly_id, "name": names[assembly_id]} for assembly_id in sorted(assembly_ids)
+        ],
+    }
+
+
+BULK_INSERT_BATCH_SIZE = 1000
+
+
+def bulk_create_parts(db: Session, parts, parent_id: int = None, skip_errors: bool = False):
+    """
+    Создать пакет деталей одной транзакцией.
+
+    Принимает вложенное дерево деталей и/или плоский список строк, в которых
+    родитель указан временным идентификатором (parent_ref) или иерархическим
+    номером (number). Сначала проверяется весь пакет: пустые наименования,
+    неизвестные и циклические ссылки на родителя, повторяющиеся (без учёта регистра)
+    наименования среди дочерних элементов одного родителя. Затем корректные строки
+    вставляются пакетами через executemany с заранее назначенными id и путями,
+    цены сборок внутри пакета суммируются в памяти (при ROLLUP_MODE=weighted —
+    с умножением на количество), а цены предков parent_id пересчитываются
+    один раз в конце.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        parts (List[PartImport]): Импортируемые детали.
+        parent_id (int | None): Существующая деталь, к которой подключаются корневые строки пакета.
+        skip_errors (bool): Вставить корректные строки, пропустив ошибочные.
+            Иначе при любой ошибке ничего не вставляется.
+
+    Возвращает:
+        dict: {"created": количество созданных деталей, "errors": список ошибок по строкам}.
+        DeletePartResult.NOT_FOUND: Если деталь parent_id не найдена.
+    """
+    parent_path = None
+    if parent_id is not None:
+        parent_path = db.query(Part.path).filter(Part.id == parent_id).scalar()
+        if parent_path is None:
+            return DeletePartResult.NOT_FOUND
+
+    rows, parents = flatten_import(parts)
+    errors = validate_import(db, rows, parents, parent_id)
+
+    error_list = [
+        {"row": index + 1, "name": rows[index].name, "detail": detail}
+        for index, detail in sorted(errors.items())
+    ]
+    if error_list and not skip_errors:
+        return {"created": 0, "errors": error_list}
+
+    valid = [index for index in import_order(parents) if index not in errors]
+    if not valid:
+        return {"created": 0, "errors": error_list}
+
+    weighted = ROLLUP_MODE == "weighted"
+    prices = {index: rows[index].unit_price for index in valid}
+    has_children = set()
+    for index in reversed(valid):
+        parent_index = parents[index]
+        if parent_index is None:
+            continue
+        if parent_index not in has_children:
+            has_children.add(parent_index)
+            prices[parent_index] = 0
+        prices[parent_index] += prices[index] * rows[index].quantity if weighted else prices[index]
+
+    try:
+        bump_version(db)
+        next_id = (db.query(func.max(Part.id)).scalar() or 0) + 1
+        ids, paths, values = {}, {}, []
+        created_at = datetime.now(timezone.utc)
+        for index in valid:
+            parent_index = parents[index]
+            row_parent_id = ids[parent_index] if parent_index is not None else parent_id
+            row_parent_path = paths[parent_index] if parent_index is not None else parent_path
+
+            ids[index] = next_id
+            paths[index] = make_path(row_parent_path, next_id)
+            next_id += 1
+            values.append({
+                "id": ids[index],
+                "name": rows[index].name.capitalize(),
+                "name_normalized": normalize_name(rows[index].name.capitalize()),
+                "unit_price": prices[index],
+                "quantity": rows[index].quantity,
+                "parent_id": row_parent_id,
+                "path": paths[index],
+                "depth": len(path_to_ids(paths[index])) - 1,
+                "created_at": created_at,
+            })
+
+        for start in range(0, len(values), BULK_INSERT_BATCH_SIZE):
+            db.execute(insert(Part), values[start:start + BULK_INSERT_BATCH_SIZE])
+        if db.get_bind().dialect.name == "postgresql":
+            # id назначены явно, поэтому последовательность нужно сдвинуть вручную
+            db.execute(text("SELECT setval(pg_get_serial_sequence('parts', 'id'), (SELECT MAX(id) FROM parts))"))
+
+        ancestor_ids = update_parent_prices(db, parent_id)
+        record_changes(db, [*ids.values(), *ancestor_ids])
+        db.commit()
+        return {"created": len(values), "errors": error_list}
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def flatten_import(parts):
+    """
+    Развернуть импортируемое дерево в плоский список строк.
+
+    Аргументы:
+        parts (List[PartImport]): Импортируемые детали.
+
+    Возвращает:
+        tuple: (список строк в порядке обхода в глубину,
+                список индексов родительских строк внутри пакета или None).
+    """
+    rows, parents = [], []
+    stack = [(part, None) for part in reversed(parts)]
+    while stack:
+        part, parent_index = stack.pop()
+        index = len(rows)
+        rows.append(part)
+        parents.append(parent_index)
+        stack.extend((child, index) for child in reversed(part.children))
+
+    refs, numbers = {}, {}
+    for index, row in enumerate(rows):
+        if row.ref is not None:
+            refs.setdefault(row.ref, index)
+        if row.number is not None:
+            numbers.setdefault(row.number.strip("."), index)
+
+    for index, row in enumerate(rows):
+        if parents[index] is not None:
+            continue
+        if row.parent_ref is not None:
+            parents[index] = refs.get(row.parent_ref, -1)
+        elif row.number is not None and "." in row.number.strip("."):
+            parent_number = row.number.strip(".").rsplit(".", 1)[0]
+            parents[index] = numbers.get(parent_number, -1)
+    return rows, parents
+
+
+def import_order(parents):
+    """
+    Упорядочить строки пакета так, чтобы родители шли раньше дочерних.
+
+    Аргументы:
+        parents (List[int | None]): Индексы родительских строк.
+
+    Возвращает:
+        List[int]: Индексы строк, упорядоченные по глубине; строки с циклическими
+                   или неизвестными ссылками на родителя не включаются.
+    """
+    depths = [None] * len(parents)
+    for index in range(len(parents)):
+        chain = []
+        current = index
+        while current is not None and current >= 0 and depths[current] is None and current not in chain:
+            chain.append(current)
+            current = parents[current]
+
+        if current is None:
+            depth = -1
+        elif current >= 0 and depths[current] is not None and depths[current] >= 0:
+            depth = depths[current]
+        else:
+            for chain_index in chain:
+                depths[chain_index] = -1
+            continue
+
+        for chain_index in reversed(chain):
+            depth += 1
+            depths[chain_index] = depth
+    ordered = [index for index, depth in enumerate(depths) if depth >= 0]
+    return sorted(ordered, key=lambda index: depths[index])
+
+
+def validate_import(db: Session, rows, parents, parent_id):
+    """
+    Проверить импортируемый пакет целиком.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        rows (List[PartImport]): Строки пакета.
+        parents (List[int | None]): Индексы родительских строк.
+        parent_id (int | None): Существующая деталь, к которой подключается пакет.
+
+    Возвращает:
+        dict: Индекс строки → описание ошибки.
+    """
+    errors = {}
+    refs, numbers = set(), set()
+    for index, row in enumerate(rows):
+        if not row.name.strip():
+            errors[index] = "Наименование не может быть пустым"
+        elif row.ref is not None and row.ref in refs:
+            errors[index] = "Повторяющийся временный идентификатор"
+        elif row.number is not None and row.number.strip(".") in numbers:
+            errors[index] = "Повторяющийся иерархический номер"
+        elif parents[index] == -1:
+            errors[index] = "Родительская строка не найдена в пакете"
+        if row.ref is not None:
+            refs.add(row.ref)
+        if row.number is not None:
+            numbers.add(row.number.strip("."))
+
+    ordered = import_order(parents)
+    for index in sorted(set(range(len(rows))) - set(ordered)):
+        if index in errors:
+            continue
+        seen = set()
+        current = index
+        while current is not None and current >= 0 and current not in seen:
+            seen.add(current)
+            current = parents[current]
+        errors[index] = "Ошибка в родительской строке" if current == -1 else "Циклическая ссылка на родителя"
+
+    existing_names = {
+        name for (name,) in db.query(Part.name_normalized).filter(Part.parent_id == parent_id)
+    }
+    sibling_names = {}
+    for index in ordered:
+        parent_index = parents[index]
+        if parent_index is not None and parent_index in errors:
+            errors.setdefault(index, "Ошибка в родительской строке")
+            continue
+        if index in errors:
+            continue
+
+        name = normalize_name(rows[index].name)
+        siblings = sibling_names.setdefault(parent_index, set())
+        if name in siblings or (parent_index is None and name in existing_names):
+            errors[index] = "Деталь с таким именем уже существует"
+            continue
+        siblings.add(name)
+    return errors
+
+
+SEARCH_DEFAULT_LIMIT = 20
+
+
+def search_parts(db: Session, query: str, limit: int = SEARCH_DEFAULT_LIMIT):
+    """
+    Найти детали по наименованию.
+
+    В SQLite используется полнотекстовый индекс parts_fts: каждое слово запроса
+    должно совпасть с началом слова наименования без учёта регистра (включая
+    кириллицу), результаты упорядочиваются по релевантности (bm25). Без индекса
+    выполняется сканирование нормализованных наименований по LIKE.
+    Для каждой найденной детали возвращается цепочка предков от корня, чтобы
+    клиент мог сразу раскрыть дерево до неё; предки всех результатов
+    загружаются одним запросом.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        query (str): Строка поиска.
+        limit (int): Максимальное количество результатов.
+
+    Возвращает:
+        List[dict]: Детали в формате get_tree без дочерних элементов
+                    с дополнительным списком ancestors ({"id", "name"}).
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+
+    columns = (Part.id, Part.name, Part.unit_price, Part.quantity, Part.parent_id, Part.path)
+    if has_search_index(db):
+        fts = table(SEARCH_TABLE, column("rowid"), column("rank"), column(SEARCH_TABLE))
+        rows = db.query(*columns).join(fts, fts.c.rowid == Part.id).filter(
+            fts.c[SEARCH_TABLE].op("MATCH")(make_match_query(tokens))
+        ).order_by(fts.c.rank, Part.id).limit(limit).all()
+    else:
+        conditions = [Part.name_normalized.contains(token, autoescape=True) for token in tokens]
+        rows = db.query(*columns).filter(*conditions).order_by(Part.id).limit(limit).all()
+
+    ancestor_ids = {ancestor_id for row in rows for ancestor_id in path_to_ids(row.path)[:-1]}
+    names = dict(
+        db.query(Part.id, Part.name).filter(Part.id.in_(ancestor_ids)).all()
+    ) if ancestor_ids else {}
+
+    children_counts = count_children(db, [row.id for row in rows])
+    results = []
+    for row in rows:
+        result = build_tree(row, {}, children_counts)
+        result["ancestors"] = [
+            {"id": ancestor_id, "name": names.get(ancestor_id)}
+            for ancestor_id in path_to_ids(row.path)[:-1]
+        ]
+        results.append(result)
+    return results
+
+
+def get_tree(db: Session, version: int = None):
     """
     Получить все детали в виде дерева.
 
-    Извлекает все корневые детали (без родителя) и строит
-    иерархическую структуру с дочерними элементами.
+    Извлекает всю таблицу деталей одним запросом и собирает
+    иерархическую структуру в памяти по индексу parent_id → дочерние элементы.
+    Общие узлы разворачиваются: деталь со своим поддеревом выводится
+    в каждой использующей её сборке (с признаком shared и количеством ссылки),
+    поэтому клиенты, ожидающие дерево, продолжают работать без изменений.
 
     Аргументы:
         db (Session): Сессия базы данных.
+        version (int | None): Прошлая версия каталога (None — текущее состояние).
 
     Возвращает:
         List[dict]: Список деталей в виде дерева.
     """
+    source = Part.__table__ if version is None else parts_at(version)
     try: 
-        root_parts = db.query(Part).filter(Part.parent_id == None).all()
-        return [build_tree(existing_part) for existing_part in root_parts]
+        rows = db.query(
+            source.c.id,
+            source.c.name,
+            source.c.unit_price,
+            source.c.quantity,
+            source.c.parent_id,
+        ).order_by(source.c.id).all()
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
+    children_index = build_children_index(rows)
+    add_linked_rows(children_index, rows, load_links(db, version))
+    return [build_tree(row, children_index) for row in children_index.get(None, [])]
+
+
+def get_subtree(db: Session, part_id: int, depth: int = None):
+    """
+    Получить поддерево детали, ограниченное по глубине.
+
+    Деталь и её потомки до заданной относительной глубины извлекаются одним
+    запросом по индексу пути. Для деталей на границе глубины количество дочерних
+    элементов подсчитывается отдельным агрегатным запросом, чтобы клиент мог
+    показать возможность раскрытия без загрузки следующего уровня. Общие узлы
+    разворачиваются так же, как в get_tree.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор корня поддерева.
+        depth (int | None): Максимальная глубина относительно корня (None — без ограничения).
+
+    Возвращает:
+        dict: Поддерево в том же формате, что и элементы get_tree.
+        DeletePartResult.NOT_FOUND: Если деталь не найдена.
+    """
+    root = db.query(Part.path, Part.depth).filter(Part.id == part_id).first()
+    if root is None:
+        return DeletePartResult.NOT_FOUND
+
+    columns = (Part.id, Part.name, Part.unit_price, Part.quantity, Part.parent_id, Part.depth)
+    if has_links(db):
+        # глубина вхождений по ссылкам не совпадает с глубиной в дереве, поэтому
+        # загружаются поддеревья всех общих узлов, а глубина ограничивается при сборке
+        paths = linked_subtrees(db, root.path)
+        rows = db.query(*columns).filter(
+            or_(*(descendants_filter(path, include_self=True) for path in paths))
+        ).order_by(Part.id).all()
+        children_index = build_children_index(rows)
+        add_linked_rows(children_index, rows, load_links(db))
+        root_row = next(row for row in rows if row.id == part_id)
+        return build_tree(root_row, children_index, max_depth=depth)
+
+    query = db.query(*columns).filter(descendants_filter(root.path, include_self=True))
+    if depth is not None:
+        query = query.filter(Part.depth <= root.depth + depth)
+    rows = query.order_by(Part.id).all()
+
+    children_counts = None
+    if depth is not None:
+        boundary_ids = [row.id for row in rows if row.depth == root.depth + depth]
+        children_counts = count_children(db, boundary_ids)
+
+    children_index = build_children_index(rows)
+    root_row = next(row for row in rows if row.id == part_id)
+    return build_tree(root_row, children_index, children_counts)
+
+
+# Префикс курсора страниц, перешедших к вхождениям общих деталей
+SHARED_CURSOR_PREFIX = "s"
+CHILDREN_CURSOR_PATTERN = rf"^{SHARED_CURSOR_PREFIX}?\d+$"
+
+
+def get_children_page(db: Session, parent_id: int = None, limit: int = 100, cursor: str = None):
+    """
+    Получить страницу непосредственных дочерних деталей.
+
+    Используется keyset-пагинация по id: следующая страница запрашивается
+    с cursor, равным id последней детали предыдущей страницы. После дочерних
+    деталей сборки идут вхождения общих деталей по ссылкам, упорядоченные
+    по id детали; курсор этой части начинается с SHARED_CURSOR_PREFIX
+    ("s" и id последнего вхождения, "s0" — с начала вхождений). Страница
+    никогда не превышает limit. Для каждой детали возвращается количество
+    её дочерних элементов, сами дочерние элементы не загружаются.
 
-def build_tree(existing_part):
+    Аргументы:
+        db (Session): Сессия базы данных.
+        parent_id (int | None): Идентификатор родителя (None — корневые детали).
+        limit (int): Максимальное количество деталей на странице.
+        cursor (str | None): Курсор предыдущей страницы (CHILDREN_CURSOR_PATTERN).
+
+    Возвращает:
+        tuple: (список деталей в формате get_tree без дочерних элементов,
+                курсор следующей страницы или None).
     """
-    Построить рекурсивное дерево детали.
+    shared = cursor is not None and cursor.startswith(SHARED_CURSOR_PREFIX)
+    after = int(cursor.removeprefix(SHARED_CURSOR_PREFIX)) if cursor is not None else None
+
+    rows = []
+    if not shared:
+        query = db.query(
+            Part.id,
+            Part.name,
+            Part.unit_price,
+            Part.quantity,
+            Part.parent_id,
+        ).filter(Part.parent_id == parent_id)
+        if after is not None:
+            query = query.filter(Part.id > after)
+        rows = query.order_by(Part.id).limit(limit + 1).all()
+        after = 0
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1].id)
+    elif parent_id is not None:
+        # вхождения общих узлов следуют за дочерними деталями
+        remaining = limit - len(rows)
+        shared_rows = linked_rows(db, parent_id, after, remaining + 1)
+        if len(shared_rows) > remaining:
+            shared_rows = shared_rows[:remaining]
+            last_id = shared_rows[-1].id if shared_rows else after
+            next_cursor = f"{SHARED_CURSOR_PREFIX}{last_id}"
+        rows += shared_rows
 
-    Рекурсивно собирает данные о детали и её дочерних элементах
-    в виде вложенного словаря.
+    children_counts = count_children(db, [row.id for row in rows])
+    return [build_tree(row, {}, children_counts) for row in rows], next_cursor
+
+
+def count_children(db: Session, part_ids):
+    """
+    Подсчитать количество дочерних элементов для набора деталей одним запросом.
 
     Аргументы:
-        existing_part (Part): Экземпляр детали.
+        db (Session): Сессия базы данных.
+        part_ids (List[int]): Идентификаторы деталей.
+
+    Возвращает:
+        dict: Словарь id детали → количество дочерних элементов.
+    """
+    if not part_ids:
+        return {}
+    counts = db.query(Part.parent_id, func.count(Part.id)).filter(
+        Part.parent_id.in_(part_ids)
+    ).group_by(Part.parent_id).all()
+    link_counts = db.query(PartLink.parent_id, func.count(PartLink.id)).filter(
+        links_at(), PartLink.parent_id.in_(part_ids)
+    ).group_by(PartLink.parent_id).all()
+    children_counts = dict.fromkeys(part_ids, 0)
+    for parent_id, count in counts + link_counts:
+        children_counts[parent_id] += count
+    return children_counts
+
+
+def linked_rows(db: Session, parent_id: int, after: int = 0, limit: int = None):
+    """
+    Строки вхождений общих деталей в сборку в формате get_children_page.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        parent_id (int): Идентификатор сборки.
+        after (int): id детали, после которого начинается выборка.
+        limit (int | None): Максимальное количество строк.
+
+    Возвращает:
+        List: Строки деталей с количеством ссылки и признаком shared, по возрастанию id.
+    """
+    rows = db.query(
+        Part.id,
+        Part.name,
+        Part.unit_price,
+        PartLink.quantity,
+    ).join(PartLink, PartLink.child_id == Part.id).filter(
+        links_at(), PartLink.parent_id == parent_id, Part.id > after
+    ).order_by(Part.id).limit(limit).all()
+    return [shared_row(row, parent_id, row.quantity) for row in rows]
+
+
+def add_linked_rows(children_index, rows, links):
+    """
+    Добавить в индекс дочерних элементов вхождения общих деталей.
+
+    Вхождение — копия строки детали с parent_id и количеством ссылки
+    и признаком shared; поддерево детали берётся из того же индекса,
+    поэтому загружается и хранится один раз.
+
+    Аргументы:
+        children_index (dict): Индекс build_children_index.
+        rows (Iterable): Строки деталей выборки.
+        links (dict): Ссылки load_links (parent_id → [(child_id, quantity)]).
+    """
+    if not links:
+        return
+    rows_by_id = {row.id: row for row in rows}
+    for parent_id, children in links.items():
+        if parent_id not in rows_by_id:
+            continue
+        for child_id, quantity in children:
+            row = rows_by_id.get(child_id)
+            if row is not None:
+                children_index[parent_id].append(shared_row(row, parent_id, quantity))
+
+
+def shared_row(row, parent_id, quantity):
+    """
+    Строка вхождения общей детали в сборку parent_id с количеством ссылки.
+    """
+    return SimpleNamespace(
+        id=row.id,
+        name=row.name,
+        unit_price=row.unit_price,
+        quantity=quantity,
+        parent_id=parent_id,
+        shared=True,
+    )
+
+
+def build_children_index(rows):
+    """
+    Построить индекс parent_id → список дочерних строк.
+
+    Порядок дочерних элементов сохраняется таким же, как в исходной выборке.
+
+    Аргументы:
+        rows (Iterable): Строки деталей с атрибутами id и parent_id.
+
+    Возвращает:
+        dict: Словарь, где ключ — parent_id (None для корневых деталей), 
+              а значение — список дочерних строк.
+    """
+    children_index = defaultdict(list)
+    for row in rows:
+        children_index[row.parent_id].append(row)
+    return children_index
+
+
+def build_tree(existing_part, children_index, children_counts=None, max_depth=None):
+    """
+    Построить дерево детали.
+
+    Собирает данные о детали и её дочерних элементах в виде вложенного
+    словаря, используя заранее построенный индекс дочерних элементов вместо
+    ленивой загрузки связи children. Обход выполняется по явному стеку,
+    поэтому глубина дерева не ограничена глубиной рекурсии Python.
+
+    Аргументы:
+        existing_part: Строка или экземпляр детали.
+        children_index (dict): Индекс parent_id → дочерние строки.
+        children_counts (dict | None): Количество дочерних элементов для деталей,
+            чьи потомки не вошли в выборку.
+        max_depth (int | None): Глубина, ниже которой дочерние элементы
+            не разворачиваются (children_count при этом сохраняется).
 
     Возвращает:
         dict: Словарь с данными детали и её потомков.
     """
-    total = existing_part.unit_price * existing_part.quantity
-    children = [build_tree(child) for child in existing_part.children]
+    root = tree_node(existing_part, children_index, children_counts)
+    stack = [(existing_part, root, 0)]
+    while stack:
+        part, node, depth = stack.pop()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for child in children_index.get(part.id, ()):
+            child_node = tree_node(child, children_index, children_counts)
+            node["children"].append(child_node)
+            stack.append((child, child_node, depth + 1))
+    return root
 
-    return {
+
+def tree_node(existing_part, children_index, children_counts=None):
+    """
+    Словарь одной детали дерева с пустым списком children.
+
+    Аргументы:
+        existing_part: Строка или экземпляр детали.
+        children_index (dict): Индекс parent_id → дочерние строки.
+        children_counts (dict | None): Количество дочерних элементов для деталей,
+            чьи потомки не вошли в выборку.
+
+    Возвращает:
+        dict: Данные детали в формате build_tree.
+    """
+    children_count = len(children_index.get(existing_part.id, ()))
+    if children_counts and existing_part.id in children_counts:
+        children_count = children_counts[existing_part.id]
+
+    node = {
         "id": existing_part.id,
         "name": existing_part.name,
         "unit_price": existing_part.unit_price,
         "quantity": existing_part.quantity,
         "parent_id": existing_part.parent_id,
-        "total_price": total,
-        "children": children
+        "total_price": existing_part.unit_price * existing_part.quantity,
+        "children_count": children_count,
+        "children": []
     }
-
-
+    # признак вхождения общей детали по ссылке; у обычных деталей ключа нет,
+    # поэтому ответ для каталогов без ссылок не меняется
+    if getattr(existing_part, "shared", False):
+        node["shared"] = True
+    return node
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -7,8 +8,80 @@ import os
 load_dotenv()
 
 
+# Асинхронные драйверы и их синхронные аналоги: синхронный движок нужен
+# для миграций и фоновых заданий экспорта даже при асинхронном DATABASE_URL.
+ASYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql+psycopg2",
+}
+
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}) 
+_url = make_url(DATABASE_URL)
+ASYNC_DATABASE = _url.drivername in ASYNC_DRIVERS
+SYNC_DATABASE_URL = _url.set(drivername=ASYNC_DRIVERS.get(_url.drivername, _url.drivername))
+
+# Параметры пула соединений
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# PRAGMA, применяемые к каждому новому соединению SQLite
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+    "temp_store": "MEMORY",
+}
+
+
+def engine_options(url):
+    """
+    Параметры создания движка для указанной строки подключения.
+
+    Для SQLite отключается проверка потока соединения; для баз в памяти
+    настройки пула не применяются, так как SQLAlchemy использует для них
+    собственный пул с одним соединением.
+    """
+    url = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def configure_sqlite(sync_engine):
+    """
+    Применять SQLITE_PRAGMAS к каждому новому соединению SQLite.
+
+    WAL позволяет читателям не блокироваться писателем, synchronous=NORMAL
+    в режиме WAL сохраняет целостность базы при меньшем числе fsync,
+    cache_size и mmap_size уменьшают число обращений к диску.
+    """
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+engine = create_engine(SYNC_DATABASE_URL, **engine_options(SYNC_DATABASE_URL))
+configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base() 
 
@@ -18,4 +91,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
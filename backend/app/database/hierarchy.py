@@ -0,0 +1,142 @@
+from sqlalchemy import String, bindparam, func, literal, update
+
+from .models import Part
+
+
+PATH_SEPARATOR = "/"
+PATH_SEGMENT_WIDTH = 10
+
+
+def make_path(parent_path, part_id):
+    """
+    Построить материализованный путь детали.
+
+    Путь состоит из идентификаторов всех предков и самой детали, дополненных
+    нулями до фиксированной ширины, например "/0000000001/0000000005/".
+    Благодаря фиксированной ширине сортировка по пути совпадает с обходом
+    дерева в глубину с упорядочиванием братьев по id.
+
+    Аргументы:
+        parent_path (str | None): Путь родительской детали (None для корневой).
+        part_id (int): Идентификатор детали.
+
+    Возвращает:
+        str: Материализованный путь детали.
+    """
+    segment = str(part_id).zfill(PATH_SEGMENT_WIDTH)
+    return f"{parent_path or PATH_SEPARATOR}{segment}{PATH_SEPARATOR}"
+
+
+def path_to_ids(path):
+    """
+    Разобрать материализованный путь в список идентификаторов от корня к детали.
+
+    Аргументы:
+        path (str): Материализованный путь.
+
+    Возвращает:
+        List[int]: Идентификаторы деталей по пути.
+    """
+    return [int(segment) for segment in path.strip(PATH_SEPARATOR).split(PATH_SEPARATOR) if segment]
+
+
+def descendants_filter(path, include_self=False, column=None):
+    """
+    Условие выборки всех потомков детали по диапазону индекса пути.
+
+    Все пути потомков начинаются с пути детали, поэтому лежат в полуинтервале
+    [path, path без завершающего "/" + "0"), что позволяет использовать
+    обычный B-tree индекс вместо LIKE.
+
+    Аргументы:
+        path (str): Материализованный путь детали.
+        include_self (bool): Включать ли саму деталь в выборку.
+        column: Столбец пути (по умолчанию Part.path; например, столбец parts_at).
+
+    Возвращает:
+        Условие SQLAlchemy для filter().
+    """
+    if column is None:
+        column = Part.path
+    upper_bound = path[:-1] + chr(ord(PATH_SEPARATOR) + 1)
+    lower = column >= path if include_self else column > path
+    return lower & (column < upper_bound)
+
+
+def assign_path(db, part):
+    """
+    Заполнить путь и глубину только что добавленной детали.
+
+    Деталь должна быть уже сброшена в базу (flush), чтобы у неё был id.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part (Part): Экземпляр детали.
+    """
+    parent_path = None
+    if part.parent_id:
+        parent_path = db.query(Part.path).filter(Part.id == part.parent_id).scalar()
+    part.path = make_path(parent_path, part.id)
+    part.depth = len(path_to_ids(part.path)) - 1
+
+
+def move_subtree(db, part, old_path):
+    """
+    Перенести поддерево детали под нового родителя.
+
+    Пути и глубины самой детали и всех её потомков переписываются одним
+    UPDATE по диапазону индекса пути.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part (Part): Перемещаемая деталь с уже установленным новым parent_id.
+        old_path (str): Путь детали до перемещения.
+    """
+    assign_path(db, part)
+    new_path = part.path
+    depth_delta = part.depth - (len(path_to_ids(old_path)) - 1)
+
+    db.execute(
+        update(Part)
+        .where(descendants_filter(old_path, include_self=True))
+        .values(
+            path=literal(new_path, String) + func.substr(Part.path, len(old_path) + 1, type_=String),
+            depth=Part.depth + depth_delta,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_paths(db):
+    """
+    Полностью перестроить пути и глубины всех деталей по parent_id.
+
+    Используется для заполнения индекса иерархии в существующей базе.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        int: Количество обновлённых деталей.
+    """
+    rows = db.query(Part.id, Part.parent_id).order_by(Part.id).all()
+    children_index = {}
+    for row in rows:
+        children_index.setdefault(row.parent_id, []).append(row.id)
+
+    values = []
+    stack = [(part_id, None) for part_id in reversed(children_index.get(None, []))]
+    while stack:
+        part_id, parent_path = stack.pop()
+        path = make_path(parent_path, part_id)
+        values.append({"part_id": part_id, "path": path, "depth": len(path_to_ids(path)) - 1})
+        stack.extend((child_id, path) for child_id in reversed(children_index.get(part_id, [])))
+
+    if values:
+        db.execute(
+            Part.__table__.update()
+            .where(Part.__table__.c.id == bindparam("part_id"))
+            .values(path=bindparam("path"), depth=bindparam("depth")),
+            values,
+        )
+    return len(values)
@@ -0,0 +1,76 @@
+from sqlalchemy import select, union_all
+
+from .models import CatalogVersion, Part, PartHistory
+
+
+# Текущая версия каталога: к моменту срабатывания триггера операция записи
+# уже увеличила её в своей транзакции (crud.bump_version)
+CURRENT_VERSION = f"(SELECT version FROM {CatalogVersion.__tablename__} WHERE id = 1)"
+
+HISTORY_COLUMNS = ["name", "unit_price", "quantity", "parent_id", "path", "depth"]
+
+# История ведётся триггерами, поэтому в ней учитываются все пути записи:
+# create/edit/move, пересчёт цен предков, пакетный импорт и каскадное удаление.
+# Состояние переносится в part_history только при первом изменении строки
+# в очередной версии: промежуточные состояния внутри одной операции
+# никому не видны и не сохраняются.
+HISTORY_TRIGGERS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PartHistory.__tablename__}_ai AFTER INSERT ON {Part.__tablename__}
+    WHEN new.valid_from IS NULL BEGIN
+        UPDATE {Part.__tablename__} SET valid_from = {CURRENT_VERSION} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PartHistory.__tablename__}_au
+    AFTER UPDATE OF {", ".join(HISTORY_COLUMNS)} ON {Part.__tablename__}
+    WHEN old.valid_from IS NOT {CURRENT_VERSION}
+        AND ({" OR ".join(f"old.{name} IS NOT new.{name}" for name in HISTORY_COLUMNS)}) BEGIN
+        INSERT INTO {PartHistory.__tablename__}(part_id, {", ".join(HISTORY_COLUMNS)}, valid_from, valid_to)
+        VALUES (old.id, {", ".join(f"old.{name}" for name in HISTORY_COLUMNS)}, old.valid_from, {CURRENT_VERSION});
+        UPDATE {Part.__tablename__} SET valid_from = {CURRENT_VERSION} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PartHistory.__tablename__}_ad AFTER DELETE ON {Part.__tablename__}
+    WHEN old.valid_from IS NOT {CURRENT_VERSION} BEGIN
+        INSERT INTO {PartHistory.__tablename__}(part_id, {", ".join(HISTORY_COLUMNS)}, valid_from, valid_to)
+        VALUES (old.id, {", ".join(f"old.{name}" for name in HISTORY_COLUMNS)}, old.valid_from, {CURRENT_VERSION});
+    END
+    """,
+]
+
+
+def parts_at(version):
+    """
+    Подзапрос с состоянием деталей на указанную версию каталога.
+
+    Объединяет строки parts, не изменявшиеся после версии, и строки истории,
+    актуальные на эту версию. Строки истории выбираются по индексу valid_to,
+    поэтому объём чтения истории пропорционален числу изменений после версии.
+
+    Аргументы:
+        version (int): Версия каталога.
+
+    Возвращает:
+        Subquery: Столбцы id, name, unit_price, quantity, parent_id, path, depth.
+    """
+    current = select(
+        Part.id,
+        Part.name,
+        Part.unit_price,
+        Part.quantity,
+        Part.parent_id,
+        Part.path,
+        Part.depth,
+    ).where(Part.valid_from <= version)
+    previous = select(
+        PartHistory.part_id.label("id"),
+        PartHistory.name,
+        PartHistory.unit_price,
+        PartHistory.quantity,
+        PartHistory.parent_id,
+        PartHistory.path,
+        PartHistory.depth,
+    ).where(PartHistory.valid_to > version, PartHistory.valid_from <= version)
+    return union_all(current, previous).subquery("parts_at")
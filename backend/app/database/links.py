@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+
+from .hierarchy import descendants_filter, path_to_ids
+from .models import Part, PartLink
+
+
+def links_at(version=None):
+    """
+    Условие выборки ссылок, действующих в указанной версии каталога.
+
+    Аргументы:
+        version (int | None): Прошлая версия каталога (None — текущие ссылки).
+
+    Возвращает:
+        Условие SQLAlchemy для filter().
+    """
+    if version is None:
+        return PartLink.valid_to.is_(None)
+    return (PartLink.valid_from <= version) & (PartLink.valid_to.is_(None) | (PartLink.valid_to > version))
+
+
+def has_links(db):
+    """
+    Проверить, есть ли в каталоге текущие ссылки на общие узлы.
+
+    Пока ссылок нет, чтение и пересчёт цен работают по дереву parent_id
+    без дополнительных запросов.
+    """
+    return db.query(PartLink.id).filter(links_at()).first() is not None
+
+
+def load_links(db, version=None):
+    """
+    Загрузить ссылки в виде индекса сборка → вхождения общих деталей.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        version (int | None): Прошлая версия каталога (None — текущие ссылки).
+
+    Возвращает:
+        dict: Словарь parent_id → список пар (child_id, quantity), упорядоченных по child_id.
+    """
+    links = defaultdict(list)
+    rows = db.query(PartLink.parent_id, PartLink.child_id, PartLink.quantity).filter(
+        links_at(version)
+    ).order_by(PartLink.parent_id, PartLink.child_id)
+    for parent_id, child_id, quantity in rows:
+        links[parent_id].append((child_id, quantity))
+    return links
+
+
+def dag_ancestors(db, part_ids):
+    """
+    Найти все сборки, в которые детали входят прямо или косвенно.
+
+    На каждом шаге добавляются предки по материализованным путям и сборки,
+    ссылающиеся на найденные детали, поэтому число запросов пропорционально
+    числу уровней вложенности ссылок, а не числу деталей.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_ids (Iterable[int]): Идентификаторы деталей.
+
+    Возвращает:
+        set[int]: Идентификаторы сборок вместе с самими деталями.
+    """
+    result = set()
+    frontier = {part_id for part_id in part_ids if part_id}
+    while frontier:
+        paths = db.query(Part.path).filter(Part.id.in_(frontier)).all()
+        chain = {ancestor_id for (path,) in paths for ancestor_id in path_to_ids(path)} - result
+        result |= chain
+        frontier = {
+            parent_id for (parent_id,) in db.query(PartLink.parent_id).filter(
+                links_at(),
+                PartLink.child_id.in_(chain),
+            )
+        } - result
+    return result
+
+
+def linked_subtrees(db, path):
+    """
+    Найти поддеревья, входящие в деталь по дереву и по ссылкам.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        path (str): Материализованный путь детали.
+
+    Возвращает:
+        List[str]: Пути корней поддеревьев (первым — path); объединение
+                   диапазонов этих путей содержит все комплектующие детали.
+    """
+    paths = [path]
+    frontier = [path]
+    child = aliased(Part)
+    while frontier:
+        rows = db.query(child.path).join(PartLink, PartLink.child_id == child.id).join(
+            Part, Part.id == PartLink.parent_id
+        ).filter(
+            links_at(),
+            or_(*(descendants_filter(root_path, include_self=True) for root_path in frontier)),
+        ).distinct().all()
+        frontier = []
+        for (child_path,) in rows:
+            if not any(child_path.startswith(root_path) for root_path in paths):
+                paths.append(child_path)
+                frontier.append(child_path)
+    return paths
+
+
+def close_links(db, part_ids, version):
+    """
+    Закрыть текущие ссылки, в которых участвуют удаляемые детали.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_ids: Список id или подзапрос с id удаляемых деталей.
+        version (int): Версия каталога, в которой ссылки перестают действовать.
+
+    Возвращает:
+        List[int]: Оставшиеся сборки, из которых удалены вхождения деталей.
+    """
+    parent_ids = [
+        parent_id for (parent_id,) in db.query(PartLink.parent_id).filter(
+            links_at(),
+            PartLink.child_id.in_(part_ids),
+            PartLink.parent_id.notin_(part_ids),
+        ).distinct()
+    ]
+    db.query(PartLink).filter(
+        links_at(),
+        or_(PartLink.child_id.in_(part_ids), PartLink.parent_id.in_(part_ids)),
+    ).update({PartLink.valid_to: version}, synchronize_session=False)
+    return parent_ids
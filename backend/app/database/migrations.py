@@ -0,0 +1,271 @@
+import logging
+from collections import defaultdict
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from .hierarchy import rebuild_paths
+from .history import HISTORY_TRIGGERS_DDL
+from .models import NAME_INDEX, CatalogVersion, Part, PartChange, PartHistory, PartLink, normalize_name
+from .search import SEARCH_TABLE, SEARCH_TABLE_DDL, SEARCH_TRIGGERS_DDL
+
+
+logger = logging.getLogger(__name__)
+
+# Базы (database_key), в которых уникальный индекс наименований NAME_INDEX
+# не создан из-за дубликатов. Заполняется create_missing_indexes при запуске,
+# чтобы запись не проверяла наличие индекса запросом к каталогу СУБД.
+NAME_INDEX_MISSING = set()
+
+
+def database_key(url):
+    """
+    Ключ базы данных, не зависящий от драйвера: синхронный и асинхронный
+    движки одной базы (sqlite:// и sqlite+aiosqlite://) дают один ключ.
+    """
+    return url.get_backend_name(), url.host, url.port, url.database
+
+
+def add_missing_columns(engine):
+    """
+    Добавить в таблицы parts и catalog_version столбцы, объявленные в модели,
+    но отсутствующие в базе.
+
+    create_all не изменяет уже существующие таблицы, поэтому новые столбцы
+    существующей базы (например, app.db) добавляются через ALTER TABLE.
+    """
+    for table in (Part.__table__, CatalogVersion.__table__):
+        existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def drop_part_link_foreign_keys(engine):
+    """
+    Удалить внешние ключи part_links на parts, созданные прежней версией модели.
+
+    Закрытые ссылки хранятся для снимков каталога и указывают на детали,
+    которые затем удаляются физически. SQLite не проверяет внешние ключи
+    без PRAGMA foreign_keys и не позволяет удалить ограничение существующей
+    таблицы, поэтому шаг выполняется только для других СУБД.
+    """
+    if engine.dialect.name == "sqlite":
+        return
+    foreign_keys = inspect(engine).get_foreign_keys(PartLink.__tablename__)
+    with engine.begin() as conn:
+        for foreign_key in foreign_keys:
+            if foreign_key["name"]:
+                conn.execute(text(f'ALTER TABLE {PartLink.__tablename__} DROP CONSTRAINT "{foreign_key["name"]}"'))
+
+
+def backfill_normalized_names(engine):
+    """
+    Заполнить нормализованные наименования деталей, у которых они отсутствуют,
+    и сообщить о конфликтах уникальности среди дочерних элементов одного родителя.
+    """
+    with Session(bind=engine) as db:
+        rows = db.query(Part.id, Part.name).filter(Part.name_normalized == None).all()
+        if rows:
+            db.execute(
+                Part.__table__.update()
+                .where(Part.__table__.c.id == bindparam("part_id"))
+                .values(name_normalized=bindparam("name_normalized")),
+                [{"part_id": row.id, "name_normalized": normalize_name(row.name)} for row in rows],
+            )
+            db.commit()
+
+        for parent_id, name, part_ids in find_name_conflicts(db):
+            logger.warning(
+                "Дублирующиеся наименования %r у родителя %s: детали %s",
+                name, parent_id, part_ids,
+            )
+
+
+def find_name_conflicts(db):
+    """
+    Найти детали с совпадающими нормализованными наименованиями у одного родителя.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        List[tuple]: Кортежи (parent_id, нормализованное наименование, список id деталей).
+    """
+    groups = defaultdict(list)
+    for part_id, parent_id, name in db.query(Part.id, Part.parent_id, Part.name_normalized):
+        groups[(parent_id, name)].append(part_id)
+    return [
+        (parent_id, name, part_ids)
+        for (parent_id, name), part_ids in groups.items()
+        if len(part_ids) > 1
+    ]
+
+
+def create_missing_indexes(engine):
+    """
+    Создать индексы моделей Part и PartChange, которых ещё нет в базе.
+
+    Уникальный индекс не создаётся, пока в базе есть конфликтующие строки;
+    об этом пишется предупреждение, остальные индексы создаются как обычно.
+    Отсутствие индекса наименований запоминается в NAME_INDEX_MISSING.
+    """
+    for index in [*Part.__table__.indexes, *PartChange.__table__.indexes]:
+        try:
+            with engine.begin() as conn:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        except IntegrityError:
+            logger.warning("Индекс %s не создан: в базе есть дубликаты", index.name)
+            if index.name == NAME_INDEX:
+                NAME_INDEX_MISSING.add(database_key(engine.url))
+        else:
+            if index.name == NAME_INDEX:
+                NAME_INDEX_MISSING.discard(database_key(engine.url))
+
+
+def backfill_paths(engine):
+    """
+    Заполнить материализованные пути, если у части деталей они отсутствуют.
+    """
+    with Session(bind=engine) as db:
+        if db.query(Part.id).filter(Part.path == None).first() is None:
+            return
+        rebuild_paths(db)
+        db.commit()
+
+
+def ensure_catalog_version(engine):
+    """
+    Создать строку счётчика версии каталога, если её ещё нет.
+    """
+    with Session(bind=engine) as db:
+        if db.get(CatalogVersion, 1) is None:
+            db.add(CatalogVersion(id=1, version=0))
+            db.commit()
+
+
+def create_search_index(engine):
+    """
+    Создать полнотекстовый индекс наименований (SQLite FTS5) и триггеры синхронизации.
+
+    При первом создании индекс заполняется по существующим деталям. Для других
+    СУБД и сборок SQLite без FTS5 шаг пропускается — поиск тогда выполняется
+    сканированием по LIKE.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            created = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": SEARCH_TABLE},
+            ).first() is None
+            conn.execute(text(SEARCH_TABLE_DDL))
+            for trigger_ddl in SEARCH_TRIGGERS_DDL:
+                conn.execute(text(trigger_ddl))
+            if created:
+                conn.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        logger.warning("Полнотекстовый индекс не создан: %s", e)
+
+
+def create_history_triggers(engine):
+    """
+    Создать триггеры истории деталей для снимков каталога (только SQLite).
+
+    При первом создании текущее состояние всех деталей помечается текущей
+    версией каталога, и с неё начинается история: более ранние версии
+    восстановить нельзя. Для других СУБД история не ведётся, и снимки
+    позволяют читать только текущую версию.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        created = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+            {"name": f"{PartHistory.__tablename__}_au"},
+        ).first() is None
+        if created:
+            conn.execute(text(
+                f"UPDATE {Part.__tablename__} SET valid_from = "
+                f"(SELECT version FROM {CatalogVersion.__tablename__} WHERE id = 1) "
+                "WHERE valid_from IS NULL"
+            ))
+            conn.execute(text(
+                f"UPDATE {CatalogVersion.__tablename__} SET history_from = version "
+                "WHERE id = 1 AND history_from IS NULL"
+            ))
+        for trigger_ddl in HISTORY_TRIGGERS_DDL:
+            conn.execute(text(trigger_ddl))
+
+
+def recompute_weighted_prices(engine):
+    """
+    В режиме ROLLUP_MODE=weighted привести цены всех сборок к ценам с учётом количества.
+
+    Пересчёт при записи затрагивает только цепочки предков и полагается на то,
+    что цены остальных сборок уже согласованы; после переключения режима
+    это обеспечивает однократный полный пересчёт при запуске. Изменённые
+    цены записываются в журнал новой версии каталога, чтобы клиенты
+    и кэши получили их как обычное изменение.
+    """
+    from utils import ROLLUP_MODE
+
+    if ROLLUP_MODE != "weighted":
+        return
+
+    from rollup import recompute_all_prices
+    from .crud import bump_version, record_changes
+
+    with Session(bind=engine) as db:
+        changed = recompute_all_prices(db)
+        if changed:
+            bump_version(db)
+            record_changes(db, updated_ids=changed)
+        db.commit()
+    if changed:
+        logger.info("Пересчитаны цены сборок с учётом количества: %s", len(changed))
+
+
+MIGRATIONS = [
+    add_missing_columns,
+    drop_part_link_foreign_keys,
+    backfill_normalized_names,
+    create_missing_indexes,
+    backfill_paths,
+    ensure_catalog_version,
+    create_search_index,
+    create_history_triggers,
+    recompute_weighted_prices,
+]
+
+
+def upgrade(engine):
+    """
+    Привести схему существующей базы к текущим моделям.
+
+    Все шаги идемпотентны и выполняются при каждом запуске приложения.
+
+    Аргументы:
+        engine (Engine): Движок базы данных.
+    """
+    for migration in MIGRATIONS:
+        migration(engine)
+
+
+if __name__ == "__main__":
+    from .database import Base, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    with Session(bind=engine) as db:
+        conflicts = find_name_conflicts(db)
+    for parent_id, name, part_ids in conflicts:
+        print(f"parent_id={parent_id} name={name!r}: {part_ids}")
+    print(f"Конфликтов наименований: {len(conflicts)}")
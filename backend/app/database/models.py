@@ -1,17 +1,37 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime, Index, func
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime, timezone
+import unicodedata
 from .database import Base
 
+
+def normalize_name(name):
+    """
+    Нормализовать наименование детали для сравнения без учёта регистра.
+
+    Используется Unicode-нормализация NFKC и casefold, поэтому сравнение
+    корректно работает и для кириллицы (в отличие от SQL-функции lower в SQLite).
+    """
+    return unicodedata.normalize("NFKC", name).casefold()
+
+
 class Part(Base):
     __tablename__ = "parts"
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
+    # нормализованное наименование для уникальности среди дочерних элементов одного родителя
+    name_normalized = Column(String)
     unit_price = Column(Integer, default=0)
     quantity = Column(Integer, default=1)
-    parent_id = Column(Integer, ForeignKey("parts.id"))
+    parent_id = Column(Integer, ForeignKey("parts.id"), index=True)
+    # материализованный путь "/<id предка>/.../<id>/" и глубина (0 для корневых)
+    path = Column(String, index=True)
+    depth = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # версия каталога, в которой строка приняла текущее состояние;
+    # заполняется триггерами истории (database/history.py)
+    valid_from = Column(Integer)
 
     # child-side → many-to-one
     parent = relationship(
@@ -25,4 +45,125 @@ class Part(Base):
         "Part",
         back_populates="parent",
         cascade="all, delete-orphan",
-    )
\ No newline at end of file
+    )
+
+    @validates("name")
+    def validate_name(self, key, name):
+        self.name_normalized = normalize_name(name) if name is not None else None
+        return name
+
+
+# Уникальность наименования среди дочерних элементов одного родителя.
+# parent_id заменяется на 0 для корневых деталей, так как NULL не участвуют в уникальности.
+NAME_INDEX = "ux_parts_parent_name_normalized"
+Index(
+    NAME_INDEX,
+    func.coalesce(Part.parent_id, 0),
+    Part.name_normalized,
+    unique=True,
+)
+
+
+class CatalogVersion(Base):
+    """
+    Счётчик версии каталога.
+
+    Единственная строка (id = 1) увеличивается при каждом изменении деталей
+    в той же транзакции, что и само изменение. Хранение версии в базе позволяет
+    нескольким процессам uvicorn согласованно сбрасывать свои кэши.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    # версия, начиная с которой ведётся история деталей (None — история не ведётся)
+    history_from = Column(Integer)
+
+
+class PartChange(Base):
+    """
+    Журнал изменений деталей (только добавление записей).
+
+    Каждая операция записи добавляет по строке на каждую затронутую деталь:
+    саму изменённую деталь и всех предков, чьи цены были пересчитаны.
+    version совпадает с версией каталога, которую получила операция.
+    """
+    __tablename__ = "part_changes"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    part_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+
+
+class PartHistory(Base):
+    """
+    Прошлые состояния деталей (копирование при записи).
+
+    Когда деталь впервые изменяется или удаляется в новой версии каталога,
+    её предыдущее состояние переносится сюда с интервалом версий
+    [valid_from, valid_to), в котором оно было актуальным. Строки parts
+    не копируются целиком: состояние каталога на версию V — это строки parts
+    с valid_from <= V и строки истории, интервал которых содержит V.
+    """
+    __tablename__ = "part_history"
+
+    id = Column(Integer, primary_key=True)
+    part_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    unit_price = Column(Integer)
+    quantity = Column(Integer)
+    parent_id = Column(Integer)
+    path = Column(String)
+    depth = Column(Integer)
+    valid_from = Column(Integer)
+    valid_to = Column(Integer, nullable=False, index=True)
+
+
+class Snapshot(Base):
+    """
+    Именованный снимок каталога — закреплённая версия каталога.
+
+    Снимок не копирует данные: состояние на его версию восстанавливается
+    по parts и part_history.
+    """
+    __tablename__ = "snapshots"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    version = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class PartLink(Base):
+    """
+    Дополнительное вхождение детали в сборку (общий узел).
+
+    Основное место детали в дереве задаёт parent_id; ссылка позволяет
+    использовать ту же деталь вместе с её поддеревом в других сборках
+    со своим количеством, не копируя поддерево. Ссылки не удаляются
+    физически: при удалении заполняется valid_to, поэтому снимки каталога
+    видят ссылки своей версии. Текущие ссылки — строки с valid_to IS NULL.
+    Закрытые ссылки могут указывать на физически удалённые детали, поэтому,
+    как и у part_history.part_id, внешних ключей на parts нет.
+    """
+    __tablename__ = "part_links"
+
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, nullable=False, index=True)
+    child_id = Column(Integer, nullable=False, index=True)
+    quantity = Column(Integer, nullable=False, default=1)
+    valid_from = Column(Integer, nullable=False)
+    valid_to = Column(Integer)
+
+
+# Одна текущая ссылка на пару сборка — деталь; закрытые ссылки не ограничиваются
+Index(
+    "ux_part_links_current",
+    PartLink.parent_id,
+    PartLink.child_id,
+    unique=True,
+    sqlite_where=PartLink.valid_to.is_(None),
+    postgresql_where=PartLink.valid_to.is_(None),
+)
@@ -0,0 +1,94 @@
+import re
+
+from sqlalchemy import text
+
+from .models import Part, normalize_name
+
+
+SEARCH_TABLE = "parts_fts"
+
+# Полнотекстовый индекс наименований деталей (SQLite FTS5) во внешнем
+# содержимом: текст хранится только в parts, индекс — в parts_fts.
+# unicode61 приводит к одному регистру в том числе кириллицу; удаление
+# диакритики отключено, чтобы "й" и "ё" не совпадали с "и" и "е".
+# Префиксные индексы ускоряют поиск по началу слова длиной 2–3 символа.
+SEARCH_TABLE_DDL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    name,
+    content='{Part.__tablename__}',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 0',
+    prefix='2 3'
+)
+"""
+
+# Индекс синхронизируется триггерами, поэтому в нём учитываются все пути
+# записи: create/edit/delete, пакетный импорт и каскадное удаление.
+# Изменение цен и путей наименования не затрагивает и индекс не трогает.
+SEARCH_TRIGGERS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON {Part.__tablename__} BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON {Part.__tablename__} BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF name ON {Part.__tablename__} BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {SEARCH_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+]
+
+SEARCH_TOKEN = re.compile(r"\w+")
+
+
+def search_tokens(query):
+    """
+    Разбить поисковую строку на слова.
+
+    Аргументы:
+        query (str): Строка поиска.
+
+    Возвращает:
+        List[str]: Слова в нормализованном виде (NFKC, без учёта регистра).
+    """
+    return SEARCH_TOKEN.findall(normalize_name(query))
+
+
+def make_match_query(tokens):
+    """
+    Построить выражение MATCH FTS5: все слова должны встречаться как начала слов.
+
+    Каждое слово заключается в кавычки, поэтому операторы и спецсимволы FTS5
+    в пользовательском вводе не интерпретируются.
+
+    Аргументы:
+        tokens (List[str]): Слова поисковой строки.
+
+    Возвращает:
+        str: Выражение для MATCH, например '"болт"* AND "м8"*'.
+    """
+    return " AND ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def has_search_index(db):
+    """
+    Проверить, доступен ли полнотекстовый индекс в базе сессии.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        bool: True для SQLite с созданной таблицей parts_fts.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE},
+    ).first() is not None
@@ -5,3 +5,17 @@ class DeletePartResult(str, Enum):
     NOT_FOUND = "not_found"
     HAS_CHILDREN = "has_children"
     EXISTS = "exists"
+    CYCLE = "cycle"
+    UNAVAILABLE = "unavailable"
+
+
+class ExportFormat(str, Enum):
+    EXCEL = "excel"
+    PDF = "pdf"
+
+
+class ExportJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
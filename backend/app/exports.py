@@ -0,0 +1,367 @@
+import csv
+import functools
+import io
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+
+# openpyxl и reportlab импортируются внутри функций экспорта: они нужны только
+# эндпоинтам /export/* и фоновым заданиям, а их импорт при запуске добавляет
+# к каждому процессу uvicorn сотни миллисекунд и десятки мегабайт памяти
+
+from database.database import SessionLocal
+from database.hierarchy import descendants_filter
+from database.history import parts_at
+from database.links import load_links
+from database.models import Part
+from utils import EXPORT_COLUMNS
+
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXCEL_SPOOL_SIZE = 8 * 1024 * 1024
+
+PDF_FONT_NAME = "DejaVuSans-Bold"
+PDF_FONT_PATH = os.path.join(os.path.dirname(__file__), "static", "fonts", "DejaVuSans-Bold.ttf")
+PDF_ROWS_PER_TABLE = 40
+PDF_COLUMN_SHARES = [0.55, 0.15, 0.15, 0.15]
+# ячейка таблицы не может быть выше страницы, поэтому у очень глубоких деталей
+# середина иерархического номера в PDF заменяется многоточием
+PDF_MAX_NAME_LENGTH = 2000
+
+
+def iter_numbered_parts(db, batch_size=EXPORT_BATCH_SIZE, version=None):
+    """
+    Итерировать детали в иерархическом порядке вместе с их номерами ("1.2.3").
+
+    Детали читаются из базы порциями, отсортированными по материализованному пути,
+    что совпадает с обходом дерева в глубину. Номер вычисляется по стеку счётчиков
+    уровней, поэтому в памяти хранится только текущая порция и путь до детали.
+    Общие узлы разворачиваются так же, как в get_tree: после дочерних деталей
+    сборки выводятся вхождения по ссылкам вместе с поддеревьями общих деталей.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        batch_size (int): Размер порции, читаемой из базы.
+        version (int | None): Прошлая версия каталога (None — текущее состояние).
+
+    Возвращает:
+        Generator[tuple]: Пары (иерархический номер, строка детали).
+    """
+    source = Part.__table__ if version is None else parts_at(version)
+    columns = (
+        source.c.id,
+        source.c.name,
+        source.c.unit_price,
+        source.c.quantity,
+        source.c.parent_id,
+        source.c.depth,
+    )
+    links = load_links(db, version)
+    # поддерево общей детали читается один раз и переиспользуется всеми вхождениями
+    subtrees = {}
+
+    def load_subtree(part_id, parent_id, quantity):
+        if part_id not in subtrees:
+            path = db.query(source.c.path).filter(source.c.id == part_id).scalar()
+            subtrees[part_id] = db.query(*columns).filter(
+                descendants_filter(path, include_self=True, column=source.c.path)
+            ).order_by(source.c.path).all()
+        root, *rows = subtrees[part_id]
+        yield SimpleNamespace(**{**root._mapping, "quantity": quantity, "parent_id": parent_id})
+        yield from rows
+
+    query = db.query(*columns).order_by(source.c.path).yield_per(batch_size)
+    yield from number_parts(query, links, load_subtree)
+
+
+def number_parts(rows, links, load_subtree, prefix=(), start=0):
+    """
+    Пронумеровать детали, идущие в порядке обхода в глубину.
+
+    Пока сборка открыта (следующие строки — её потомки), её номер лежит
+    в стеке счётчиков; при закрытии после дочерних деталей нумеруются
+    вхождения общих деталей по ссылкам.
+
+    Аргументы:
+        rows (Iterable): Строки деталей в порядке путей.
+        links (dict): Ссылки load_links (parent_id → [(child_id, quantity)]).
+        load_subtree (Callable): Строки поддерева общей детали по (id, parent_id, quantity).
+        prefix (tuple): Номер сборки, внутри которой нумеруются строки.
+        start (int): Число уже пронумерованных элементов сборки.
+
+    Возвращает:
+        Generator[tuple]: Пары (иерархический номер, строка детали).
+    """
+    counters = [*prefix, start] if start else list(prefix)
+    base = len(prefix)
+    top_depth = None
+    open_parts = []
+
+    def close(level):
+        while open_parts and open_parts[-1][1] >= level:
+            part_id, part_level = open_parts.pop()
+            children = counters[part_level + 1] if len(counters) > part_level + 1 else 0
+            number = tuple(counters[:part_level + 1])
+            for index, (child_id, quantity) in enumerate(links[part_id], start=children):
+                yield from number_parts(
+                    load_subtree(child_id, part_id, quantity), links, load_subtree, number, index
+                )
+
+    for part in rows:
+        if top_depth is None:
+            top_depth = part.depth
+        level = base + part.depth - top_depth
+        if open_parts and open_parts[-1][1] >= level:
+            yield from close(level)
+        del counters[level + 1:]
+        if len(counters) > level:
+            counters[level] += 1
+        else:
+            counters.append(1)
+        yield ".".join(map(str, counters)), part
+        if links and part.id in links:
+            open_parts.append((part.id, level))
+    yield from close(base)
+
+
+def iter_export_rows(db, version=None):
+    """
+    Итерировать строки экспорта в том же формате, что и flattern_parts.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        version (int | None): Прошлая версия каталога (None — текущее состояние).
+
+    Возвращает:
+        Generator[dict]: Строки с наименованием, ценой, количеством и стоимостью.
+    """
+    for number, part in iter_numbered_parts(db, version=version):
+        yield {
+            "Наименование": f"{number}. {part.name}",
+            "Цена": part.unit_price,
+            "Количество": part.quantity,
+            "Стоимость": part.unit_price * part.quantity,
+        }
+
+
+def write_excel(rows, output):
+    """
+    Записать строки экспорта в Excel файл.
+
+    Книга openpyxl создаётся в режиме write-only, поэтому строки не накапливаются
+    в памяти и не требуют DataFrame.
+
+    Аргументы:
+        rows (Iterable[dict]): Строки экспорта в формате flattern_parts.
+        output: Файловый объект, открытый на запись в двоичном режиме.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Parts")
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(list(row.values()))
+    workbook.save(output)
+
+
+def stream_excel(version=None):
+    """
+    Сформировать Excel файл со всеми деталями и отдавать его порциями.
+
+    Готовый файл формируется во временном файле, который при небольшом
+    размере остаётся в памяти, и читается порциями.
+
+    Аргументы:
+        version (int | None): Прошлая версия каталога (None — текущее состояние).
+
+    Возвращает:
+        Generator[bytes]: Порции содержимого .xlsx файла.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_SIZE) as output:
+        db = SessionLocal()
+        try:
+            write_excel(iter_export_rows(db, version), output)
+        finally:
+            db.close()
+
+        output.seek(0)
+        while chunk := output.read(EXPORT_CHUNK_SIZE):
+            yield chunk
+
+
+def stream_csv(version=None):
+    """
+    Отдавать все детали в формате CSV порциями по мере чтения из базы.
+
+    Аргументы:
+        version (int | None): Прошлая версия каталога (None — текущее состояние).
+
+    Возвращает:
+        Generator[bytes]: Порции CSV в кодировке UTF-8 с BOM для корректного открытия в Excel.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+
+    db = SessionLocal()
+    try:
+        for row in iter_export_rows(db, version):
+            writer.writerow(row.values())
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        db.close()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(version=None):
+    """
+    Отдавать все детали в формате NDJSON (один JSON-объект на строку).
+
+    Каждая строка содержит id, parent_id, иерархический номер и числовые поля детали.
+
+    Аргументы:
+        version (int | None): Прошлая версия каталога (None — текущее состояние).
+
+    Возвращает:
+        Generator[bytes]: Порции NDJSON в кодировке UTF-8.
+    """
+    lines = []
+    size = 0
+    db = SessionLocal()
+    try:
+        for number, part in iter_numbered_parts(db, version=version):
+            line = json.dumps({
+                "id": part.id,
+                "parent_id": part.parent_id,
+                "number": number,
+                "name": part.name,
+                "unit_price": part.unit_price,
+                "quantity": part.quantity,
+                "total_price": part.unit_price * part.quantity,
+            }, ensure_ascii=False) + "\n"
+            lines.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_SIZE:
+                yield "".join(lines).encode("utf-8")
+                lines, size = [], 0
+    finally:
+        db.close()
+    yield "".join(lines).encode("utf-8")
+
+
+@functools.cache
+def pdf_styles():
+    """
+    Импортировать reportlab, зарегистрировать шрифт с кириллицей и создать
+    стили PDF один раз на процесс.
+
+    Возвращает:
+        tuple: Стиль наименования (ParagraphStyle) и стиль таблицы (TableStyle).
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import TableStyle
+
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, PDF_FONT_PATH))
+
+    name_style = ParagraphStyle(
+        name="DejaVuStyle",
+        fontName=PDF_FONT_NAME,
+        fontSize=10,
+    )
+    table_style = TableStyle([
+        ("TEXTCOLOR",  (0, 0), (-1, 0), colors.black),
+        ("ALIGN",      (0, 0), (-1, -1), "LEFT"),
+        ("VALIGN",     (0, 0), (-1, -1), "TOP"),
+        ("FONTNAME",   (0, 0), (-1, -1), PDF_FONT_NAME),
+        ("FONTSIZE",   (0, 1), (-1, -1), 10),
+        ("FONTSIZE",   (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+        ("GRID",       (0, 0), (-1, -1), 0.5, colors.black),
+    ])
+    return name_style, table_style
+
+
+def render_pdf(rows):
+    """
+    Сформировать PDF с таблицей деталей.
+
+    Таблица разбивается на блоки по PDF_ROWS_PER_TABLE строк с повторяющимся
+    заголовком, поэтому время вёрстки растёт линейно с числом строк.
+    В Paragraph оборачивается только наименование (для переноса длинных строк),
+    числовые ячейки передаются обычными строками.
+
+    Аргументы:
+        rows (Iterable[dict]): Строки экспорта в формате flattern_parts.
+
+    Возвращает:
+        bytes: Содержимое PDF файла.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    name_style, _ = pdf_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    col_widths = [doc.width * share for share in PDF_COLUMN_SHARES]
+
+    story = []
+    chunk = []
+    for row in rows:
+        chunk.append([
+            Paragraph(escape(shorten_pdf_name(row["Наименование"])), name_style),
+            str(row["Цена"]),
+            str(row["Количество"]),
+            str(row["Стоимость"]),
+        ])
+        if len(chunk) == PDF_ROWS_PER_TABLE:
+            story.append(make_pdf_table(chunk, col_widths))
+            chunk = []
+    if chunk or not story:
+        story.append(make_pdf_table(chunk, col_widths))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def shorten_pdf_name(name):
+    if len(name) <= PDF_MAX_NAME_LENGTH:
+        return name
+    half = PDF_MAX_NAME_LENGTH // 2
+    return name[:half] + "…" + name[-half:]
+
+
+def make_pdf_table(chunk, col_widths):
+    from reportlab.platypus import Table
+
+    table = Table([EXPORT_COLUMNS] + chunk, colWidths=col_widths, repeatRows=1)
+    table.setStyle(pdf_styles()[1])
+    return table
+
+
+def build_pdf(version=None):
+    """
+    Сформировать PDF со всеми деталями каталога.
+
+    Аргументы:
+        version (int | None): Версия каталога (None — текущее состояние).
+
+    Возвращает:
+        bytes: Содержимое PDF файла.
+    """
+    db = SessionLocal()
+    try:
+        return render_pdf(iter_export_rows(db, version))
+    finally:
+        db.close()
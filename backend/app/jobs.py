@@ -0,0 +1,260 @@
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+from enums import ExportFormat, ExportJobStatus
+
+load_dotenv()
+
+
+EXPORT_JOBS_DIR = os.getenv("EXPORT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "parts_exports"))
+EXPORT_JOB_TTL = int(os.getenv("EXPORT_JOB_TTL", "3600"))
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+# Задание в состоянии pending/running, не обновлявшееся дольше этого времени,
+# считается потерянным (процесс-обработчик завершился) и запускается заново
+EXPORT_JOB_STALE_AFTER = int(os.getenv("EXPORT_JOB_STALE_AFTER", "300"))
+HEARTBEAT_SECONDS = 10
+PROGRESS_EVERY_ROWS = 1000
+JOB_ID_PATTERN = re.compile(r"^(excel|pdf)-\d+$")
+
+RESULT_EXTENSIONS = {
+    ExportFormat.EXCEL: "xlsx",
+    ExportFormat.PDF: "pdf",
+}
+RESULT_MEDIA_TYPES = {
+    ExportFormat.EXCEL: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ExportFormat.PDF: "application/pdf",
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_lock = threading.Lock()
+
+
+def job_id(export_format, version):
+    """
+    Идентификатор задания экспорта.
+
+    Идентификатор определяется форматом и версией каталога, поэтому повторные
+    запросы одного формата без изменений каталога попадают в одно задание
+    во всех процессах, использующих общий каталог результатов.
+    """
+    return f"{ExportFormat(export_format).value}-{version}"
+
+
+def is_valid_job_id(job):
+    """
+    Проверить формат идентификатора задания, полученного от клиента.
+
+    Идентификатор используется в именах файлов, поэтому произвольные строки не допускаются.
+    """
+    return bool(JOB_ID_PATTERN.match(job))
+
+
+def status_path(job):
+    return os.path.join(EXPORT_JOBS_DIR, f"{job}.json")
+
+
+def result_path(job):
+    export_format = ExportFormat(job.split("-", 1)[0])
+    return os.path.join(EXPORT_JOBS_DIR, f"{job}.{RESULT_EXTENSIONS[export_format]}")
+
+
+def write_status(job, status, progress=0, error=None):
+    """
+    Атомарно записать состояние задания в файл рядом с результатом.
+    """
+    export_format, version = job.split("-", 1)
+    state = {
+        "id": job,
+        "format": export_format,
+        "version": int(version),
+        "status": ExportJobStatus(status).value,
+        "progress": progress,
+        "error": error,
+        "updated_at": time.time(),
+    }
+    # У каждого потока свой временный файл: состояние одного задания пишут
+    # и обработчик, и его поток heartbeat
+    tmp_path = f"{status_path(job)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, ensure_ascii=False)
+    os.replace(tmp_path, status_path(job))
+    return state
+
+
+def read_status(job):
+    """
+    Прочитать состояние задания.
+
+    Возвращает:
+        dict | None: Состояние задания или None, если задание неизвестно или устарело.
+    """
+    try:
+        with open(status_path(job), encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_stale(state):
+    """
+    Проверить, что незавершённое задание давно не обновлялось.
+
+    Обработчик обновляет состояние не реже раза в HEARTBEAT_SECONDS секунд,
+    поэтому задание без обновлений дольше EXPORT_JOB_STALE_AFTER секунд
+    осталось от завершившегося процесса и никогда не закончится.
+    """
+    return time.time() - state.get("updated_at", 0) > EXPORT_JOB_STALE_AFTER
+
+
+def evict_expired():
+    """
+    Удалить результаты и состояния заданий старше EXPORT_JOB_TTL секунд.
+    """
+    deadline = time.time() - EXPORT_JOB_TTL
+    for entry in os.scandir(EXPORT_JOBS_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < deadline:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn вместо fork: дочерний процесс не наследует потоки, блокировки
+            # и открытые соединения многопоточного процесса uvicorn
+            _executor = ProcessPoolExecutor(
+                max_workers=EXPORT_JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return _executor
+
+
+def init_worker():
+    """
+    Подготовить дочерний процесс: соединения движка открываются заново в самом процессе.
+    """
+    from database.database import engine
+
+    engine.dispose(close=False)
+
+
+def submit_export(export_format, version):
+    """
+    Поставить экспорт в очередь или вернуть уже существующее задание.
+
+    Если для этой версии каталога файл уже сформирован или формируется,
+    новое задание не создаётся. Задание, зависшее в pending/running дольше
+    EXPORT_JOB_STALE_AFTER секунд без обновлений, запускается заново.
+
+    Аргументы:
+        export_format (ExportFormat): Формат экспорта.
+        version (int): Текущая версия каталога.
+
+    Возвращает:
+        dict: Состояние задания.
+    """
+    os.makedirs(EXPORT_JOBS_DIR, exist_ok=True)
+    evict_expired()
+
+    job = job_id(export_format, version)
+    with _lock:
+        state = read_status(job)
+        if state is not None:
+            in_progress = (
+                state["status"] in (ExportJobStatus.PENDING.value, ExportJobStatus.RUNNING.value)
+                and not is_stale(state)
+            )
+            finished = state["status"] == ExportJobStatus.DONE.value and os.path.exists(result_path(job))
+            if in_progress or finished:
+                return state
+
+        state = write_status(job, ExportJobStatus.PENDING)
+        get_executor().submit(run_export_job, job)
+        return state
+
+
+def run_export_job(job):
+    """
+    Сформировать файл экспорта в дочернем процессе.
+
+    Прогресс записывается в файл состояния каждые PROGRESS_EVERY_ROWS строк,
+    а поток heartbeat обновляет состояние каждые HEARTBEAT_SECONDS секунд,
+    в том числе пока reportlab раскладывает страницы. Результат сначала
+    пишется во временный файл и затем атомарно переименовывается.
+
+    Файл формируется на версию каталога из идентификатора задания, а не на
+    текущее состояние: запись, выполненная между постановкой задания в очередь
+    и его запуском, не должна попасть в файл, помеченный прежней версией.
+
+    Аргументы:
+        job (str): Идентификатор задания.
+    """
+    from sqlalchemy import func
+
+    from database.database import SessionLocal
+    from database.history import parts_at
+    from exports import iter_export_rows, render_pdf, write_excel
+
+    export_format, version = job.split("-", 1)
+    export_format, version = ExportFormat(export_format), int(version)
+    tmp_path = result_path(job) + ".tmp"
+    progress = [0]
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(HEARTBEAT_SECONDS):
+            write_status(job, ExportJobStatus.RUNNING, progress=progress[0])
+
+    db = SessionLocal()
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    try:
+        total = db.query(func.count()).select_from(parts_at(version)).scalar() or 1
+        write_status(job, ExportJobStatus.RUNNING)
+        beat.start()
+
+        def tracked_rows():
+            for index, row in enumerate(iter_export_rows(db, version), start=1):
+                if index % PROGRESS_EVERY_ROWS == 0:
+                    progress[0] = min(99, index * 100 // total)
+                    write_status(job, ExportJobStatus.RUNNING, progress=progress[0])
+                yield row
+
+        with open(tmp_path, "wb") as output:
+            if export_format == ExportFormat.PDF:
+                output.write(render_pdf(tracked_rows()))
+            else:
+                write_excel(tracked_rows(), output)
+        os.replace(tmp_path, result_path(job))
+        stop_heartbeat(stopped, beat)
+        write_status(job, ExportJobStatus.DONE, progress=100)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        stop_heartbeat(stopped, beat)
+        write_status(job, ExportJobStatus.FAILED, error=str(e))
+    finally:
+        stop_heartbeat(stopped, beat)
+        db.close()
+
+
+def stop_heartbeat(stopped, beat):
+    """
+    Остановить поток heartbeat до записи итогового состояния,
+    чтобы он не перезаписал done/failed состоянием running.
+    """
+    stopped.set()
+    if beat.is_alive():
+        beat.join()
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database.database import Base, engine
-from routers import parts 
+from database.database import ASYNC_DATABASE, Base, engine
+from database.migrations import upgrade
+from compression import CompressionMiddleware
+from metrics import MetricsMiddleware
+from routers import metrics, parts 
 
 
 
@@ -13,8 +16,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    expose_headers=["X-Next-Cursor", "X-Catalog-Version", "ETag", "Server-Timing"],
 )
+# сжатие ответов для клиентов с Accept-Encoding: gzip; полное дерево
+# отдаётся уже сжатым из кэша и middleware не обрабатывается повторно,
+# файлы xlsx и PDF уже сжаты и передаются как есть
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# внешний слой: длительность запросов, статистика SQL и заголовок Server-Timing
+app.add_middleware(MetricsMiddleware)
 
+app.include_router(metrics.router)
+# асинхронные версии основных эндпоинтов должны быть зарегистрированы первыми,
+# чтобы перекрыть одноимённые синхронные маршруты
+if ASYNC_DATABASE:
+    from routers import parts_async
+    app.include_router(parts_async.router)
 app.include_router(parts.router)
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
+upgrade(engine)
\ No newline at end of file
@@ -0,0 +1,316 @@
+import cProfile
+import contextvars
+import functools
+import inspect
+import io
+import os
+import pstats
+import threading
+import time
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from cache import export_cache, tree_cache
+
+
+# Границы корзин гистограммы длительности запросов, в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Режим профилирования ?profile=1 включается только явно: отчёт раскрывает
+# внутреннее устройство приложения и замедляет запрос
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_REPORT_LINES = int(os.getenv("PROFILE_REPORT_LINES", "60"))
+
+
+class RequestStats:
+    """
+    Статистика SQL-запросов, выполненных при обработке одного HTTP-запроса.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_stats = contextvars.ContextVar("current_stats", default=None)
+current_profiler = contextvars.ContextVar("current_profiler", default=None)
+
+
+class Metrics:
+    """
+    Агрегированные метрики HTTP-запросов в памяти процесса.
+
+    Для каждой пары (метод, шаблон маршрута, статус) хранится гистограмма
+    длительности, для каждого маршрута — число SQL-запросов и время в базе.
+    Шаблон маршрута ("/{part_id}/subtree") используется вместо фактического
+    пути, чтобы число временных рядов не росло с числом деталей.
+    При нескольких процессах uvicorn каждый процесс отдаёт свои метрики.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._db = {}
+
+    def observe(self, method, route, status_code, seconds, stats):
+        """
+        Учесть завершённый запрос.
+
+        Аргументы:
+            method (str): HTTP-метод.
+            route (str): Шаблон маршрута.
+            status_code (int): Код ответа.
+            seconds (float): Длительность обработки.
+            stats (RequestStats): Статистика SQL-запросов.
+        """
+        with self._lock:
+            key = (method, route, str(status_code))
+            series = self._latency.get(key)
+            if series is None:
+                series = self._latency[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+            db_series = self._db.setdefault((method, route), [0, 0.0])
+            db_series[0] += stats.statements
+            db_series[1] += stats.db_seconds
+
+    def render(self):
+        """
+        Сформировать метрики в текстовом формате Prometheus.
+
+        Возвращает:
+            str: Текст для эндпоинта /metrics.
+        """
+        lines = [
+            "# HELP http_request_duration_seconds HTTP request latency.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            latency = {key: ([*value[0]], value[1], value[2]) for key, value in self._latency.items()}
+            db = {key: [*value] for key, value in self._db.items()}
+
+        for (method, route, status_code), (buckets, total, count) in sorted(latency.items()):
+            labels = f'method="{method}",route="{escape_label(route)}",status="{status_code}"'
+            for bound, value in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP db_statements_total SQL statements executed while handling requests.",
+            "# TYPE db_statements_total counter",
+        ]
+        for (method, route), (statements, _) in sorted(db.items()):
+            lines.append(f'db_statements_total{{method="{method}",route="{escape_label(route)}"}} {statements}')
+        lines += [
+            "# HELP db_duration_seconds_total Time spent in SQL statements while handling requests.",
+            "# TYPE db_duration_seconds_total counter",
+        ]
+        for (method, route), (_, seconds) in sorted(db.items()):
+            lines.append(f'db_duration_seconds_total{{method="{method}",route="{escape_label(route)}"}} {seconds:.6f}')
+
+        tree = tree_cache.stats()
+        lines += [
+            "# TYPE tree_cache_hits_total counter",
+            f"tree_cache_hits_total {tree['hits']}",
+            "# TYPE tree_cache_misses_total counter",
+            f"tree_cache_misses_total {tree['misses']}",
+            "# TYPE tree_cache_rebuild_seconds_total counter",
+            f"tree_cache_rebuild_seconds_total {tree['rebuild_seconds_total']:.6f}",
+            "# TYPE export_cache_hits_total counter",
+            f"export_cache_hits_total {export_cache.hits}",
+            "# TYPE export_cache_misses_total counter",
+            f"export_cache_misses_total {export_cache.misses}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    record_statement(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def stop_failed_statement_timer(exception_context):
+    if exception_context.connection is not None:
+        record_statement(exception_context.connection)
+
+
+def record_statement(conn):
+    """
+    Учесть выполненный SQL-запрос в статистике текущего HTTP-запроса.
+
+    Синхронные эндпоинты выполняются в пуле потоков Starlette, асинхронные
+    обращения к базе — в greenlet SQLAlchemy; в обоих случаях контекст
+    запроса (contextvars) наследуется, поэтому статистика попадает
+    в RequestStats именно этого запроса.
+    """
+    started = conn.info.get("statement_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: длительность запросов, статистика SQL и Server-Timing.
+
+    Заголовок Server-Timing добавляется в начало ответа, поэтому для потоковых
+    экспортов он отражает время до первого байта, а гистограмма — полное
+    время передачи ответа. При PROFILING_ENABLED=true и параметре ?profile=1
+    вместо ответа эндпоинта возвращается текстовый отчёт cProfile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if PROFILING_ENABLED and parse_qs(scope.get("query_string", b"").decode()).get("profile") == ["1"]:
+            await self.profile(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                app_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(app_ms, stats).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            route = scope.get("route")
+            metrics.observe(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+                time.perf_counter() - started,
+                stats,
+            )
+
+    async def profile(self, scope, receive, send):
+        """
+        Выполнить запрос под cProfile и вернуть отчёт вместо ответа эндпоинта.
+        """
+        stats = RequestStats()
+        profiler = cProfile.Profile()
+        stats_token = current_stats.set(stats)
+        profiler_token = current_profiler.set(profiler)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            current_stats.reset(stats_token)
+            current_profiler.reset(profiler_token)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        report = io.StringIO()
+        report.write(
+            f"{scope['method']} {scope['path']} -> {status_code}\n"
+            f"total {elapsed_ms:.1f} ms, {stats.statements} SQL statements, "
+            f"{stats.db_seconds * 1000:.1f} ms in database\n\n"
+        )
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+        body = report.getvalue().encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"server-timing", server_timing(elapsed_ms, stats).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def server_timing(app_ms, stats):
+    return f'app;dur={app_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"'
+
+
+def profiled(endpoint):
+    """
+    Обернуть эндпоинт так, чтобы в режиме ?profile=1 он выполнялся под cProfile.
+
+    cProfile профилирует только текущий поток, а синхронные эндпоинты
+    выполняются в пуле потоков, поэтому профилировщик включается внутри
+    самого вызова эндпоинта. Если профилирование не включено в настройках,
+    эндпоинт возвращается без изменений.
+    """
+    if not PROFILING_ENABLED:
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profiler = current_profiler.get()
+            if profiler is None:
+                return await endpoint(*args, **kwargs)
+            profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profiler = current_profiler.get()
+        if profiler is None:
+            return endpoint(*args, **kwargs)
+        return profiler.runcall(endpoint, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Маршрут, эндпоинт которого поддерживает режим профилирования ?profile=1.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
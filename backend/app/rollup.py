@@ -0,0 +1,387 @@
+import itertools
+
+import numpy as np
+from sqlalchemy import bindparam, func, or_, select
+
+from enums import DeletePartResult
+from database.hierarchy import descendants_filter
+from database.links import dag_ancestors, linked_subtrees, links_at
+from database.models import Part, PartLink
+
+
+# id, parent_id, unit_price, quantity, depth
+HIERARCHY_COLUMNS = 5
+
+
+def load_hierarchy(db, condition=None):
+    """
+    Загрузить иерархию деталей в плоские массивы NumPy.
+
+    Родитель, не вошедший в выборку, считается отсутствующим (индекс -1),
+    а деталь, чьи дочерние детали не вошли в выборку, — листом. Текущие
+    ссылки на общие узлы загружаются, если обе детали вошли в выборку.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        condition: Условие выборки деталей (None — весь каталог).
+
+    Возвращает:
+        dict: Массивы одинаковой длины, упорядоченные по id:
+              ids, parent_index (индекс родителя или -1), price, quantity, depth;
+              массивы ссылок link_parent, link_child (индексы) и link_quantity.
+    """
+    query = select(
+        Part.id,
+        func.coalesce(Part.parent_id, 0),
+        func.coalesce(Part.unit_price, 0),
+        func.coalesce(Part.quantity, 0),
+        Part.depth,
+    )
+    if condition is not None:
+        query = query.where(condition)
+    rows = db.execute(query.order_by(Part.id)).all()
+    # fromiter по плоской последовательности значений на порядки быстрее,
+    # чем np.array по списку строк результата
+    data = np.fromiter(
+        itertools.chain.from_iterable(rows), dtype=np.int64, count=len(rows) * HIERARCHY_COLUMNS
+    ).reshape(-1, HIERARCHY_COLUMNS)
+
+    ids, parent_ids = data[:, 0], data[:, 1]
+    links = db.execute(
+        select(PartLink.parent_id, PartLink.child_id, PartLink.quantity).where(links_at())
+    ).all()
+    links = np.array(links, dtype=np.int64).reshape(-1, 3)
+    link_parent, link_child = index_of(ids, links[:, 0]), index_of(ids, links[:, 1])
+    loaded = (link_parent >= 0) & (link_child >= 0)
+    return {
+        "ids": ids,
+        "parent_index": index_of(ids, parent_ids),
+        "price": data[:, 2],
+        "quantity": data[:, 3],
+        "depth": data[:, 4],
+        "link_parent": link_parent[loaded],
+        "link_child": link_child[loaded],
+        "link_quantity": links[loaded, 2],
+    }
+
+
+def index_of(ids, values):
+    """
+    Индексы значений в упорядоченном массиве ids (-1 для отсутствующих).
+    """
+    index = np.searchsorted(ids, values)
+    if not len(ids):
+        return np.full(len(values), -1, dtype=np.int64)
+    index[index == len(ids)] = 0
+    return np.where(ids[index] == values, index, -1)
+
+
+def component_edges(hierarchy):
+    """
+    Рёбра «сборка → комплектующая» иерархии: связи по дереву и ссылки.
+
+    Возвращает:
+        tuple: Массивы users (индекс сборки), components (индекс комплектующей)
+               и quantities (количество комплектующей в единице сборки).
+    """
+    parent_index = hierarchy["parent_index"]
+    inner = np.flatnonzero(parent_index >= 0)
+    return (
+        np.concatenate([parent_index[inner], hierarchy["link_parent"]]),
+        np.concatenate([inner, hierarchy["link_child"]]),
+        np.concatenate([hierarchy["quantity"][inner], hierarchy["link_quantity"]]),
+    )
+
+
+def topological_levels(size, users, components):
+    """
+    Разбить детали на уровни снизу вверх.
+
+    Уровень содержит детали, все комплектующие которых вошли в предыдущие
+    уровни; для дерева это группировка по глубине, для общих узлов — по
+    самому длинному пути до листа. Рёбра группируются по комплектующей
+    (CSR), поэтому каждый уровень обрабатывается векторно.
+
+    Возвращает:
+        List[tuple]: Для каждого уровня: индексы деталей и индексы рёбер,
+                     ведущих от них к сборкам.
+    """
+    pending = np.bincount(users, minlength=size)
+    order = np.argsort(components, kind="stable")
+    starts = np.searchsorted(components[order], np.arange(size + 1))
+    levels = []
+    processed = 0
+    frontier = np.flatnonzero(pending == 0)
+    while len(frontier):
+        counts = starts[frontier + 1] - starts[frontier]
+        offsets = np.repeat(starts[frontier] - np.cumsum(counts) + counts, counts)
+        edges = order[offsets + np.arange(counts.sum())]
+        levels.append((frontier, edges))
+        processed += len(frontier)
+        parents = users[edges]
+        np.subtract.at(pending, parents, 1)
+        parents = np.unique(parents)
+        frontier = parents[pending[parents] == 0]
+    if processed != size:
+        raise ValueError("Иерархия деталей содержит цикл")
+    return levels
+
+
+def compute_rollup(hierarchy, root=None, derived=None, weighted=True):
+    """
+    Рассчитать стоимости поддеревьев с учётом количества за несколько векторных проходов.
+
+    Детали группируются по уровням topological_levels; проход снизу вверх
+    считает стоимость единицы каждой детали (для листа — её цена, для
+    сборки — сумма стоимостей комплектующих, умноженных на их количество)
+    и число комплектующих-листьев в единице детали. Общий узел, входящий
+    в несколько сборок, рассчитывается один раз, а его стоимость
+    переиспользуется всеми сборками. Проход сверху вниз считает развёрнутое
+    количество — сколько единиц детали входит в корни — и уровень детали
+    (самое глубокое из вхождений). Число проходов равно числу уровней,
+    а не числу деталей.
+
+    Аргументы:
+        hierarchy (dict): Массивы load_hierarchy.
+        root (int | None): Индекс детали, для одной единицы которой считается
+            развёрнутое количество (None — корни каталога со своим количеством).
+        derived (np.ndarray | None): Маска деталей, стоимость которых считается
+            по комплектующим (тогда при их отсутствии она равна 0); остальные
+            детали учитываются со своей ценой. None — все сборки.
+        weighted (bool): Умножать стоимость комплектующих на количество
+            (False — простая сумма цен, как в режиме ROLLUP_MODE=sum).
+
+    Возвращает:
+        dict: Массивы unit_cost, components, exploded_quantity, level, has_children.
+    """
+    parent_index = hierarchy["parent_index"]
+    price = hierarchy["price"]
+    size = len(price)
+    users, components_index, quantities = component_edges(hierarchy)
+    weights = quantities if weighted else np.ones(len(quantities), dtype=np.int64)
+
+    has_children = np.bincount(users, minlength=size) > 0
+    is_derived = has_children if derived is None else derived
+    levels = topological_levels(size, users, components_index)
+
+    unit_cost = np.zeros(size, dtype=np.int64)
+    components = np.zeros(size, dtype=np.int64)
+    children_cost = np.zeros(size, dtype=np.int64)
+    children_components = np.zeros(size, dtype=np.int64)
+    for nodes, edges in levels:
+        unit_cost[nodes] = np.where(is_derived[nodes], children_cost[nodes], price[nodes])
+        components[nodes] = np.where(is_derived[nodes], children_components[nodes], 1)
+        targets, sources = users[edges], components_index[edges]
+        np.add.at(children_cost, targets, weights[edges] * unit_cost[sources])
+        np.add.at(children_components, targets, quantities[edges] * components[sources])
+
+    if root is None:
+        exploded_quantity = np.where(parent_index < 0, hierarchy["quantity"], 0)
+    else:
+        exploded_quantity = np.zeros(size, dtype=np.int64)
+        exploded_quantity[root] = 1
+    level = np.zeros(size, dtype=np.int64)
+    for nodes, edges in reversed(levels):
+        targets, sources = components_index[edges], users[edges]
+        np.add.at(exploded_quantity, targets, quantities[edges] * exploded_quantity[sources])
+        np.maximum.at(level, targets, level[sources] + 1)
+
+    return {
+        "unit_cost": unit_cost,
+        "components": components,
+        "exploded_quantity": exploded_quantity,
+        "level": level,
+        "has_children": has_children,
+    }
+
+
+def level_aggregates(hierarchy, rollup):
+    """
+    Агрегаты по уровням иерархии.
+
+    Аргументы:
+        hierarchy (dict): Массивы load_hierarchy.
+        rollup (dict): Результат compute_rollup; уровень 0 — корни расчёта.
+
+    Возвращает:
+        List[dict]: Для каждого уровня: число деталей и листьев, развёрнутое
+                    количество и стоимость листьев с учётом развёрнутого количества.
+    """
+    depth = rollup["level"]
+    if not len(depth):
+        return []
+    leaves = ~rollup["has_children"]
+    exploded = rollup["exploded_quantity"]
+    minlength = int(depth.max()) + 1
+    parts = np.bincount(depth, minlength=minlength)
+    leaf_counts = np.bincount(depth, weights=leaves, minlength=minlength)
+    exploded_by_level = np.zeros(minlength, dtype=np.int64)
+    np.add.at(exploded_by_level, depth, exploded)
+    extended_cost = np.zeros(minlength, dtype=np.int64)
+    np.add.at(extended_cost, depth, np.where(leaves, exploded * hierarchy["price"], 0))
+    return [
+        {
+            "depth": level,
+            "parts": int(parts[level]),
+            "leaves": int(leaf_counts[level]),
+            "exploded_quantity": int(exploded_by_level[level]),
+            "extended_cost": int(extended_cost[level]),
+        }
+        for level in range(minlength)
+        if parts[level]
+    ]
+
+
+def rollup_items(db, hierarchy, rollup, indices, quantities=None):
+    """
+    Сводка по отдельным деталям: стоимость единицы, позиции и число комплектующих.
+
+    quantities задаёт количество для вхождений по ссылкам; по умолчанию
+    берётся количество детали в её сборке по дереву.
+    """
+    ids = [int(part_id) for part_id in hierarchy["ids"][indices]]
+    names = dict(db.query(Part.id, Part.name).filter(Part.id.in_(ids)).all()) if ids else {}
+    if quantities is None:
+        quantities = hierarchy["quantity"][indices]
+    return [
+        {
+            "id": part_id,
+            "name": names.get(part_id),
+            "quantity": int(quantity),
+            "unit_cost": int(rollup["unit_cost"][index]),
+            "total_cost": int(quantity * rollup["unit_cost"][index]),
+            "components": int(rollup["components"][index]),
+        }
+        for part_id, index, quantity in zip(ids, indices, quantities)
+    ]
+
+
+def catalog_rollup(db):
+    """
+    Рассчитать сводку стоимости всего каталога.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        dict: Число деталей, сводка по корневым деталям и агрегаты по уровням.
+    """
+    hierarchy = load_hierarchy(db)
+    rollup = compute_rollup(hierarchy)
+    roots = np.flatnonzero(hierarchy["parent_index"] < 0)
+    return {
+        "parts": len(hierarchy["ids"]),
+        "roots": rollup_items(db, hierarchy, rollup, roots),
+        "levels": level_aggregates(hierarchy, rollup),
+    }
+
+
+def part_rollup(db, part_id):
+    """
+    Рассчитать сводку стоимости одной единицы детали.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        part_id (int): Идентификатор детали.
+
+    Возвращает:
+        dict: Сводка по детали, по её дочерним деталям и по уровням поддерева
+              (уровень 0 — сама деталь).
+        DeletePartResult.NOT_FOUND: Если деталь не найдена.
+    """
+    root = db.query(Part.path).filter(Part.id == part_id).first()
+    if root is None:
+        return DeletePartResult.NOT_FOUND
+
+    paths = linked_subtrees(db, root.path)
+    hierarchy = load_hierarchy(db, or_(*(descendants_filter(path, include_self=True) for path in paths)))
+    root_index = int(np.searchsorted(hierarchy["ids"], part_id))
+    rollup = compute_rollup(hierarchy, root=root_index)
+    users, components, quantities = component_edges(hierarchy)
+    children = users == root_index
+    return {
+        **rollup_items(db, hierarchy, rollup, [root_index], [1])[0],
+        "children": rollup_items(db, hierarchy, rollup, components[children], quantities[children]),
+        "levels": level_aggregates(hierarchy, rollup),
+    }
+
+
+def recompute_prices(db, parent_ids, weighted=True):
+    """
+    Пересчитать цены сборок после изменения дочерних деталей.
+
+    Замена update_ancestors_prices в режиме ROLLUP_MODE=weighted и при наличии
+    общих узлов. Загружаются только сборки, зависящие от изменённых родителей
+    (по дереву и по ссылкам), и их непосредственные комплектующие: цены
+    остальных деталей уже согласованы, поэтому комплектующие вне этого
+    множества учитываются как листья со своей ценой. Стоимость пересчитывается
+    векторно, общий узел — один раз для всех сборок; в базу пакетным UPDATE
+    записываются только изменившиеся цены. Родители, у которых не осталось
+    дочерних деталей, получают цену 0, как и в режиме sum. Фиксация транзакции
+    остаётся за вызывающим кодом.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        parent_ids (Iterable[int]): Родители, у которых изменился состав или цены детей.
+        weighted (bool): Учитывать количество (False — сумма цен, режим sum).
+
+    Возвращает:
+        List[int]: id деталей, цены которых изменились.
+    """
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id}
+    if not parent_ids:
+        return []
+
+    db.flush()
+    affected = list(dag_ancestors(db, parent_ids))
+    linked = select(PartLink.child_id).where(links_at(), PartLink.parent_id.in_(affected))
+    hierarchy = load_hierarchy(
+        db, or_(Part.id.in_(affected), Part.parent_id.in_(affected), Part.id.in_(linked))
+    )
+    return write_prices(db, hierarchy, np.isin(hierarchy["ids"], affected), weighted)
+
+
+def recompute_all_prices(db):
+    """
+    Пересчитать цены всех сборок каталога с учётом количества.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        List[int]: id деталей, цены которых изменились.
+    """
+    return write_prices(db, load_hierarchy(db))
+
+
+def write_prices(db, hierarchy, derived=None, weighted=True):
+    """
+    Записать в базу рассчитанные цены сборок, отличающиеся от сохранённых.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        hierarchy (dict): Массивы load_hierarchy.
+        derived (np.ndarray | None): Маска деталей, цена которых считается по
+            комплектующим даже при их отсутствии (None — все сборки).
+        weighted (bool): Учитывать количество комплектующих.
+
+    Возвращает:
+        List[int]: id деталей, цены которых изменились.
+    """
+    rollup = compute_rollup(hierarchy, derived=derived, weighted=weighted)
+    if derived is None:
+        derived = rollup["has_children"]
+    changed = np.flatnonzero(derived & (rollup["unit_cost"] != hierarchy["price"]))
+    values = [
+        {"part_id": int(hierarchy["ids"][index]), "new_price": int(rollup["unit_cost"][index])}
+        for index in changed
+    ]
+    if values:
+        table = Part.__table__
+        db.execute(
+            table.update()
+            .where(table.c.id == bindparam("part_id"))
+            .values(unit_price=bindparam("new_price")),
+            values,
+        )
+    return [value["part_id"] for value in values]
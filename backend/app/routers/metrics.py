@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Response, status
+
+from metrics import metrics
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+def get_metrics():
+    """
+    Получить метрики приложения в текстовом формате Prometheus.
+
+    Возвращает:
+        Response: Гистограммы длительности запросов по маршрутам, число SQL-запросов
+                  и время в базе по маршрутам, счётчики кэшей дерева и экспорта.
+    """
+    return Response(
+        content=metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,36 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.platypus import Paragraph
-import pandas as pd
+from typing import List, Optional
+from datetime import datetime
+import asyncio
 import io
+import json
 import os
 
-from enums import DeletePartResult
-from utils import flattern_parts
+from enums import DeletePartResult, ExportFormat, ExportJobStatus
+from utils import dump_tree_json, parse_import_file
+from metrics import ProfiledRoute
+from cache import accepts_gzip, export_cache, is_not_modified, make_etag, representation_etag, tree_cache
+from exports import build_pdf, stream_csv, stream_excel, stream_ndjson
+from jobs import RESULT_EXTENSIONS, RESULT_MEDIA_TYPES, is_valid_job_id, read_status, result_path, submit_export
 from database import crud
-from database.database import get_db
+from database.database import SessionLocal, get_db
 from schemas import (
+    BulkImport,
+    CatalogRollup,
+    BulkImportResult,
+    ExportJobCreate,
+    ExportJobOut,
     PartCreate,
+    PartImport,
+    PartChanges,
+    PartLinkCreate,
+    PartDeleteOut,
+    PartMutationOut,
+    PartBatchUpdate,
+    PartMove,
     PartOut, 
-    PartUpdate
+    PartRollup,
+    PartSearchResult,
+    PartUpdate,
+    SnapshotCreate,
+    SnapshotOut,
+    WhereUsed
 )
 
 
 
-router = APIRouter(tags=["Parts"])
+router = APIRouter(tags=["Parts"], route_class=ProfiledRoute)
+
+CHANGES_POLL_SECONDS = 1.0
 
 
 @router.get("/", status_code=status.HTTP_200_OK, response_model=List[PartOut])
-def get_all_parts(db: Session = Depends(get_db)):
+def get_all_parts(
+    request: Request,
+    parent_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, pattern=crud.CHILDREN_CURSOR_PATTERN),
+    snapshot: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
     """
     Получить все детали в виде иерархического дерева.
 
@@ -38,15 +65,55 @@ def get_all_parts(db: Session = Depends(get_db)):
     где детали без родителя находятся на верхнем уровне, а каждая деталь может иметь
     вложенные дочерние элементы.
 
+    Если указан parent_id или limit, включается ленивый режим: возвращается одна
+    страница непосредственных дочерних деталей parent_id (или корневых деталей)
+    без вложенных элементов, но с количеством дочерних элементов children_count.
+    Курсор следующей страницы передаётся в заголовке X-Next-Cursor.
+
+    Полное дерево отдаётся из кэша версии каталога уже сериализованным в JSON
+    (при Accept-Encoding: gzip — сжатым) со строгим ETag; при совпадении
+    If-None-Match возвращается 304 Not Modified. Версия каталога передаётся
+    в заголовке X-Catalog-Version для последующих запросов GET /changes.
+
+    С параметром snapshot или as_of возвращается полное дерево каталога
+    в состоянии на версию снимка или на указанный момент времени.
+
     Аргументы:
+        parent_id (int | None): Родитель, дочерние детали которого нужно получить.
+        limit (int | None): Размер страницы в ленивом режиме (по умолчанию 100).
+        cursor (str | None): Значение X-Next-Cursor предыдущей страницы.
+        snapshot (int | None): Идентификатор снимка каталога.
+        as_of (datetime | None): Момент времени (без часового пояса — UTC).
         db (Session): Сессия базы данных, предоставляемая зависимостью.
 
     Возвращает:
-        List[PartOut]: Список всех деталей в иерархической структуре.
+        List[PartOut]: Список всех деталей в иерархической структуре
+                       или страница дочерних деталей в ленивом режиме.
     """
 
     try:
-        return crud.get_tree(db)
+        version = snapshot_version(db, snapshot, as_of)
+        if version is not None:
+            if parent_id is not None or limit is not None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Снимок каталога доступен только для полного дерева"
+                )
+            etag = tree_etag(request, version)
+            if is_not_modified(request, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            return tree_response(request, version, etag, dump_tree_json(crud.get_tree(db, version)))
+
+        if parent_id is None and limit is None:
+            version, _, body = tree_cache.get(db)
+            etag = tree_etag(request, version)
+            if is_not_modified(request, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            return tree_response(request, version, etag, body)
+
+        page, next_cursor = crud.get_children_page(db, parent_id, limit or 100, cursor)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else None
+        return ORJSONResponse(page, headers=headers)
     except SQLAlchemyError:
         raise HTTPException(
             status_code=500,
@@ -54,7 +121,286 @@ def get_all_parts(db: Session = Depends(get_db)):
         )
     
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=PartOut)
+@router.get("/cache/stats", status_code=status.HTTP_200_OK)
+def get_cache_stats():
+    """
+    Получить метрики кэша дерева деталей текущего процесса.
+
+    Возвращает:
+        dict: Количество попаданий и промахов кэша и время его перестроений.
+    """
+    return tree_cache.stats()
+
+
+@router.get("/changes", status_code=status.HTTP_200_OK, response_model=PartChanges)
+def get_changes(since: int = Query(..., ge=0), db: Session = Depends(get_db)):
+    """
+    Получить изменения каталога после указанной версии.
+
+    Клиент, получивший дерево с заголовком X-Catalog-Version, может запрашивать
+    только изменённые с тех пор детали вместо повторной загрузки всего дерева.
+
+    Аргументы:
+        since (int): Версия каталога, уже известная клиенту.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        PartChanges: Текущая версия, изменённые детали и id удалённых деталей.
+    """
+    try:
+        return ORJSONResponse(crud.get_changes(db, since))
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при получении данных с базы данных"
+        )
+
+
+@router.get("/changes/stream", status_code=status.HTTP_200_OK)
+def stream_changes(request: Request, since: int = Query(..., ge=0)):
+    """
+    Получать изменения каталога потоком Server-Sent Events.
+
+    Каждое событие changes содержит JSON в формате PartChanges; события
+    отправляются только при появлении новых версий каталога.
+
+    Аргументы:
+        since (int): Версия каталога, уже известная клиенту.
+
+    Возвращает:
+        StreamingResponse: Поток text/event-stream.
+    """
+    return StreamingResponse(
+        iter_change_events(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+async def iter_change_events(request: Request, since: int):
+    while not await request.is_disconnected():
+        changes = await run_in_threadpool(load_changes, since)
+        if changes["version"] > since:
+            since = changes["version"]
+            yield f"event: changes\ndata: {json.dumps(changes, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(CHANGES_POLL_SECONDS)
+
+
+def load_changes(since):
+    db = SessionLocal()
+    try:
+        return crud.get_changes(db, since)
+    finally:
+        db.close()
+
+
+@router.post("/snapshots", status_code=status.HTTP_201_CREATED, response_model=SnapshotOut)
+def create_snapshot(snapshot: SnapshotCreate, db: Session = Depends(get_db)):
+    """
+    Создать снимок текущего состояния каталога.
+
+    Снимок закрепляет текущую версию каталога и не копирует детали:
+    прошлые состояния деталей сохраняются в истории при их изменении.
+    Идентификатор снимка передаётся параметром snapshot в GET / и экспорты.
+
+    Аргументы:
+        snapshot (SnapshotCreate): Название снимка.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        SnapshotOut: Созданный снимок.
+    """
+    try:
+        return crud.create_snapshot(db, snapshot.name)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при создании снимка"
+        )
+
+
+@router.get("/snapshots", status_code=status.HTTP_200_OK, response_model=List[SnapshotOut])
+def get_snapshots(db: Session = Depends(get_db)):
+    """
+    Получить список снимков каталога.
+
+    Аргументы:
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        List[SnapshotOut]: Снимки в порядке создания.
+    """
+    try:
+        return crud.get_snapshots(db)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при получении данных с базы данных"
+        )
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=List[PartSearchResult])
+def search_parts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(crud.SEARCH_DEFAULT_LIMIT, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """
+    Найти детали по наименованию.
+
+    Каждое слово запроса ищется как начало слова наименования без учёта регистра.
+    Для каждой найденной детали возвращается цепочка предков от корня,
+    по которой клиент может раскрыть дерево до найденной детали.
+
+    Аргументы:
+        q (str): Строка поиска.
+        limit (int): Максимальное количество результатов.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        List[PartSearchResult]: Найденные детали с предками, по убыванию релевантности.
+    """
+    try:
+        return ORJSONResponse(crud.search_parts(db, q, limit))
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при поиске деталей"
+        )
+
+
+@router.get("/rollup", status_code=status.HTTP_200_OK, response_model=CatalogRollup)
+def get_catalog_rollup(request: Request, db: Session = Depends(get_db)):
+    """
+    Получить сводку стоимости каталога с учётом количества.
+
+    Стоимость единицы сборки считается как сумма стоимостей дочерних деталей,
+    умноженных на их количество, независимо от сохранённых цен сборок.
+    Для каждого уровня иерархии возвращаются число деталей, развёрнутое
+    количество и стоимость комплектующих. Ответ помечается ETag версии каталога.
+
+    Аргументы:
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        CatalogRollup: Сводка по корневым деталям и уровням.
+    """
+    # модуль расчёта вместе с NumPy загружается при первом обращении,
+    # а не при запуске каждого процесса
+    from rollup import catalog_rollup
+
+    try:
+        version = crud.get_version(db)
+        etag = representation_etag(request, "rollup", version)
+        if is_not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        summary = catalog_rollup(db)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при расчёте стоимости"
+        )
+    return ORJSONResponse({"version": version, **summary}, headers={"ETag": etag})
+
+
+@router.get("/{part_id}/rollup", status_code=status.HTTP_200_OK, response_model=PartRollup)
+def get_part_rollup(part_id: int, db: Session = Depends(get_db)):
+    """
+    Получить сводку стоимости одной единицы детали с учётом количества.
+
+    Аргументы:
+        part_id (int): Идентификатор детали.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        PartRollup: Стоимость и число комплектующих детали, сводка по дочерним
+                    деталям и по уровням поддерева (уровень 0 — сама деталь).
+    """
+    from rollup import part_rollup
+
+    try:
+        summary = part_rollup(db, part_id)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при расчёте стоимости"
+        )
+
+    if summary == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Деталь не найдена"
+        )
+    return ORJSONResponse(summary)
+
+
+@router.get("/{part_id}/where-used", status_code=status.HTTP_200_OK, response_model=WhereUsed)
+def get_where_used(part_id: int, db: Session = Depends(get_db)):
+    """
+    Получить сборки, в которые входит деталь.
+
+    Аргументы:
+        part_id (int): Идентификатор детали.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        WhereUsed: Непосредственные сборки (по дереву и по ссылкам общего узла)
+                   и все сборки, включающие деталь прямо или косвенно.
+    """
+    try:
+        usage = crud.where_used(db, part_id)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при получении данных с базы данных"
+        )
+
+    if usage == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Деталь не найдена"
+        )
+    return ORJSONResponse(usage)
+
+
+@router.get("/{part_id}/subtree", status_code=status.HTTP_200_OK, response_model=PartOut)
+def get_subtree(
+    part_id: int,
+    depth: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Получить поддерево детали.
+
+    Возвращает деталь и её потомков до указанной глубины. У деталей на границе
+    глубины список children пуст, а children_count показывает, сколько у них
+    дочерних элементов.
+
+    Аргументы:
+        part_id (int): Идентификатор корня поддерева.
+        depth (int | None): Глубина относительно корня (0 — только сама деталь).
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        PartOut: Поддерево детали.
+    """
+    try:
+        subtree = crud.get_subtree(db, part_id, depth)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при получении данных с базы данных"
+        )
+
+    if subtree == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Деталь не найдена"
+        )
+    return Response(content=dump_tree_json(subtree), media_type="application/json")
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=PartMutationOut)
 def create_part(part: PartCreate, db: Session = Depends(get_db)):
     """
     Создать новую деталь.
@@ -68,10 +414,13 @@ def create_part(part: PartCreate, db: Session = Depends(get_db)):
         db (Session): Сессия базы данных, предоставляемая зависимостью.
 
     Возвращает:
-        PartOut: Объект созданной детали.
+        PartMutationOut: Объект созданной детали и изменения каталога
+                         (сама деталь и предки с пересчитанными ценами).
     """
     try: 
         new_part = crud.create_part(db, part)
+        if new_part != DeletePartResult.EXISTS:
+            return to_mutation_out(db, new_part)
     except SQLAlchemyError: 
         raise HTTPException(
             status_code=500,
@@ -83,22 +432,84 @@ def create_part(part: PartCreate, db: Session = Depends(get_db)):
             status_code=400, 
             detail="Деталь с таким именем уже существует"
         )
-    
-    total_price = new_part.unit_price * new_part.quantity
-    return PartOut(
-            id=new_part.id,
-            name=new_part.name,
-            unit_price=new_part.unit_price,
-            quantity=new_part.quantity,
-            parent_id=new_part.parent_id,
-            total_price=total_price,
-            children=[]
-        ) 
 
 
 
 
-@router.put("/{part_id}", status_code=status.HTTP_200_OK, response_model=PartOut)
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, response_model=BulkImportResult)
+def bulk_create_parts(bulk: BulkImport, db: Session = Depends(get_db)):
+    """
+    Пакетно создать детали.
+
+    Принимает вложенное дерево деталей и/или плоский список строк со ссылками
+    на родителя по временному идентификатору (ref/parent_ref) или иерархическому
+    номеру (number). Весь пакет проверяется до вставки и создаётся одной транзакцией,
+    цены предков пересчитываются один раз.
+
+    Аргументы:
+        bulk (BulkImport): Импортируемые детали, родитель для корневых строк
+                           и признак пропуска ошибочных строк.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        BulkImportResult: Количество созданных деталей и ошибки по строкам.
+    """
+    return run_bulk_import(db, bulk.parts, bulk.parent_id, bulk.skip_errors)
+
+
+@router.post("/bulk/upload", status_code=status.HTTP_201_CREATED, response_model=BulkImportResult)
+def upload_parts(
+    file: UploadFile = File(...),
+    parent_id: Optional[int] = None,
+    skip_errors: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Пакетно создать детали из CSV или XLSX файла в формате экспорта в Excel.
+
+    Аргументы:
+        file (UploadFile): Файл .csv или .xlsx со столбцами "Наименование", "Цена", "Количество".
+        parent_id (int | None): Деталь, к которой подключаются корневые строки файла.
+        skip_errors (bool): Создать корректные строки, пропустив ошибочные.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        BulkImportResult: Количество созданных деталей и ошибки по строкам.
+    """
+    try:
+        rows = parse_import_file(file.filename or "", file.file.read())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    parts = [PartImport(**row) for row in rows]
+    return run_bulk_import(db, parts, parent_id, skip_errors)
+
+
+def run_bulk_import(db: Session, parts, parent_id, skip_errors):
+    try:
+        result = crud.bulk_create_parts(db, parts, parent_id, skip_errors)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при пакетном создании деталей"
+        )
+
+    if result == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Родительская деталь не найдена"
+        )
+    if result["errors"] and not skip_errors:
+        raise HTTPException(
+            status_code=400,
+            detail=result["errors"]
+        )
+    return result
+
+
+@router.put("/{part_id}", status_code=status.HTTP_200_OK, response_model=PartMutationOut)
 def edit_part(part_id: int, part_update: PartUpdate, db: Session = Depends(get_db)):
     """
     Редактировать существующую деталь.
@@ -112,55 +523,216 @@ def edit_part(part_id: int, part_update: PartUpdate, db: Session = Depends(get_d
         db (Session): Сессия базы данных.
 
     Возвращает:
-        PartOut: Обновлённая деталь.
+        PartMutationOut: Обновлённая деталь и изменения каталога
+                         (сама деталь и предки с пересчитанными ценами).
     """
     try:
         updated_part = crud.edit_part(db, part_id, part_update)
+        if not isinstance(updated_part, DeletePartResult):
+            return to_mutation_out(db, updated_part)
     except SQLAlchemyError:
         raise HTTPException(
             status_code=500,
             detail="Ошибка сервера при редактировании детали"
         )
-    
-    if updated_part == DeletePartResult.NOT_FOUND:
+
+    raise_edit_error(updated_part)
+
+
+@router.patch("/batch", status_code=status.HTTP_200_OK, response_model=PartChanges)
+def edit_parts(part_updates: List[PartBatchUpdate], db: Session = Depends(get_db)):
+    """
+    Отредактировать несколько деталей одной транзакцией.
+
+    Изменения применяются по порядку; цены всех затронутых предков
+    пересчитываются один раз. Если хотя бы одно изменение недопустимо,
+    не применяется ни одно.
+
+    Аргументы:
+        part_updates (List[PartBatchUpdate]): Изменения с идентификаторами деталей.
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        PartChanges: Изменения каталога (изменённые детали и предки с пересчитанными ценами).
+    """
+    if not part_updates:
+        return crud.get_changes(db, crud.get_version(db))
+
+    try:
+        result, part_id = crud.edit_parts(db, part_updates)
+        if result == DeletePartResult.SUCCESS:
+            version = db.info["catalog_version"]
+            return crud.get_changes(db, version - 1, version)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при редактировании деталей"
+        )
+
+    raise_edit_error(result, part_id)
+
+
+@router.post("/{part_id}/move", status_code=status.HTTP_200_OK, response_model=PartMutationOut)
+def move_part(part_id: int, move: PartMove, db: Session = Depends(get_db)):
+    """
+    Переместить деталь вместе со всем поддеревом под нового родителя.
+
+    Аргументы:
+        part_id (int): Идентификатор перемещаемой детали.
+        move (PartMove): Новый родитель (null — перенести в корень).
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        PartMutationOut: Перемещённая деталь и изменения каталога.
+    """
+    try:
+        moved_part = crud.move_part(db, part_id, move.parent_id)
+        if not isinstance(moved_part, DeletePartResult):
+            return to_mutation_out(db, moved_part)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при перемещении детали"
+        )
+
+    raise_edit_error(moved_part)
+
+
+def raise_edit_error(result, part_id=None):
+    """
+    Преобразовать результат неудачного редактирования в HTTPException.
+
+    Аргументы:
+        result (DeletePartResult): Результат операции crud.
+        part_id (int | None): Деталь пакета, на которой произошла ошибка.
+    """
+    suffix = f" (id={part_id})" if part_id is not None else ""
+    if result == DeletePartResult.NOT_FOUND:
         raise HTTPException(
             status_code=404,
-            detail="Деталь не найдена"
+            detail="Деталь не найдена" + suffix
         )
-    
-    total_price = updated_part.unit_price * updated_part.quantity
-    return PartOut(
-        id=updated_part.id,
-        name=updated_part.name,
-        unit_price=updated_part.unit_price,
-        quantity=updated_part.quantity,
-        parent_id=updated_part.parent_id,
-        total_price=total_price,
-        children=[]
-    )
+    if result == DeletePartResult.EXISTS:
+        raise HTTPException(
+            status_code=400,
+            detail="Деталь с таким именем уже существует" + suffix
+        )
+    if result == DeletePartResult.CYCLE:
+        raise HTTPException(
+            status_code=400,
+            detail="Нельзя переместить деталь внутрь её собственного поддерева" + suffix
+        )
+
+
+
+@router.post("/{part_id}/links", status_code=status.HTTP_201_CREATED, response_model=PartChanges)
+def create_link(part_id: int, link: PartLinkCreate, db: Session = Depends(get_db)):
+    """
+    Добавить деталь в сборку как общий узел.
+
+    Деталь со своим поддеревом остаётся в одном экземпляре и дополнительно
+    входит в сборку parent_id с указанным количеством.
+
+    Аргументы:
+        part_id (int): Идентификатор общей детали.
+        link (PartLinkCreate): Сборка и количество детали в ней.
+        db (Session): Сессия базы данных.
 
+    Возвращает:
+        PartChanges: Изменения каталога (сборка и её потребители с пересчитанными ценами).
+    """
+    try:
+        result = crud.create_link(db, part_id, link.parent_id, link.quantity)
+        if not isinstance(result, DeletePartResult):
+            version = db.info["catalog_version"]
+            return crud.get_changes(db, version - 1, version)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при добавлении детали в сборку"
+        )
+
+    if result == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Деталь или сборка не найдена"
+        )
+    if result == DeletePartResult.EXISTS:
+        raise HTTPException(
+            status_code=400,
+            detail="Деталь уже входит в эту сборку"
+        )
+    if result == DeletePartResult.CYCLE:
+        raise HTTPException(
+            status_code=400,
+            detail="Нельзя добавить деталь в сборку, которая сама входит в эту деталь"
+        )
+
+
+@router.delete("/{part_id}/links/{parent_id}", status_code=status.HTTP_200_OK, response_model=PartChanges)
+def delete_link(part_id: int, parent_id: int, db: Session = Depends(get_db)):
+    """
+    Исключить общую деталь из сборки.
+
+    Аргументы:
+        part_id (int): Идентификатор общей детали.
+        parent_id (int): Идентификатор сборки.
+        db (Session): Сессия базы данных.
+
+    Возвращает:
+        PartChanges: Изменения каталога (сборка и её потребители с пересчитанными ценами).
+    """
+    try:
+        result = crud.delete_link(db, part_id, parent_id)
+        if result == DeletePartResult.SUCCESS:
+            version = db.info["catalog_version"]
+            return crud.get_changes(db, version - 1, version)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при исключении детали из сборки"
+        )
 
+    raise HTTPException(
+        status_code=404,
+        detail="Деталь не входит в эту сборку"
+    )
 
-@router.delete("/{part_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_part(part_id: int, db: Session = Depends(get_db)):
+
+@router.delete("/{part_id}", status_code=status.HTTP_200_OK, response_model=PartDeleteOut)
+def delete_part(
+    part_id: int,
+    cascade: bool = Query(False, description="Удалить деталь вместе со всеми потомками"),
+    db: Session = Depends(get_db),
+):
     """
     Удалить деталь.
 
     Проверяет наличие детали и наличие дочерних элементов.
     Если деталь существует и не имеет дочерних элементов, удаляет её из базы данных
-    и обновляет цену родительской детали.
+    и обновляет цену родительской детали. С cascade=true удаляется всё поддерево.
 
     Аргументы:
         part_id (int): Идентификатор детали для удаления.
+        cascade (bool): Удалять ли деталь вместе с потомками.
         db (Session): Сессия базы данных, предоставляемая зависимостью.
 
     Возвращает:
-        204 No Content, если удаление прошло успешно
+        PartDeleteOut: Изменения каталога (удалённые детали и предки с пересчитанными ценами)
+                       и количество удалённых деталей
         404 Not Found, если деталь не найдена
-        400 Bad Request, если деталь имеет дочерние элементы
+        400 Bad Request, если деталь имеет дочерние элементы и cascade не указан
     """
     try: 
-        result = crud.delete_part(db, part_id)
+        if cascade:
+            result = crud.delete_subtree(db, part_id)
+            removed = result
+        else:
+            result = crud.delete_part(db, part_id)
+            removed = 1
+        if not isinstance(result, DeletePartResult) or result == DeletePartResult.SUCCESS:
+            version = db.info["catalog_version"]
+            return PartDeleteOut(**crud.get_changes(db, version - 1, version), removed=removed)
     except SQLAlchemyError:
         raise HTTPException(
             status_code=500,
@@ -181,95 +753,140 @@ def delete_part(part_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/export/excel", status_code=status.HTTP_200_OK)
-def export_excel(db: Session = Depends(get_db)):
+def export_excel(
+    request: Request,
+    snapshot: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
     """
     Экспортировать все детали в Excel файл.
 
-    Извлекает все детали из базы данных, строит иерархическую структуру
-    и экспортирует её в Excel файл.
+    Детали читаются из базы порциями в иерархическом порядке и записываются
+    в книгу openpyxl в режиме write-only, файл отдаётся клиенту порциями.
+
+    Аргументы:
+        snapshot (int | None): Идентификатор снимка каталога.
+        as_of (datetime | None): Момент времени (без часового пояса — UTC).
 
     Возвращает:
         StreamingResponse: Excel файл с экспортированными данными
+        304 Not Modified, если If-None-Match совпадает с ETag текущей версии
     """
-    try: 
-        parts = crud.get_tree(db)
-        rows = flattern_parts(parts)
-        df = pd.DataFrame(rows)
+    return streaming_export(
+        request, db, snapshot, as_of, "excel", stream_excel,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename="parts.xlsx",
+    )
 
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Parts")
 
-        output.seek(0)
-        return StreamingResponse(
-            output, 
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=parts.xlsx"}
-        )
+@router.get("/export/csv", status_code=status.HTTP_200_OK)
+def export_csv(
+    request: Request,
+    snapshot: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Экспортировать все детали в CSV файл с теми же столбцами, что и Excel.
+
+    Аргументы:
+        snapshot (int | None): Идентификатор снимка каталога.
+        as_of (datetime | None): Момент времени (без часового пояса — UTC).
+
+    Возвращает:
+        StreamingResponse: CSV файл, передаваемый по мере чтения деталей из базы
+        304 Not Modified, если If-None-Match совпадает с ETag текущей версии
+    """
+    return streaming_export(
+        request, db, snapshot, as_of, "csv", stream_csv,
+        media_type="text/csv; charset=utf-8",
+        filename="parts.csv",
+    )
+
+
+@router.get("/export/ndjson", status_code=status.HTTP_200_OK)
+def export_ndjson(
+    request: Request,
+    snapshot: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Экспортировать все детали в формате NDJSON для машинной обработки.
+
+    Аргументы:
+        snapshot (int | None): Идентификатор снимка каталога.
+        as_of (datetime | None): Момент времени (без часового пояса — UTC).
+
+    Возвращает:
+        StreamingResponse: По одному JSON-объекту детали на строку
+        304 Not Modified, если If-None-Match совпадает с ETag текущей версии
+    """
+    return streaming_export(
+        request, db, snapshot, as_of, "ndjson", stream_ndjson,
+        media_type="application/x-ndjson",
+        filename="parts.ndjson",
+    )
+
+
+def streaming_export(request: Request, db: Session, snapshot, as_of, kind, stream, media_type, filename):
+    try:
+        version = snapshot_version(db, snapshot, as_of)
+        etag = representation_etag(request, kind, crud.get_version(db) if version is None else version, media_type)
     except SQLAlchemyError:
         raise HTTPException(
             status_code=500,
-            detail="Ошибка сервера при экспорте данных в Excel"
+            detail="Ошибка сервера при экспорте данных"
         )
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return StreamingResponse(
+        stream(version),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}", "ETag": etag}
+    )
 
 
 @router.get("/export/pdf", status_code=status.HTTP_200_OK)
-def export_pdf(db: Session = Depends(get_db)):
+def export_pdf(
+    request: Request,
+    snapshot: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
     """
     Экспортировать все детали в PDF файл.
 
-    Извлекает все детали из базы данных, строит иерархическую структуру
-    и экспортирует её в PDF файл.
+    Извлекает все детали из базы данных в иерархическом порядке
+    и экспортирует их в PDF файл. Сформированный файл кэшируется
+    до следующего изменения каталога, файл последнего запрошенного
+    снимка — отдельно от него.
+
+    Аргументы:
+        snapshot (int | None): Идентификатор снимка каталога.
+        as_of (datetime | None): Момент времени (без часового пояса — UTC).
 
     Возвращает:
         StreamingResponse: PDF файл с экспортированными данными
+        304 Not Modified, если If-None-Match совпадает с ETag текущей версии
     """
     try: 
-        parts = crud.get_tree(db)
-        rows = flattern_parts(parts)
-
-        header = ["Наименование", "Цена", "Количество", "Стоимость"]
-        data = [header] + [[
-            row["Наименование"],
-            str(row["Цена"]),
-            str(row["Количество"]),
-            str(row["Стоимость"])
-        ] for row in rows]
-
-        font_path = os.path.join("static", "fonts", "DejaVuSans-Bold.ttf")
-        pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", font_path))
-
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-
-        style = ParagraphStyle(
-            name="DejaVuStyle",
-            fontName="DejaVuSans-Bold",
-            fontSize=10,
-        )
-
-        formatted_data = [
-            [Paragraph(cell, style) for cell in row]
-            for row in data
-        ]
-        
-        table = Table(formatted_data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ("TEXTCOLOR",  (0, 0), (-1, 0), colors.black),
-            ("ALIGN",      (0, 0), (-1, -1), "LEFT"),
-            ("FONTNAME",   (0, 0), (-1, 0), "DejaVuSans-Bold"),
-            ("FONTSIZE",   (0, 0), (-1, 0), 12),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-            ("GRID",       (0, 0), (-1, -1), 0.5, colors.black),
-        ]))
-
-        doc.build([table])
-        buffer.seek(0)
+        snapshot_at = snapshot_version(db, snapshot, as_of)
+        version = crud.get_version(db) if snapshot_at is None else snapshot_at
+        etag = make_etag("pdf", version)
+        if is_not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
+        # файл строится на ту версию, под которой он кэшируется и отдаётся с ETag,
+        # даже если между чтением версии и сборкой каталог изменился
+        kind = "pdf" if snapshot_at is None else "pdf-snapshot"
+        content = export_cache.get(kind, version, lambda: build_pdf(version))
         return StreamingResponse(
-            buffer,
+            io.BytesIO(content),
             media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=parts_table.pdf"},
+            headers={"Content-Disposition": "attachment; filename=parts_table.pdf", "ETag": etag},
         )
     
     except SQLAlchemyError:
@@ -277,3 +894,195 @@ def export_pdf(db: Session = Depends(get_db)):
             status_code=500,
             detail="Ошибка сервера при экспорте данных в PDF"
         )
+
+
+
+@router.post("/export/jobs", status_code=status.HTTP_202_ACCEPTED, response_model=ExportJobOut)
+def create_export_job(job: ExportJobCreate, db: Session = Depends(get_db)):
+    """
+    Поставить экспорт в фоновую очередь.
+
+    Файл формируется в отдельном процессе, поэтому тяжёлые экспорты не занимают
+    потоки, обслуживающие остальные запросы. Повторный запрос того же формата
+    без изменений каталога возвращает уже существующее задание.
+
+    Аргументы:
+        job (ExportJobCreate): Формат экспорта.
+        db (Session): Сессия базы данных, предоставляемая зависимостью.
+
+    Возвращает:
+        ExportJobOut: Состояние задания.
+    """
+    try:
+        version = crud.get_version(db)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при создании задания экспорта"
+        )
+    return submit_export(job.format, version)
+
+
+@router.get("/export/jobs/{job_id}", status_code=status.HTTP_200_OK, response_model=ExportJobOut)
+def get_export_job(job_id: str):
+    """
+    Получить состояние и прогресс задания экспорта.
+
+    Аргументы:
+        job_id (str): Идентификатор задания.
+
+    Возвращает:
+        ExportJobOut: Состояние задания.
+    """
+    state = read_status(job_id) if is_valid_job_id(job_id) else None
+    if state is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Задание экспорта не найдено"
+        )
+    return state
+
+
+@router.get("/export/jobs/{job_id}/result", status_code=status.HTTP_200_OK)
+def get_export_job_result(job_id: str):
+    """
+    Скачать результат задания экспорта.
+
+    Аргументы:
+        job_id (str): Идентификатор задания.
+
+    Возвращает:
+        FileResponse: Сформированный файл
+        404 Not Found, если задание не найдено или результат удалён по истечении срока хранения
+        409 Conflict, если файл ещё не сформирован
+    """
+    state = read_status(job_id) if is_valid_job_id(job_id) else None
+    if state is None or (state["status"] == ExportJobStatus.DONE and not os.path.exists(result_path(job_id))):
+        raise HTTPException(
+            status_code=404,
+            detail="Задание экспорта не найдено"
+        )
+    if state["status"] != ExportJobStatus.DONE:
+        raise HTTPException(
+            status_code=409,
+            detail="Экспорт ещё не готов"
+        )
+
+    export_format = ExportFormat(state["format"])
+    return FileResponse(
+        result_path(job_id),
+        media_type=RESULT_MEDIA_TYPES[export_format],
+        filename=f"parts.{RESULT_EXTENSIONS[export_format]}",
+    )
+
+
+def snapshot_version(db: Session, snapshot, as_of):
+    """
+    Определить прошлую версию каталога по параметрам snapshot и as_of.
+
+    Аргументы:
+        db (Session): Сессия базы данных.
+        snapshot (int | None): Идентификатор снимка.
+        as_of (datetime | None): Момент времени.
+
+    Возвращает:
+        int | None: Версия каталога или None, если нужно текущее состояние
+                    (параметры не указаны или указывают на текущую версию).
+    """
+    if snapshot is None and as_of is None:
+        return None
+    if snapshot is not None and as_of is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Укажите только один из параметров snapshot и as_of"
+        )
+
+    version = crud.resolve_version(db, snapshot, as_of)
+    if version == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Снимок не найден"
+        )
+    if version == DeletePartResult.UNAVAILABLE:
+        raise HTTPException(
+            status_code=400,
+            detail="История каталога на указанный момент недоступна"
+        )
+    return None if version == crud.get_version(db) else version
+
+
+def tree_etag(request: Request, version):
+    """
+    ETag полного дерева: сжатое и несжатое представления различаются.
+
+    Аргументы:
+        request (Request): Входящий запрос.
+        version (int): Версия каталога.
+
+    Возвращает:
+        str: Значение заголовка ETag.
+    """
+    return representation_etag(request, "tree", version)
+
+
+def tree_response(request: Request, version, etag, body):
+    """
+    Ответ с закэшированным JSON полного дерева.
+
+    Данные построены приложением, поэтому повторная проверка каждого узла
+    моделью PartOut не выполняется. Если клиент принимает gzip, отдаётся
+    закэшированное сжатое представление.
+
+    Аргументы:
+        request (Request): Входящий запрос.
+        version (int): Версия каталога.
+        etag (str): ETag, полученный из tree_etag().
+        body (bytes): JSON-представление дерева.
+
+    Возвращает:
+        Response: Ответ с JSON дерева.
+    """
+    headers = {"ETag": etag, "X-Catalog-Version": str(version), "Vary": "Accept-Encoding"}
+    if accepts_gzip(request):
+        body = tree_cache.compressed(version, body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def to_part_out(part):
+    """
+    Преобразовать деталь в ответ PartOut без дочерних элементов.
+
+    Аргументы:
+        part (Part): Экземпляр детали.
+
+    Возвращает:
+        PartOut: Данные детали со стоимостью позиции.
+    """
+    return PartOut(
+        id=part.id,
+        name=part.name,
+        unit_price=part.unit_price,
+        quantity=part.quantity,
+        parent_id=part.parent_id,
+        total_price=part.unit_price * part.quantity,
+        children=[]
+    )
+
+
+def to_mutation_out(db: Session, part):
+    """
+    Построить ответ операции записи: деталь и изменения каталога этой операции.
+
+    Аргументы:
+        db (Session): Сессия, в которой выполнялась операция.
+        part (Part): Созданная или изменённая деталь.
+
+    Возвращает:
+        PartMutationOut: Данные детали и список затронутых операцией деталей.
+    """
+    version = db.info["catalog_version"]
+    return PartMutationOut(
+        **to_part_out(part).model_dump(),
+        changes=crud.get_changes(db, version - 1, version),
+    )
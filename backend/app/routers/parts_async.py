@@ -0,0 +1,187 @@
+import time
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from typing import List, Optional
+
+from enums import DeletePartResult
+from utils import dump_tree_json
+from metrics import ProfiledRoute
+from cache import is_not_modified, tree_cache
+from database import async_crud
+from database.async_database import get_async_db
+from database.crud import CHILDREN_CURSOR_PATTERN
+from routers.parts import raise_edit_error, snapshot_version, to_mutation_out, tree_etag, tree_response
+from schemas import (
+    PartCreate,
+    PartDeleteOut,
+    PartMutationOut,
+    PartOut,
+    PartUpdate
+)
+
+
+# Асинхронные версии основных эндпоинтов деталей. Подключаются в main.py перед
+# синхронным роутером, если DATABASE_URL указывает асинхронный драйвер; остальные
+# эндпоинты (экспорт, пакетный импорт) обслуживаются синхронным роутером.
+router = APIRouter(tags=["Parts"], route_class=ProfiledRoute)
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=List[PartOut])
+async def get_all_parts(
+    request: Request,
+    parent_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, pattern=CHILDREN_CURSOR_PATTERN),
+    snapshot: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Получить все детали в виде иерархического дерева или страницу дочерних деталей.
+
+    Асинхронная версия GET / с тем же поведением кэша, ETag, ленивого режима
+    и снимков каталога.
+    """
+    try:
+        version = await db.run_sync(snapshot_version, snapshot, as_of)
+        if version is not None:
+            if parent_id is not None or limit is not None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Снимок каталога доступен только для полного дерева"
+                )
+            etag = tree_etag(request, version)
+            if is_not_modified(request, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            tree = await async_crud.get_tree(db, version)
+            return tree_response(request, version, etag, dump_tree_json(tree))
+
+        if parent_id is None and limit is None:
+            version = await async_crud.get_version(db)
+            etag = tree_etag(request, version)
+            if is_not_modified(request, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+            cached = tree_cache.lookup(version)
+            if cached is not None:
+                body = cached[1]
+            else:
+                started = time.perf_counter()
+                tree = await async_crud.get_tree(db)
+                body = tree_cache.store(version, tree, started)
+            return tree_response(request, version, etag, body)
+
+        page, next_cursor = await async_crud.get_children_page(db, parent_id, limit or 100, cursor)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else None
+        return ORJSONResponse(page, headers=headers)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при получении данных с базы данных"
+        )
+
+
+@router.get("/{part_id}/subtree", status_code=status.HTTP_200_OK, response_model=PartOut)
+async def get_subtree(
+    part_id: int,
+    depth: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Получить поддерево детали до указанной глубины.
+    """
+    try:
+        subtree = await async_crud.get_subtree(db, part_id, depth)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при получении данных с базы данных"
+        )
+
+    if subtree == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Деталь не найдена"
+        )
+    return Response(content=dump_tree_json(subtree), media_type="application/json")
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=PartMutationOut)
+async def create_part(part: PartCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Создать новую деталь.
+    """
+    try:
+        new_part = await async_crud.create_part(db, part)
+        if new_part != DeletePartResult.EXISTS:
+            return await db.run_sync(to_mutation_out, new_part)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при создании детали"
+        )
+
+    if new_part == DeletePartResult.EXISTS:
+        raise HTTPException(
+            status_code=400,
+            detail="Деталь с таким именем уже существует"
+        )
+
+
+@router.put("/{part_id}", status_code=status.HTTP_200_OK, response_model=PartMutationOut)
+async def edit_part(part_id: int, part_update: PartUpdate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Редактировать существующую деталь.
+    """
+    try:
+        updated_part = await async_crud.edit_part(db, part_id, part_update)
+        if not isinstance(updated_part, DeletePartResult):
+            return await db.run_sync(to_mutation_out, updated_part)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при редактировании детали"
+        )
+
+    raise_edit_error(updated_part)
+
+
+@router.delete("/{part_id}", status_code=status.HTTP_200_OK, response_model=PartDeleteOut)
+async def delete_part(
+    part_id: int,
+    cascade: bool = Query(False, description="Удалить деталь вместе со всеми потомками"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Удалить деталь (с cascade=true — вместе с поддеревом).
+    """
+    try:
+        if cascade:
+            result = await async_crud.delete_subtree(db, part_id)
+            removed = result
+        else:
+            result = await async_crud.delete_part(db, part_id)
+            removed = 1
+        if not isinstance(result, DeletePartResult) or result == DeletePartResult.SUCCESS:
+            version = db.info["catalog_version"]
+            changes = await async_crud.get_changes(db, version - 1, version)
+            return PartDeleteOut(**changes, removed=removed)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка сервера при удалении детали"
+        )
+
+    if result == DeletePartResult.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Деталь не найдена"
+        )
+    if result == DeletePartResult.HAS_CHILDREN:
+        raise HTTPException(
+            status_code=400,
+            detail="Невозможно удалить деталь с дочерними элементами"
+        )
@@ -1,5 +1,8 @@
+from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from enums import ExportFormat, ExportJobStatus
 
 class PartBase(BaseModel):
     name: str
@@ -17,12 +20,151 @@ class PartUpdate(BaseModel):
     parent_id: Optional[int] = None
 
 
+class PartBatchUpdate(PartUpdate):
+    id: int
+
+
+class PartMove(BaseModel):
+    parent_id: Optional[int] = None
+
+
+class PartLinkCreate(BaseModel):
+    parent_id: int
+    quantity: int = Field(1, ge=1)
+
+
 class PartOut(PartBase):
     id: int
     total_price: int
+    children_count: Optional[int] = None
+    shared: Optional[bool] = None
     children: List['PartOut'] = []
 
     class Config:
         from_attributes = True
 
-PartOut.update_forward_refs()
\ No newline at end of file
+PartOut.update_forward_refs()
+
+
+class PartAncestor(BaseModel):
+    id: int
+    name: Optional[str] = None
+
+
+class PartSearchResult(PartOut):
+    ancestors: List[PartAncestor] = []
+
+
+class PartUsage(BaseModel):
+    id: int
+    name: Optional[str] = None
+    quantity: int
+    shared: bool = False
+
+
+class WhereUsed(BaseModel):
+    id: int
+    name: str
+    usages: List[PartUsage] = []
+    assemblies: List[PartAncestor] = []
+
+
+class RollupItem(BaseModel):
+    id: int
+    name: Optional[str] = None
+    quantity: int
+    unit_cost: int
+    total_cost: int
+    components: int
+
+
+class RollupLevel(BaseModel):
+    depth: int
+    parts: int
+    leaves: int
+    exploded_quantity: int
+    extended_cost: int
+
+
+class CatalogRollup(BaseModel):
+    version: int
+    parts: int
+    roots: List[RollupItem] = []
+    levels: List[RollupLevel] = []
+
+
+class PartRollup(RollupItem):
+    children: List[RollupItem] = []
+    levels: List[RollupLevel] = []
+
+
+class PartChanges(BaseModel):
+    version: int
+    updated: List[PartOut] = []
+    deleted: List[int] = []
+
+
+class SnapshotCreate(BaseModel):
+    name: Optional[str] = None
+
+
+class SnapshotOut(BaseModel):
+    id: int
+    name: Optional[str] = None
+    version: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PartDeleteOut(PartChanges):
+    removed: int = 0
+
+
+class PartMutationOut(PartOut):
+    changes: Optional[PartChanges] = None
+
+
+class PartImport(BaseModel):
+    name: str
+    unit_price: int = 0
+    quantity: int = 1
+    # временный идентификатор строки внутри пакета и ссылка на родителя по нему
+    ref: Optional[str] = None
+    parent_ref: Optional[str] = None
+    # иерархический номер строки ("1.2.3"), родитель определяется по префиксу
+    number: Optional[str] = None
+    children: List['PartImport'] = []
+
+PartImport.update_forward_refs()
+
+
+class BulkImport(BaseModel):
+    parent_id: Optional[int] = None
+    skip_errors: bool = False
+    parts: List[PartImport]
+
+
+class BulkImportError(BaseModel):
+    row: int
+    name: str
+    detail: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    errors: List[BulkImportError] = []
+
+
+class ExportJobCreate(BaseModel):
+    format: ExportFormat
+
+
+class ExportJobOut(BaseModel):
+    id: str
+    format: ExportFormat
+    version: int
+    status: ExportJobStatus
+    progress: int = 0
+    error: Optional[str] = None
@@ -1,19 +1,103 @@
+import csv
+import io
+import os
+import re
+import zipfile
+
+import orjson
+from sqlalchemy import bindparam, func
+
+from database.hierarchy import path_to_ids
+from database.links import has_links
 from database.models import Part
 
+# Способ пересчёта цен сборок при записи:
+#   sum      — цена сборки равна сумме цен за единицу дочерних деталей
+#              (приращение по цепочке предков, по умолчанию);
+#   weighted — цена сборки равна сумме цен дочерних деталей, умноженных на их
+#              количество; пересчёт выполняется векторно модулем rollup,
+#              который вместе с NumPy импортируется только в этом режиме.
+ROLLUP_MODE = os.getenv("ROLLUP_MODE", "sum")
+
+
 def update_parent_prices(db, parent_id):
     """
-    Рекурсивно обновляет цены всех предков детали с указанным parent_id, 
-    устанавливая их равными сумме цен за единицу их дочерних деталей.
+    Обновляет цены предков детали с указанным parent_id по приращению.
+
+    Частный случай update_ancestors_prices для одного родителя.
 
     :param db: Сессия SQLAlchemy
     :param parent_id: ID детали, предков которой нужно обновить
+    :return: Список ID деталей, цены которых изменились
+    """
+    return update_ancestors_prices(db, [parent_id])
+
+
+def update_ancestors_prices(db, parent_ids):
     """
-    while parent_id:
-        parent = db.query(Part).get(parent_id)
-        new_unit_price = sum(child.unit_price for child in parent.children)
-        parent.unit_price = new_unit_price
-        db.commit()
-        parent_id = parent.parent_id 
+    Обновляет цены всех предков для набора изменённых родителей за один проход.
+
+    Цена каждого родителя пересчитывается как сумма цен за единицу его дочерних
+    деталей: суммы для всех родителей получаются одним агрегатным запросом.
+    Родители обрабатываются от самых глубоких к корню, а изменения цен
+    накапливаются в памяти по цепочкам из материализованных путей, поэтому
+    общий предок нескольких родителей получает суммарное приращение,
+    которое записывается одним пакетным UPDATE. Фиксация транзакции остаётся
+    за вызывающим кодом. При ROLLUP_MODE=weighted, а также пока в каталоге есть
+    общие узлы (ссылки part_links), вместо этого выполняется векторный пересчёт
+    rollup.recompute_prices: приращение по цепочке пути не доходит до сборок,
+    использующих деталь по ссылке.
+
+    :param db: Сессия SQLAlchemy
+    :param parent_ids: ID деталей, состав дочерних элементов или цены детей которых изменились
+    :return: Список ID деталей, цены которых изменились
+    """
+    if ROLLUP_MODE == "weighted" or has_links(db):
+        from rollup import recompute_prices
+
+        return recompute_prices(db, parent_ids, weighted=ROLLUP_MODE == "weighted")
+
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id}
+    if not parent_ids:
+        return []
+
+    db.flush()
+    parents = db.query(
+        Part.id,
+        func.coalesce(Part.unit_price, 0).label("unit_price"),
+        Part.path,
+    ).filter(Part.id.in_(parent_ids)).all()
+    sums = dict(db.query(
+        Part.parent_id,
+        func.coalesce(func.sum(Part.unit_price), 0),
+    ).filter(Part.parent_id.in_(parent_ids)).group_by(Part.parent_id).all())
+
+    chains = {parent.id: path_to_ids(parent.path) for parent in parents}
+    children = {}
+    for chain in chains.values():
+        for ancestor_id, child_id in zip(chain, chain[1:]):
+            children.setdefault(ancestor_id, set()).add(child_id)
+
+    deltas = {}
+    for parent in sorted(parents, key=lambda parent: len(chains[parent.id]), reverse=True):
+        new_price = sums.get(parent.id, 0) + sum(
+            deltas.get(child_id, 0) for child_id in children.get(parent.id, ())
+        )
+        delta = new_price - parent.unit_price - deltas.get(parent.id, 0)
+        if delta:
+            for ancestor_id in chains[parent.id]:
+                deltas[ancestor_id] = deltas.get(ancestor_id, 0) + delta
+
+    values = [{"part_id": part_id, "delta": delta} for part_id, delta in deltas.items() if delta]
+    if values:
+        table = Part.__table__
+        db.execute(
+            table.update()
+            .where(table.c.id == bindparam("part_id"))
+            .values(unit_price=func.coalesce(table.c.unit_price, 0) + bindparam("delta")),
+            values,
+        )
+    return [value["part_id"] for value in values]
 
 
 def flattern_parts(parts):
@@ -27,19 +111,169 @@ def flattern_parts(parts):
         list: Плоский список словарей, представляющих детали и их свойства, 
               включая наименование, цену, количество и стоимость, с иерархической нумерацией.
     """
-    rows = []
+    return list(iter_flat_parts(parts))
 
-    def traverse(part, prefix=""):
-        rows.append({
-            "Наименование": str(prefix + ". " + part["name"]),
+
+def iter_flat_parts(parts):
+    """
+    Лениво выдаёт строки flattern_parts в порядке обхода дерева в глубину.
+
+    Обход выполняется по явному стеку итераторов, поэтому работает за один
+    проход и не ограничен глубиной рекурсии Python.
+
+    Аргументы:
+        parts (list): Список деталей в виде иерархического дерева.
+
+    Возвращает:
+        Iterator[dict]: Строки с наименованием, ценой, количеством и стоимостью.
+    """
+    stack = [("", enumerate(parts, start=1))]
+    while stack:
+        prefix, siblings = stack[-1]
+        item = next(siblings, None)
+        if item is None:
+            stack.pop()
+            continue
+
+        idx, part = item
+        number = f"{prefix}.{idx}" if prefix else f"{idx}"
+        yield {
+            "Наименование": str(number + ". " + part["name"]),
             "Цена": part["unit_price"],
             "Количество": part["quantity"],
             "Стоимость": part["total_price"],
+        }
+        children = part.get("children", [])
+        if children:
+            stack.append((number, enumerate(children, start=1)))
+
+
+def dump_tree_json(tree):
+    """
+    Сериализует дерево (список деталей или одну деталь) в JSON.
+
+    orjson ограничивает вложенность 255 уровнями, поэтому для более глубоких
+    деревьев используется обход по явному стеку: каждая деталь сериализуется
+    без children, а списки дочерних элементов собираются из фрагментов.
+    Ключ children в словарях build_tree идёт последним, поэтому результат
+    совпадает с orjson.dumps.
+
+    :param tree: Дерево в формате crud.build_tree
+    :return: JSON в байтах
+    """
+    try:
+        return orjson.dumps(tree)
+    except orjson.JSONEncodeError:
+        if isinstance(tree, dict):
+            return dump_tree_json_iterative([tree])[1:-1]
+        return dump_tree_json_iterative(tree)
+
+
+def dump_tree_json_iterative(parts):
+    """
+    Сериализует список деталей в JSON обходом по явному стеку.
+
+    :param parts: Список деталей в формате crud.build_tree
+    :return: JSON в байтах
+    """
+    chunks = [b"["]
+    stack = [iter(parts)]
+    first = True
+    while stack:
+        part = next(stack[-1], None)
+        if part is None:
+            stack.pop()
+            chunks.append(b"]}" if stack else b"]")
+            first = False
+            continue
+
+        if not first:
+            chunks.append(b",")
+        fields = orjson.dumps({key: value for key, value in part.items() if key != "children"})
+        chunks.append(fields[:-1] + b',"children":[')
+        stack.append(iter(part["children"]))
+        first = True
+    return b"".join(chunks)
+
+
+EXPORT_COLUMNS = ["Наименование", "Цена", "Количество", "Стоимость"]
+NUMBERED_NAME = re.compile(r"^\s*(\d+(?:\.\d+)*)\.?\s+(.*)$")
+
+
+def parse_import_file(filename, content):
+    """
+    Разбирает CSV или XLSX файл в формате экспорта в список строк для пакетного импорта.
+
+    Наименование ожидается в виде "1.2. Деталь", как его формирует flattern_parts:
+    иерархический номер определяет родителя строки. Столбец "Стоимость" игнорируется.
+
+    Аргументы:
+        filename (str): Имя загруженного файла (по расширению выбирается формат).
+        content (bytes): Содержимое файла.
+
+    Возвращает:
+        list: Список словарей с ключами name, unit_price, quantity и number.
+
+    Исключения:
+        ValueError: Если формат файла не поддерживается или строка не разбирается.
+    """
+    if filename.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        try:
+            workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError):
+            raise ValueError("Файл не является книгой Excel (.xlsx)")
+        records = workbook.active.iter_rows(values_only=True)
+    elif filename.lower().endswith(".csv"):
+        try:
+            records = csv.reader(io.StringIO(content.decode("utf-8-sig")))
+        except UnicodeDecodeError:
+            raise ValueError("Файл CSV должен быть в кодировке UTF-8")
+    else:
+        raise ValueError("Поддерживаются только файлы .csv и .xlsx")
+
+    header = [str(cell).strip() if cell is not None else "" for cell in next(records, [])]
+    try:
+        name_col, price_col, quantity_col = (header.index(column) for column in EXPORT_COLUMNS[:3])
+    except ValueError:
+        raise ValueError(f"Ожидаются столбцы: {', '.join(EXPORT_COLUMNS[:3])}")
+
+    rows = []
+    for line, record in enumerate(records, start=2):
+        if not record or all(cell in (None, "") for cell in record):
+            continue
+        if len(record) <= max(name_col, price_col, quantity_col):
+            raise ValueError(f"Строка {line}: ожидаются столбцы {', '.join(EXPORT_COLUMNS[:3])}")
+        match = NUMBERED_NAME.match(str(record[name_col] or ""))
+        if not match:
+            raise ValueError(f"Строка {line}: наименование должно начинаться с иерархического номера")
+        try:
+            unit_price = import_number(record[price_col], 0)
+            quantity = import_number(record[quantity_col], 1)
+        except (TypeError, ValueError):
+            raise ValueError(f"Строка {line}: цена и количество должны быть числами")
+        rows.append({
+            "number": match.group(1),
+            "name": match.group(2).strip(),
+            "unit_price": unit_price,
+            "quantity": quantity,
         })
-        for idx, child in enumerate(part.get("children", []), start=1):
-            child_prefix = f"{prefix}.{idx}" if prefix else f"{idx}"
-            traverse(child, prefix=child_prefix)
+    return rows
+
 
-    for idx, part in enumerate(parts, start=1):
-        traverse(part, prefix=f"{idx}")
-    return rows
\ No newline at end of file
+def import_number(value, default):
+    """
+    Преобразует ячейку файла импорта в целое число.
+
+    Значение по умолчанию подставляется только для пустой ячейки,
+    поэтому явный 0 сохраняется.
+
+    :param value: Значение ячейки (число, строка или None)
+    :param default: Значение для пустой ячейки
+    :return: Целое число
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    return int(float(value))
@@ -0,0 +1,97 @@
+"""
+Пропускная способность импорта: POST / по одной детали против POST /bulk
+(вложенный JSON) и POST /bulk/upload (CSV в формате экспорта).
+
+Каждый путь загружает одинаковые сборки (сборка и 9 деталей) в существующий
+каталог; печатается число строк в секунду.
+
+    python backend/benchmarks/bench_import.py [--single 500] [--bulk 20000] [--catalog 10000]
+"""
+import argparse
+import time
+
+from common import generate_catalog, prepare, table
+
+ASSEMBLY_SIZE = 10
+
+
+def assemblies(count, prefix):
+    """
+    Вложенные сборки для POST /bulk: count сборок по ASSEMBLY_SIZE строк.
+    """
+    return [
+        {
+            "name": f"{prefix}{index}",
+            "children": [{"name": f"c{child}", "unit_price": child + 1, "quantity": 2} for child in range(ASSEMBLY_SIZE - 1)],
+        }
+        for index in range(count)
+    ]
+
+
+def assemblies_csv(count, prefix):
+    """
+    Те же сборки в формате экспорта CSV с иерархическими номерами.
+    """
+    lines = ["Наименование,Цена,Количество,Стоимость"]
+    for index in range(count):
+        lines.append(f"{index + 1}. {prefix}{index},0,1,0")
+        for child in range(ASSEMBLY_SIZE - 1):
+            lines.append(f"{index + 1}.{child + 1}. c{child},{child + 1},2,{2 * (child + 1)}")
+    return "\n".join(lines).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--single", type=int, default=500, help="строк через POST /")
+    parser.add_argument("--bulk", type=int, default=20000, help="строк через /bulk и /bulk/upload")
+    parser.add_argument("--catalog", type=int, default=10000, help="размер существующего каталога")
+    args = parser.parse_args()
+
+    prepare("bench_import.db")
+    from database.database import engine
+    generate_catalog(engine, args.catalog, 10)
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    results = []
+
+    started = time.perf_counter()
+    created = 0
+    for index in range(args.single // ASSEMBLY_SIZE):
+        response = client.post("/", json={"name": f"s{index}", "parent_id": 1})
+        assert response.status_code == 201, response.text
+        assembly_id = response.json()["id"]
+        created += 1
+        for child in range(ASSEMBLY_SIZE - 1):
+            response = client.post(
+                "/", json={"name": f"c{child}", "unit_price": child + 1, "quantity": 2, "parent_id": assembly_id}
+            )
+            assert response.status_code == 201, response.text
+            created += 1
+    seconds = time.perf_counter() - started
+    results.append(["POST / per row", created, f"{seconds:.2f}", f"{created / seconds:.0f}"])
+
+    count = args.bulk // ASSEMBLY_SIZE
+    started = time.perf_counter()
+    response = client.post("/bulk", json={"parent_id": 1, "parts": assemblies(count, "b")})
+    seconds = time.perf_counter() - started
+    assert response.status_code == 201, response.text
+    created = response.json()["created"]
+    results.append(["POST /bulk (JSON)", created, f"{seconds:.2f}", f"{created / seconds:.0f}"])
+
+    content = assemblies_csv(count, "u")
+    started = time.perf_counter()
+    response = client.post("/bulk/upload?parent_id=1", files={"file": ("import.csv", content)})
+    seconds = time.perf_counter() - started
+    assert response.status_code == 201, response.text
+    created = response.json()["created"]
+    results.append(["POST /bulk/upload (CSV)", created, f"{seconds:.2f}", f"{created / seconds:.0f}"])
+
+    print(f"existing catalog: {args.catalog} parts")
+    table(["path", "rows", "s", "rows/s"], results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Экспорт в PDF: прежний путь (регистрация шрифта на каждый запрос, Paragraph
+в каждой ячейке, одна таблица на весь каталог) против exports.build_pdf
+(шрифт и стили один раз, числа строками, таблицы по странице) и повторной
+выдачи из кэша версии каталога.
+
+    python backend/benchmarks/bench_pdf.py [--sizes 1000 10000 50000] [--legacy-limit 50000]
+"""
+import argparse
+import io
+import os
+
+from common import best_of, generate_catalog, prepare, remove_database, table
+
+
+def legacy_pdf(db):
+    """
+    Прежний export_pdf: дерево целиком, Paragraph в каждой ячейке и одна Table.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    from database import crud
+    from utils import flattern_parts
+
+    rows = flattern_parts(crud.get_tree(db))
+    data = [["Наименование", "Цена", "Количество", "Стоимость"]] + [
+        [row["Наименование"], str(row["Цена"]), str(row["Количество"]), str(row["Стоимость"])]
+        for row in rows
+    ]
+    pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", os.path.join("static", "fonts", "DejaVuSans-Bold.ttf")))
+    buffer = io.BytesIO()
+    document = SimpleDocTemplate(buffer, pagesize=letter)
+    style = ParagraphStyle(name="DejaVuStyle", fontName="DejaVuSans-Bold", fontSize=10)
+    pdf_table = Table([[Paragraph(cell, style) for cell in row] for row in data], repeatRows=1)
+    pdf_table.setStyle(TableStyle([
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+        ("FONTNAME", (0, 0), (-1, 0), "DejaVuSans-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ]))
+    document.build([pdf_table])
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--legacy-limit", type=int, default=50000)
+    args = parser.parse_args()
+
+    path = prepare("bench_pdf.db")
+    from database.database import SessionLocal, engine
+    from database import crud
+    from cache import ExportCache
+    from exports import build_pdf
+
+    results = []
+    for size in args.sizes:
+        engine.dispose()
+        remove_database(path)
+        generate_catalog(engine, size, 10)
+
+        seconds, content = best_of(build_pdf, repeat=1)
+        row = [size, f"{seconds:.2f}", len(content)]
+
+        cache = ExportCache()
+        db = SessionLocal()
+        version = crud.get_version(db)
+        cache.get("pdf", version, build_pdf)
+        seconds, _ = best_of(lambda: cache.get("pdf", version, build_pdf), repeat=5)
+        row.append(f"{seconds * 1000:.3f}")
+
+        if size <= args.legacy_limit:
+            seconds, content = best_of(lambda: legacy_pdf(db), repeat=1)
+            row += [f"{seconds:.2f}", len(content)]
+        else:
+            row += ["-", "-"]
+        db.close()
+        results.append(row)
+
+    table(["rows", "build_pdf s", "bytes", "cached ms", "legacy s", "legacy bytes"], results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Расчёт стоимости с учётом количества: обход дерева crud.get_tree на Python
+против векторного rollup (загрузка массивов и расчёт по уровням), а также
+стоимость записи в режиме ROLLUP_MODE=weighted.
+
+Результаты rollup сверяются с расчётом на Python. Записи измеряются
+в отдельном процессе, так как режим читается при импорте utils.
+
+    python backend/benchmarks/bench_rollup.py [--sizes 100000 1000000] [--fanout 10] [--writes 20]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from common import best_of, generate_catalog, prepare, remove_database, table
+
+
+def python_rollup(tree):
+    """
+    Стоимость единицы каждой детали обходом дерева в обратном порядке.
+    """
+    cost = {}
+    stack = [(node, False) for node in tree]
+    while stack:
+        node, done = stack.pop()
+        if not node["children"]:
+            cost[node["id"]] = node["unit_price"]
+        elif done:
+            cost[node["id"]] = sum(child["quantity"] * cost[child["id"]] for child in node["children"])
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node["children"])
+    return cost
+
+
+def measure_writes(size, fanout, writes):
+    """
+    Средняя длительность PUT цены листовой детали в текущем режиме ROLLUP_MODE.
+    """
+    prepare("bench_rollup_writes.db")
+    from database.database import engine
+    generate_catalog(engine, size, fanout, quantity=lambda part_id: part_id % 4 + 1)
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    started = time.perf_counter()
+    for index in range(writes):
+        response = client.put(f"/{size - index}", json={"unit_price": 5 + index})
+        assert response.status_code == 200, response.text
+    print(f"{(time.perf_counter() - started) / writes * 1000:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--write-size", type=int, default=100000)
+    parser.add_argument("--measure-writes", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_writes:
+        measure_writes(args.write_size, args.fanout, args.writes)
+        return
+
+    path = prepare("bench_rollup.db")
+    from database import crud
+    from database.database import SessionLocal, engine
+    import rollup
+
+    results = []
+    for size in args.sizes:
+        engine.dispose()
+        remove_database(path)
+        generate_catalog(engine, size, args.fanout, quantity=lambda part_id: part_id % 4 + 1)
+        db = SessionLocal()
+
+        python_seconds, cost = best_of(lambda: python_rollup(crud.get_tree(db)), repeat=1)
+        load_seconds, hierarchy = best_of(lambda: rollup.load_hierarchy(db))
+        compute_seconds, result = best_of(lambda: rollup.compute_rollup(hierarchy))
+        assert all(cost[int(part_id)] == int(unit_cost) for part_id, unit_cost in zip(hierarchy["ids"], result["unit_cost"]))
+        db.close()
+        results.append([size, f"{python_seconds:.2f}", f"{load_seconds:.2f}", f"{compute_seconds * 1000:.0f}"])
+
+    table(["nodes", "Python get_tree+rollup s", "rollup load s", "rollup compute ms"], results)
+
+    writes = []
+    for mode in ("sum", "weighted"):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure-writes",
+             "--write-size", str(args.write_size), "--fanout", str(args.fanout), "--writes", str(args.writes)],
+            env={**os.environ, "ROLLUP_MODE": mode},
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        writes.append([mode, output[-1]])
+    print(f"\nPUT цены листовой детали, {args.write_size} деталей")
+    table(["ROLLUP_MODE", "ms per write"], writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Сериализация полного дерева: прежний путь FastAPI (проверка моделью PartOut
+и jsonable_encoder), TypeAdapter.dump_json, json.dumps и dump_tree_json
+(orjson), а также время gzip и размер ответа до и после сжатия.
+
+    python backend/benchmarks/bench_serialize.py [--sizes 10000 100000] [--fanout 10]
+"""
+import argparse
+import gzip
+import json
+
+from common import best_of, generate_catalog, prepare, remove_database, table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--fanout", type=int, default=10)
+    args = parser.parse_args()
+
+    path = prepare("bench_serialize.db")
+    from typing import List
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from cache import TREE_GZIP_LEVEL
+    from database import crud
+    from database.database import SessionLocal, engine
+    from schemas import PartOut
+    from utils import dump_tree_json
+
+    adapter = TypeAdapter(List[PartOut])
+    results = []
+    for size in args.sizes:
+        engine.dispose()
+        remove_database(path)
+        generate_catalog(engine, size, args.fanout)
+        db = SessionLocal()
+        tree = crud.get_tree(db)
+        db.close()
+
+        legacy, _ = best_of(
+            lambda: json.dumps(jsonable_encoder(adapter.validate_python(tree)), ensure_ascii=False).encode(), repeat=1
+        )
+        typed, _ = best_of(lambda: adapter.dump_json(adapter.validate_python(tree)))
+        plain, _ = best_of(lambda: json.dumps(tree, ensure_ascii=False).encode())
+        fast, body = best_of(lambda: dump_tree_json(tree))
+        compress, compressed = best_of(lambda: gzip.compress(body, compresslevel=TREE_GZIP_LEVEL, mtime=0))
+        results.append([
+            size,
+            f"{legacy:.3f}",
+            f"{typed:.3f}",
+            f"{plain:.3f}",
+            f"{fast:.3f}",
+            f"{compress:.3f}",
+            f"{len(body) / 1e6:.2f}",
+            f"{len(compressed) / 1e6:.2f}",
+        ])
+
+    table(
+        ["nodes", "PartOut+encoder s", "dump_json s", "json.dumps s", "orjson s", "gzip s", "MB", "gzip MB"],
+        results,
+    )
+
+
+if __name__ == "__main__":
+    main()
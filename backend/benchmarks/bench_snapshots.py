@@ -0,0 +1,103 @@
+"""
+Снимки каталога: рост базы и задержка чтения снимка в зависимости от числа снимков.
+
+Каждый раунд меняет цены случайных листовых деталей одним PATCH /batch
+и закрепляет снимок POST /snapshots. В контрольных точках печатаются размер
+базы, число строк part_history, размер полной копии базы на каждый снимок
+для сравнения и время GET /?snapshot= для самого старого и предпоследнего
+снимка. Последний снимок совпадает с текущей версией и отдаётся из кэша
+дерева, поэтому не измеряется.
+
+    python backend/benchmarks/bench_snapshots.py [--size 100000] [--rounds 50] [--updates 1000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+from common import generate_catalog, prepare, table
+
+
+def database_size(path):
+    """
+    Размер файла базы после переноса WAL в основной файл и число строк истории.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        history_rows = connection.execute("SELECT COUNT(*) FROM part_history").fetchone()[0]
+    finally:
+        connection.close()
+    return os.path.getsize(path), history_rows
+
+
+def median_ms(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=1000, help="листовых деталей в раунде")
+    args = parser.parse_args()
+
+    path = prepare("bench_snapshots.db")
+    from database.database import engine
+    generate_catalog(engine, args.size, args.fanout)
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    initial_size, _ = database_size(path)
+    checkpoints = {2, args.rounds // 5, args.rounds // 2, args.rounds} - {0, 1}
+    rng = random.Random(1)
+    leaves = range((args.size - 2) // args.fanout + 2, args.size + 1)
+    snapshots, write_seconds, results = [], [], []
+
+    def read_snapshot(snapshot_id):
+        response = client.get("/", params={"snapshot": snapshot_id}, headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200, response.text
+
+    for round_number in range(1, args.rounds + 1):
+        updates = [{"id": part_id, "unit_price": rng.randint(1, 9)} for part_id in rng.sample(leaves, args.updates)]
+        started = time.perf_counter()
+        response = client.patch("/batch", json=updates)
+        write_seconds.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+        snapshots.append(client.post("/snapshots", json={"name": f"r{round_number}"}).json()["id"])
+
+        if round_number in checkpoints:
+            size, history_rows = database_size(path)
+            results.append([
+                round_number,
+                f"{size / 2 ** 20:.1f}",
+                f"{(size - initial_size) / 2 ** 20:.1f}",
+                history_rows,
+                f"{round_number * initial_size / 2 ** 20:.0f}",
+                f"{median_ms(lambda: read_snapshot(snapshots[0])):.0f}",
+                f"{median_ms(lambda: read_snapshot(snapshots[-2])):.0f}",
+            ])
+
+    print(
+        f"{args.size} parts, {args.updates} leaf updates per round, "
+        f"PATCH /batch median {statistics.median(write_seconds) * 1000:.0f} ms, "
+        f"initial database {initial_size / 2 ** 20:.1f} MiB"
+    )
+    table(
+        ["snapshots", "db MiB", "growth MiB", "history rows", "full copies MiB", "oldest ms", "previous ms"],
+        results,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Запуск приложения: время import main (вместе с миграциями схемы), пиковая
+память процесса и число загруженных модулей, а также самые долгие прямые
+импорты main по python -X importtime.
+
+Каждый замер выполняется в новом процессе интерпретатора на одной и той же
+базе, созданной первым запуском. Для сравнения с другой ревизией можно
+указать каталог app её рабочей копии (например, созданной git worktree).
+
+    python backend/benchmarks/bench_startup.py [--runs 15] [--top 10] [--app-dir path/to/app]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from common import APP_DIR, prepare, table
+
+STARTUP_CODE = """
+import resource, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(sys.modules))
+"""
+
+
+def run_startup(app_dir, importtime=False):
+    """
+    Импортировать main в отдельном процессе.
+
+    :param app_dir: Каталог backend/app проверяемой ревизии
+    :param importtime: Запустить интерпретатор с -X importtime
+    :return: (секунды, пиковая память в КиБ, число модулей, вывод stderr)
+    """
+    options = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *options, "-c", STARTUP_CODE],
+        cwd=app_dir, capture_output=True, text=True, check=True,
+    )
+    elapsed, rss, modules = result.stdout.split()[-3:]
+    return float(elapsed), int(rss), int(modules), result.stderr
+
+
+def slowest_imports(stderr, top):
+    """
+    Самые долгие прямые импорты модулей, загружаемых при запуске (main и site),
+    из вывода -X importtime.
+
+    :param stderr: Вывод интерпретатора, запущенного с -X importtime
+    :param top: Количество строк
+    :return: Список (модуль, суммарное время в мс)
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        # имя модуля смещено на два пробела за каждый уровень вложенности импорта
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if not cumulative.strip().isdigit() or level != 1:
+            continue
+        imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--top", type=int, default=10, help="строк из -X importtime")
+    parser.add_argument("--app-dir", default=APP_DIR, help="каталог backend/app проверяемой ревизии")
+    args = parser.parse_args()
+
+    prepare("bench_startup.db")
+    app_dir = os.path.abspath(args.app_dir)
+    # первый запуск создаёт схему, дальше измеряется запуск с готовой базой
+    run_startup(app_dir)
+    runs = [run_startup(app_dir) for _ in range(args.runs)]
+
+    print(f"import main, {args.runs} runs: {app_dir}")
+    table(
+        ["median ms", "min ms", "max RSS MiB", "modules"],
+        [[
+            f"{statistics.median(run[0] for run in runs) * 1000:.0f}",
+            f"{min(run[0] for run in runs) * 1000:.0f}",
+            f"{max(run[1] for run in runs) / 1024:.1f}",
+            max(run[2] for run in runs),
+        ]],
+    )
+
+    *_, stderr = run_startup(app_dir, importtime=True)
+    print("\n-X importtime, прямые импорты main")
+    table(["module", "cumulative ms"], [[name, f"{ms:.0f}"] for name, ms in slowest_imports(stderr, args.top)])
+
+
+if __name__ == "__main__":
+    main()
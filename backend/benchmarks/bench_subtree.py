@@ -0,0 +1,55 @@
+"""
+Полное дерево против поддерева и страницы дочерних деталей.
+
+Для каталога заданного размера печатает размер ответа и время запросов,
+которые нужны клиенту, чтобы показать корень и раскрыть один узел:
+GET / (первый запрос — сборка дерева, повторный — из кэша версии),
+GET /{id}/subtree?depth=N и GET /?parent_id=&limit=.
+
+    python backend/benchmarks/bench_subtree.py [--size 100000] [--fanout 10]
+"""
+import argparse
+import time
+
+from common import best_of, generate_catalog, prepare, table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--fanout", type=int, default=10)
+    args = parser.parse_args()
+
+    prepare("bench_subtree.db")
+    from database.database import engine
+    generate_catalog(engine, args.size, args.fanout)
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    results = []
+
+    started = time.perf_counter()
+    response = client.get("/")
+    results.append(["GET / (build)", len(response.content), f"{(time.perf_counter() - started) * 1000:.1f}"])
+
+    urls = [
+        ("GET / (cached)", "/"),
+        ("subtree depth=1 of root", "/1/subtree?depth=1"),
+        ("subtree depth=2 of root", "/1/subtree?depth=2"),
+        ("subtree depth=2 of level-1 node", "/2/subtree?depth=2"),
+        ("children page, limit=100", "/?parent_id=1&limit=100"),
+        ("root page, limit=100", "/?limit=100"),
+    ]
+    for label, url in urls:
+        seconds, response = best_of(lambda: client.get(url), repeat=5)
+        assert response.status_code == 200, response.text
+        results.append([label, len(response.content), f"{seconds * 1000:.1f}"])
+
+    print(f"{args.size} parts, fanout {args.fanout}")
+    table(["request", "bytes", "ms"], results)
+
+
+if __name__ == "__main__":
+    main()
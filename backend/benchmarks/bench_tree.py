@@ -0,0 +1,76 @@
+"""
+Загрузка дерева деталей: один запрос (crud.get_tree) против прежнего
+обхода с ленивой загрузкой children у каждой детали.
+
+Для каждого размера и ширины ветвления печатает число SQL-запросов и время.
+Прежний путь по умолчанию измеряется только до 10k деталей: на 100k он
+выполняет 100k запросов и занимает минуты.
+
+    python backend/benchmarks/bench_tree.py [--sizes 1000 10000 100000] [--fanouts 2 10 100]
+"""
+import argparse
+import math
+
+from common import best_of, count_queries, generate_catalog, prepare, remove_database, table
+
+
+def legacy_tree(db, Part):
+    """
+    Прежний get_tree: корни одним запросом, потомки — ленивой загрузкой children.
+    """
+    def build(part):
+        children = [build(child) for child in part.children]
+        return {
+            "id": part.id,
+            "name": part.name,
+            "unit_price": part.unit_price,
+            "quantity": part.quantity,
+            "parent_id": part.parent_id,
+            "total_price": part.unit_price * part.quantity,
+            "children": children,
+        }
+
+    return [build(part) for part in db.query(Part).filter(Part.parent_id.is_(None)).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--fanouts", type=int, nargs="+", default=[2, 10, 100])
+    parser.add_argument("--legacy-limit", type=int, default=10000)
+    args = parser.parse_args()
+
+    path = prepare("bench_tree.db")
+    from database.database import SessionLocal, engine
+    from database.models import Part
+    from database import crud
+
+    results = []
+    for size in args.sizes:
+        for fanout in args.fanouts:
+            engine.dispose()
+            remove_database(path)
+            generate_catalog(engine, size, fanout)
+            depth = math.ceil(math.log(size * (fanout - 1) + 1, fanout)) - 1
+
+            db = SessionLocal()
+            with count_queries(engine) as queries:
+                seconds, tree = best_of(lambda: crud.get_tree(db), repeat=1)
+            row = [size, fanout, depth, queries[0], f"{seconds:.3f}"]
+
+            if size <= args.legacy_limit:
+                db.close()
+                db = SessionLocal()
+                with count_queries(engine) as queries:
+                    seconds, legacy = best_of(lambda: legacy_tree(db, Part), repeat=1)
+                row += [queries[0], f"{seconds:.3f}"]
+            else:
+                row += ["-", "-"]
+            db.close()
+            results.append(row)
+
+    table(["nodes", "fanout", "depth", "get_tree SQL", "get_tree s", "lazy SQL", "lazy s"], results)
+
+
+if __name__ == "__main__":
+    main()
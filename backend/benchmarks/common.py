@@ -0,0 +1,139 @@
+"""
+Общие функции бенчмарков.
+
+Каждый бенчмарк запускается отдельным процессом из корня репозитория,
+например: python backend/benchmarks/bench_tree.py. База данных создаётся
+во временном каталоге; prepare() нужно вызвать до импорта модулей
+приложения, так как строка подключения читается при импорте.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+
+def prepare(name, database_url=None):
+    """
+    Настроить окружение процесса для работы с приложением.
+
+    :param name: Имя файла базы данных во временном каталоге
+    :param database_url: Явная строка подключения (по умолчанию — новый файл SQLite)
+    :return: Путь к файлу базы данных SQLite (None при явной строке подключения)
+    """
+    path = None
+    if database_url is None:
+        path = os.path.join(tempfile.gettempdir(), name)
+        remove_database(path)
+        database_url = "sqlite:///" + path
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    return path
+
+
+def remove_database(path):
+    """
+    Удалить файл базы SQLite вместе с файлами WAL.
+
+    :param path: Путь к файлу базы данных
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def generate_catalog(engine, size, fanout, price=1, quantity=1):
+    """
+    Заполнить пустую базу сбалансированным деревом деталей.
+
+    Деталь i (кроме корня) получает родителя (i - 2) // fanout + 1, поэтому
+    глубина дерева равна log_fanout(size); fanout=1 даёт цепочку.
+
+    :param engine: Движок SQLAlchemy приложения
+    :param size: Количество деталей
+    :param fanout: Количество дочерних деталей у каждой сборки
+    :param price: Цена листовых деталей
+    :param quantity: Количество каждой детали (функция от id или число)
+    """
+    from database.database import Base
+    from database.migrations import upgrade
+    from database.models import Part
+
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        {
+            "id": part_id,
+            "name": f"p{part_id}",
+            "unit_price": price,
+            "quantity": quantity(part_id) if callable(quantity) else quantity,
+            "parent_id": None if part_id == 1 else (part_id - 2) // fanout + 1,
+        }
+        for part_id in range(1, size + 1)
+    ]
+    with engine.begin() as connection:
+        for start in range(0, len(rows), 10000):
+            connection.execute(Part.__table__.insert(), rows[start:start + 10000])
+    upgrade(engine)
+
+
+def best_of(func, repeat=3):
+    """
+    Минимальное время нескольких запусков функции.
+
+    :param func: Функция без аргументов
+    :param repeat: Количество запусков
+    :return: (время в секундах, результат последнего запуска)
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def percentile(values, share):
+    """
+    Перцентиль выборки (share от 0 до 1) без интерполяции.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+@contextlib.contextmanager
+def count_queries(engine):
+    """
+    Подсчитать SQL-запросы, выполненные движком внутри блока with.
+
+    :param engine: Движок SQLAlchemy
+    :return: Список из одного элемента со счётчиком запросов
+    """
+    from sqlalchemy import event
+
+    counter = [0]
+
+    def before_cursor_execute(*args):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def table(headers, rows):
+    """
+    Напечатать результаты в виде выровненной таблицы.
+    """
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max(len(str(header)), *(len(row[index]) for row in rows)) for index, header in enumerate(headers)]
+    print("  ".join(str(header).ljust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
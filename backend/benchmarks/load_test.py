@@ -0,0 +1,209 @@
+"""
+Нагрузочный тест: синхронный стек против асинхронного (DATABASE_URL
+sqlite:// и sqlite+aiosqlite://) под конкурентной нагрузкой.
+
+Для каждого режима запускается отдельный процесс uvicorn (один worker) на
+копии одного и того же каталога, и N клиентов одновременно выполняют запросы:
+
+    read   — чтение дерева: GET /{id}/subtree?depth=2 и GET /?parent_id=&limit=50;
+    mixed  — то же, но каждый пятый запрос — PUT /{id} с новой ценой детали.
+
+Печатаются запросы в секунду, p50 и p99 задержки и число ошибок.
+Клиент использует httpx (устанавливается вместе с зависимостями тестов).
+
+Профили задают окружение сервера: tuned — настройки по умолчанию (WAL,
+synchronous=NORMAL, кэш и mmap, pre-ping), legacy — прежние настройки SQLite
+и пула без них. Индекс по parent_id создаётся миграцией в обоих профилях.
+Отдельные переменные можно переопределить через --env.
+
+    python backend/benchmarks/load_test.py [--modes sync async] [--workloads read mixed]
+        [--profiles tuned legacy] [--env DB_POOL_SIZE=20]
+        [--size 50000] [--concurrency 50] [--requests 60]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from common import APP_DIR, percentile, prepare, remove_database, generate_catalog, table
+
+DRIVERS = {
+    "sync": "sqlite",
+    "async": "sqlite+aiosqlite",
+}
+WRITE_EVERY = 5
+
+PROFILES = {
+    "tuned": {},
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_CACHE_SIZE": "-2000",
+        "SQLITE_MMAP_SIZE": "0",
+        # таймаут ожидания блокировки драйвера sqlite3 по умолчанию
+        "SQLITE_BUSY_TIMEOUT": "5000",
+        "DB_POOL_PRE_PING": "false",
+    },
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url, env=None):
+    """
+    Запустить uvicorn с приложением и дождаться первого успешного ответа.
+
+    :param database_url: Строка подключения для процесса сервера
+    :param env: Дополнительные переменные окружения сервера
+    :return: (процесс, базовый URL)
+    """
+    import httpx
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--timeout-keep-alive", "120"],
+        cwd=APP_DIR,
+        env={**os.environ, **(env or {}), "DATABASE_URL": database_url},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn завершился с кодом {process.returncode}")
+        try:
+            if httpx.get(base_url + "/?limit=1").status_code == 200:
+                return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("uvicorn не запустился за 120 секунд")
+
+
+def plan_requests(workload, count, size, fanout, seed):
+    """
+    Последовательность запросов одного клиента.
+
+    :return: Список (метод, путь, тело JSON)
+    """
+    rng = random.Random(seed)
+    last_assembly = (size - 2) // fanout + 1
+    requests = []
+    for index in range(count):
+        if workload == "mixed" and index % WRITE_EVERY == 0:
+            part_id = rng.randint(last_assembly + 1, size)
+            requests.append(("PUT", f"/{part_id}", {"unit_price": rng.randint(1, 9)}))
+        elif index % 2:
+            requests.append(("GET", f"/?parent_id={rng.randint(1, last_assembly)}&limit=50", None))
+        else:
+            requests.append(("GET", f"/{rng.randint(1, last_assembly)}/subtree?depth=2", None))
+    return requests
+
+
+async def run_clients(base_url, plans):
+    """
+    Выполнить планы запросов одновременно, по клиенту на план.
+
+    :return: (задержки в секундах, число ошибок по статусу, общее время в секундах)
+    """
+    import httpx
+
+    latencies = []
+    errors = {}
+    limits = httpx.Limits(max_connections=len(plans), max_keepalive_connections=len(plans))
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def worker(plan):
+            for method, path, body in plan:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.TransportError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                if not isinstance(status, int) or status >= 400:
+                    errors[status] = errors.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(plan) for plan in plans))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def measure(template, database_url_template, workload, args, env=None):
+    """
+    Прогнать нагрузку на свежей копии каталога.
+
+    :param template: Путь к заранее сгенерированной базе
+    :param database_url_template: Строка подключения с {path} на месте файла базы
+    :param workload: "read" или "mixed"
+    :param env: Дополнительные переменные окружения сервера
+    :return: (запросов в секунду, p50 в мс, p99 в мс, число запросов, ошибки по статусу)
+    """
+    path = template + ".run"
+    remove_database(path)
+    shutil.copyfile(template, path)
+    process, base_url = start_server(database_url_template.format(path=path), env)
+    try:
+        warmup = [plan_requests("read", 5, args.size, args.fanout, seed) for seed in range(args.concurrency)]
+        asyncio.run(run_clients(base_url, warmup))
+        plans = [
+            plan_requests(workload, args.requests, args.size, args.fanout, seed)
+            for seed in range(args.concurrency)
+        ]
+        latencies, errors, elapsed = asyncio.run(run_clients(base_url, plans))
+    finally:
+        process.terminate()
+        process.wait()
+        remove_database(path)
+    return (
+        len(latencies) / elapsed,
+        percentile(latencies, 0.5) * 1000,
+        percentile(latencies, 0.99) * 1000,
+        len(latencies),
+        errors,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", choices=sorted(DRIVERS), default=["sync", "async"])
+    parser.add_argument("--workloads", nargs="+", choices=["read", "mixed"], default=["read", "mixed"])
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["tuned"])
+    parser.add_argument("--env", nargs="*", default=[], metavar="NAME=VALUE", help="окружение сервера")
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50, help="одновременных клиентов")
+    parser.add_argument("--requests", type=int, default=60, help="запросов на клиента")
+    args = parser.parse_args()
+
+    template = prepare("load_test.db")
+    from database.database import engine
+    generate_catalog(engine, args.size, args.fanout)
+    engine.dispose()
+
+    overrides = dict(item.split("=", 1) for item in args.env)
+    results = []
+    for workload in args.workloads:
+        for mode in args.modes:
+            for profile in args.profiles:
+                env = {**PROFILES[profile], **overrides}
+                rps, p50, p99, count, errors = measure(template, DRIVERS[mode] + ":///{path}", workload, args, env)
+                errors = ", ".join(f"{status}: {number}" for status, number in errors.items()) or 0
+                results.append([workload, mode, profile, count, errors, f"{rps:.0f}", f"{p50:.0f}", f"{p99:.0f}"])
+    remove_database(template)
+
+    print(f"{args.size} parts, {args.concurrency} clients x {args.requests} requests, 1 uvicorn worker")
+    table(["workload", "mode", "profile", "requests", "errors", "req/s", "p50 ms", "p99 ms"], results)
+
+
+if __name__ == "__main__":
+    main()
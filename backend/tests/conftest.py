@@ -0,0 +1,58 @@
+"""
+Общая настройка тестов: модули приложения импортируются из backend/app,
+строка подключения указывает на временную базу SQLite и должна быть задана
+до импорта database.database.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import text
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+
+@pytest.fixture
+def client():
+    """
+    Клиент приложения с пустым каталогом.
+
+    Таблицы каталога очищаются перед каждым тестом, а версия каталога
+    увеличивается, чтобы кэши дерева и экспортов не отдали данные
+    предыдущего теста.
+    """
+    from fastapi.testclient import TestClient
+
+    from database.database import engine
+    from database.models import CatalogVersion, Part, PartChange, PartHistory, PartLink, Snapshot
+    from main import app
+
+    with engine.begin() as conn:
+        for model in (PartLink, Part, PartChange, PartHistory, Snapshot):
+            conn.execute(text(f"DELETE FROM {model.__tablename__}"))
+        conn.execute(text(f"UPDATE {CatalogVersion.__tablename__} SET version = version + 1 WHERE id = 1"))
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    from database.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def add_part(client, name, unit_price=0, quantity=1, parent_id=None):
+    """
+    Создать деталь через POST / и вернуть её id.
+    """
+    response = client.post(
+        "/", json={"name": name, "unit_price": unit_price, "quantity": quantity, "parent_id": parent_id}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
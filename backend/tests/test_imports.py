@@ -0,0 +1,36 @@
+"""
+Тяжёлые библиотеки экспорта и расчёта стоимости не загружаются при запуске
+приложения, а импортируются при первом обращении к соответствующим эндпоинтам.
+
+Время запуска не проверяется: оно зависит от машины и измеряется
+benchmarks/bench_startup.py. Число модулей ограничено с запасом, чтобы
+заметить новую тяжёлую зависимость, загружаемую при импорте.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from conftest import APP_DIR
+
+LAZY_MODULES = ("reportlab", "openpyxl", "numpy")
+# около 600 модулей с ленивыми импортами и около 900 без них
+MAX_STARTUP_MODULES = 750
+
+
+def test_main_does_not_import_heavy_modules():
+    code = (
+        "import sys\n"
+        "import main\n"
+        f"loaded = [name for name in {LAZY_MODULES!r} if name in sys.modules]\n"
+        "assert not loaded, loaded\n"
+        "print(len(sys.modules))\n"
+    )
+    env = {
+        **os.environ,
+        "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(), "imports.db"),
+        "ROLLUP_MODE": "sum",
+    }
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert int(result.stdout.split()[-1]) < MAX_STARTUP_MODULES, result.stdout
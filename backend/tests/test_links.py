@@ -0,0 +1,88 @@
+"""
+Общие узлы (part_links): запрет циклов, поиск сборок, использующих деталь,
+учёт количества по ссылке в расчёте стоимости и чтение закрытых ссылок
+в снимках каталога.
+"""
+import pytest
+
+from conftest import add_part
+
+
+@pytest.fixture
+def catalog(client):
+    """
+    a ── w (1) ── x (5, 3 шт.)
+    b
+    w дополнительно входит в b по ссылке в количестве 2.
+    """
+    ids = {"a": add_part(client, "a"), "b": add_part(client, "b")}
+    ids["w"] = add_part(client, "w", parent_id=ids["a"])
+    ids["x"] = add_part(client, "x", 5, 3, parent_id=ids["w"])
+    response = client.post(f"/{ids['w']}/links", json={"parent_id": ids["b"], "quantity": 2})
+    assert response.status_code == 201, response.text
+    return ids
+
+
+def test_link_creating_cycle_is_rejected(client, catalog):
+    # сборка a содержит w, поэтому a нельзя добавить внутрь w или x
+    for parent in ("w", "x"):
+        response = client.post(f"/{catalog['a']}/links", json={"parent_id": catalog[parent]})
+        assert response.status_code == 400, response.text
+    # цикл через ссылку: b использует w, поэтому b нельзя добавить в x
+    response = client.post(f"/{catalog['b']}/links", json={"parent_id": catalog["x"]})
+    assert response.status_code == 400, response.text
+    response = client.post(f"/{catalog['w']}/links", json={"parent_id": catalog["w"]})
+    assert response.status_code == 400, response.text
+
+
+def test_where_used_lists_primary_and_link_parents(client, catalog):
+    response = client.get(f"/{catalog['w']}/where-used")
+    assert response.status_code == 200, response.text
+    usage = response.json()
+    assert usage["usages"] == [
+        {"id": catalog["a"], "name": "A", "quantity": 1, "shared": False},
+        {"id": catalog["b"], "name": "B", "quantity": 2, "shared": True},
+    ]
+    assert [assembly["id"] for assembly in usage["assemblies"]] == sorted([catalog["a"], catalog["b"]])
+
+    response = client.get(f"/{catalog['x']}/where-used")
+    assert {assembly["id"] for assembly in response.json()["assemblies"]} == {
+        catalog["a"], catalog["b"], catalog["w"]
+    }
+
+
+def test_rollup_counts_linked_quantity(client, catalog):
+    response = client.get(f"/{catalog['b']}/rollup")
+    assert response.status_code == 200, response.text
+    rollup = response.json()
+    # 2 шт. w по ссылке, в каждой 3 шт. x по 5
+    assert rollup["unit_cost"] == 2 * 3 * 5
+    assert rollup["children"] == [
+        {"id": catalog["w"], "name": "W", "quantity": 2, "unit_cost": 15, "total_cost": 30, "components": 3}
+    ]
+
+    roots = {root["id"]: root for root in client.get("/rollup").json()["roots"]}
+    assert roots[catalog["a"]]["unit_cost"] == 15
+    assert roots[catalog["b"]]["unit_cost"] == 30
+
+    # цена x, изменённая в одном месте, меняет стоимость обеих сборок
+    assert client.put(f"/{catalog['x']}", json={"unit_price": 7}).status_code == 200
+    assert client.get(f"/{catalog['b']}/rollup").json()["unit_cost"] == 2 * 3 * 7
+
+
+def test_closed_link_remains_in_earlier_snapshot(client, catalog):
+    snapshot = client.post("/snapshots", json={"name": "with link"}).json()["id"]
+    response = client.delete(f"/{catalog['w']}/links/{catalog['b']}")
+    assert response.status_code == 200, response.text
+
+    current = {root["id"]: root for root in client.get("/").json()}
+    assert current[catalog["b"]]["children"] == []
+
+    response = client.get("/", params={"snapshot": snapshot})
+    assert response.status_code == 200, response.text
+    before = {root["id"]: root for root in response.json()}
+    [shared] = before[catalog["b"]]["children"]
+    assert shared["id"] == catalog["w"]
+    assert shared["shared"] is True
+    assert shared["quantity"] == 2
+    assert [child["id"] for child in shared["children"]] == [catalog["x"]]
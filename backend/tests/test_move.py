@@ -0,0 +1,105 @@
+"""
+Перемещение деталей: запрет циклов (по дереву и по ссылкам общих узлов),
+пересчёт путей всего поддерева и цен прежних и новых предков.
+"""
+from conftest import add_part
+from database.hierarchy import make_path
+from database.models import Part
+
+
+def build_catalog(client):
+    """
+    car ─┬─ engine ─┬─ block ── bolt (2)
+         │          └─ piston (10)
+         └─ body (100)
+    truck ── cabin (50)
+    """
+    ids = {"car": add_part(client, "car"), "truck": add_part(client, "truck")}
+    ids["engine"] = add_part(client, "engine", parent_id=ids["car"])
+    ids["block"] = add_part(client, "block", parent_id=ids["engine"])
+    ids["bolt"] = add_part(client, "bolt", 2, parent_id=ids["block"])
+    ids["piston"] = add_part(client, "piston", 10, parent_id=ids["engine"])
+    ids["body"] = add_part(client, "body", 100, parent_id=ids["car"])
+    ids["cabin"] = add_part(client, "cabin", 50, parent_id=ids["truck"])
+    return ids
+
+
+def prices(db, ids):
+    db.expire_all()
+    return {name: db.get(Part, part_id).unit_price for name, part_id in ids.items()}
+
+
+def test_move_under_own_descendant_is_rejected(client, db):
+    ids = build_catalog(client)
+    before = prices(db, ids)
+
+    for parent in ("engine", "block", "bolt"):
+        response = client.post(f"/{ids['engine']}/move", json={"parent_id": ids[parent]})
+        assert response.status_code == 400, response.text
+
+    assert prices(db, ids) == before
+    assert db.get(Part, ids["engine"]).parent_id == ids["car"]
+
+
+def test_move_under_part_that_links_to_it_is_rejected(client):
+    ids = build_catalog(client)
+    # engine входит в cabin по ссылке, поэтому cabin нельзя перенести внутрь engine
+    response = client.post(f"/{ids['engine']}/links", json={"parent_id": ids["cabin"], "quantity": 1})
+    assert response.status_code == 201, response.text
+
+    response = client.post(f"/{ids['truck']}/move", json={"parent_id": ids["block"]})
+    assert response.status_code == 400, response.text
+    response = client.post(f"/{ids['cabin']}/move", json={"parent_id": ids["piston"]})
+    assert response.status_code == 400, response.text
+
+
+def test_move_rewrites_paths_and_depths_of_subtree(client, db):
+    ids = build_catalog(client)
+
+    response = client.post(f"/{ids['engine']}/move", json={"parent_id": ids["cabin"]})
+    assert response.status_code == 200, response.text
+
+    db.expire_all()
+    parts = {part.id: part for part in db.query(Part)}
+    for part in parts.values():
+        parent = parts.get(part.parent_id)
+        assert part.path == make_path(parent.path if parent else None, part.id)
+        assert part.depth == (parent.depth + 1 if parent else 0)
+    assert parts[ids["bolt"]].path == make_path(
+        make_path(make_path(make_path(make_path(None, ids["truck"]), ids["cabin"]), ids["engine"]), ids["block"]),
+        ids["bolt"],
+    )
+    assert parts[ids["bolt"]].depth == 4
+
+    # перенос в корень
+    response = client.post(f"/{ids['block']}/move", json={"parent_id": None})
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    assert db.get(Part, ids["block"]).path == make_path(None, ids["block"])
+    assert db.get(Part, ids["block"]).depth == 0
+    assert db.get(Part, ids["bolt"]).depth == 1
+
+
+def test_move_updates_old_and_new_ancestor_prices(client, db):
+    ids = build_catalog(client)
+    assert prices(db, ids) == {
+        "car": 112, "truck": 50, "engine": 12, "block": 2, "bolt": 2, "piston": 10, "body": 100, "cabin": 50,
+    }
+
+    response = client.post(f"/{ids['block']}/move", json={"parent_id": ids["cabin"]})
+    assert response.status_code == 200, response.text
+    assert prices(db, ids) == {
+        "car": 110, "truck": 2, "engine": 10, "block": 2, "bolt": 2, "piston": 10, "body": 100, "cabin": 2,
+    }
+
+    # перенос поддерева между ветками одного корня и в корень
+    response = client.post(f"/{ids['engine']}/move", json={"parent_id": ids["body"]})
+    assert response.status_code == 200, response.text
+    assert prices(db, ids)["body"] == 10
+    assert prices(db, ids)["car"] == 10
+
+    response = client.post(f"/{ids['engine']}/move", json={"parent_id": None})
+    assert response.status_code == 200, response.text
+    assert prices(db, ids) == {
+        "car": 0, "truck": 2, "engine": 10, "block": 2, "bolt": 2, "piston": 10, "body": 0, "cabin": 2,
+    }
@@ -0,0 +1,65 @@
+"""
+Ленивая загрузка дерева: страницы GET /?parent_id=&limit= не превышают
+limit, а курсор проходит дочерние детали и затем вхождения общих деталей
+без пропусков и повторов.
+"""
+import pytest
+
+from conftest import add_part
+
+
+def read_pages(client, limit, parent_id=None):
+    pages = []
+    cursor = None
+    while True:
+        params = {"limit": limit}
+        if parent_id is not None:
+            params["parent_id"] = parent_id
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = client.get("/", params=params)
+        assert response.status_code == 200, response.text
+        pages.append([(part["id"], bool(part.get("shared"))) for part in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        assert len(pages) < 100
+
+
+@pytest.fixture
+def assembly(client):
+    """
+    Сборка с пятью дочерними деталями и четырьмя общими деталями по ссылкам.
+    """
+    assembly = add_part(client, "assembly")
+    children = [add_part(client, f"child {index}", 1, parent_id=assembly) for index in range(5)]
+    library = add_part(client, "library")
+    shared = [add_part(client, f"shared {index}", 1, parent_id=library) for index in range(4)]
+    for part_id in shared:
+        response = client.post(f"/{part_id}/links", json={"parent_id": assembly, "quantity": 2})
+        assert response.status_code == 201, response.text
+    return assembly, [(part_id, False) for part_id in children] + [(part_id, True) for part_id in shared]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 5, 6, 8, 9, 10, 100])
+def test_children_pages_include_shared_parts_within_limit(client, assembly, limit):
+    assembly_id, expected = assembly
+
+    pages = read_pages(client, limit, assembly_id)
+
+    assert all(len(page) <= limit for page in pages)
+    assert [item for page in pages for item in page] == expected
+    assert all(pages[:-1]), pages
+
+
+def test_root_pages(client):
+    roots = [add_part(client, f"root {index}") for index in range(7)]
+
+    pages = read_pages(client, 3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [part_id for page in pages for part_id, _ in page] == roots
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/", params={"limit": 2, "cursor": "x1"}).status_code == 422
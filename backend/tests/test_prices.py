@@ -0,0 +1,96 @@
+"""
+Пересчёт цен сборок при записи (utils.update_ancestors_prices и
+rollup.recompute_prices) совпадает с полным пересчётом каталога
+после любой последовательности создания, редактирования, перемещения
+и удаления деталей в обоих режимах ROLLUP_MODE.
+"""
+import random
+from collections import defaultdict
+
+import pytest
+
+import utils
+from conftest import add_part
+from database import crud
+from database.models import Part
+
+
+def reference_prices(db, weighted):
+    """
+    Цены сборок, рассчитанные рекурсивно от цен листовых деталей.
+    """
+    parts = {part.id: part for part in db.query(Part)}
+    children = defaultdict(list)
+    for part in parts.values():
+        children[part.parent_id].append(part)
+
+    def cost(part):
+        if not children[part.id]:
+            return part.unit_price
+        return sum(cost(child) * (child.quantity if weighted else 1) for child in children[part.id])
+
+    return {part_id: cost(part) for part_id, part in parts.items() if children[part_id]}
+
+
+def random_operation(client, db, rng, step):
+    db.expire_all()
+    parts = db.query(Part).all()
+    if len(parts) < 5:
+        operation = "create"
+    else:
+        operation = rng.choice(["create", "create", "price", "quantity", "move", "delete", "delete_subtree", "batch"])
+    part = rng.choice(parts) if parts else None
+    leaves = [leaf for leaf in parts if not leaf.children]
+
+    if operation == "create":
+        parent_id = rng.choice([None, *(candidate.id for candidate in parts)])
+        add_part(client, f"p{step}", rng.randint(1, 20), rng.randint(1, 4), parent_id)
+    elif operation == "price":
+        leaf = rng.choice(leaves)
+        response = client.put(f"/{leaf.id}", json={"unit_price": rng.randint(1, 20)})
+        assert response.status_code == 200, response.text
+    elif operation == "quantity":
+        response = client.put(f"/{part.id}", json={"quantity": rng.randint(1, 4)})
+        assert response.status_code == 200, response.text
+    elif operation == "move":
+        targets = [None, *(target.id for target in parts if not target.path.startswith(part.path))]
+        response = client.post(f"/{part.id}/move", json={"parent_id": rng.choice(targets)})
+        assert response.status_code in (200, 400), response.text
+    elif operation == "delete":
+        response = client.delete(f"/{rng.choice(leaves).id}")
+        assert response.status_code == 200, response.text
+    elif operation == "delete_subtree":
+        response = client.delete(f"/{part.id}", params={"cascade": True})
+        assert response.status_code == 200, response.text
+    else:
+        updates = [
+            {"id": leaf.id, "unit_price": rng.randint(1, 20), "quantity": rng.randint(1, 4)}
+            for leaf in rng.sample(leaves, min(3, len(leaves)))
+        ]
+        response = client.patch("/batch", json=updates)
+        assert response.status_code == 200, response.text
+    return operation
+
+
+@pytest.mark.parametrize("mode", ["sum", "weighted"])
+@pytest.mark.parametrize("seed", range(3))
+def test_write_path_matches_full_recompute(client, db, monkeypatch, mode, seed):
+    monkeypatch.setattr(utils, "ROLLUP_MODE", mode)
+    monkeypatch.setattr(crud, "ROLLUP_MODE", mode)
+    rng = random.Random(seed)
+
+    for step in range(80):
+        operation = random_operation(client, db, rng, step)
+        db.expire_all()
+        stored = {part.id: part.unit_price for part in db.query(Part)}
+        expected = reference_prices(db, weighted=mode == "weighted")
+        mismatched = {
+            part_id: (stored[part_id], price) for part_id, price in expected.items() if stored[part_id] != price
+        }
+        assert not mismatched, (step, operation, mismatched)
+
+    if mode == "weighted":
+        from rollup import recompute_all_prices
+
+        assert recompute_all_prices(db) == []
+        db.rollback()
@@ -0,0 +1,54 @@
+"""
+Снимки каталога: дерево на версию снимка восстанавливается по истории
+деталей (триггеры part_history) после правок, перемещений и удалений,
+а чтение снимка не влияет на текущее дерево.
+"""
+from conftest import add_part
+
+
+def test_snapshot_returns_tree_before_changes(client):
+    car = add_part(client, "car")
+    engine = add_part(client, "engine", parent_id=car)
+    piston = add_part(client, "piston", 10, 4, parent_id=engine)
+    valve = add_part(client, "valve", 5, 8, parent_id=engine)
+    body = add_part(client, "body", 100, parent_id=car)
+    door = add_part(client, "door", 20, 4, parent_id=body)
+    truck = add_part(client, "truck")
+    cabin = add_part(client, "cabin", 50, parent_id=truck)
+
+    before = client.get("/").json()
+    snapshot = client.post("/snapshots", json={"name": "before"}).json()["id"]
+
+    # правка, перемещение поддерева, удаление листа и поддерева, новая деталь
+    assert client.put(f"/{piston}", json={"name": "piston ring", "unit_price": 12, "quantity": 6}).status_code == 200
+    assert client.post(f"/{engine}/move", json={"parent_id": cabin}).status_code == 200
+    assert client.delete(f"/{valve}").status_code == 200
+    assert client.delete(f"/{body}", params={"cascade": True}).status_code == 200
+    add_part(client, "wheel", 30, 4, parent_id=car)
+    # несколько версий подряд: состояние на снимок берётся из первой записи истории
+    assert client.put(f"/{piston}", json={"unit_price": 15}).status_code == 200
+
+    after = client.get("/").json()
+    assert after != before
+
+    response = client.get("/", params={"snapshot": snapshot})
+    assert response.status_code == 200, response.text
+    assert response.json() == before
+    assert client.get("/").json() == after
+
+    # детали, удалённые после снимка, есть только в снимке
+    snapshot_ids = set()
+    stack = list(response.json())
+    while stack:
+        node = stack.pop()
+        snapshot_ids.add(node["id"])
+        stack.extend(node["children"])
+    assert {body, door, valve} <= snapshot_ids
+
+
+def test_snapshot_of_current_version_matches_current_tree(client):
+    car = add_part(client, "car")
+    add_part(client, "engine", 10, 2, parent_id=car)
+    snapshot = client.post("/snapshots", json={}).json()["id"]
+
+    assert client.get("/", params={"snapshot": snapshot}).json() == client.get("/").json()
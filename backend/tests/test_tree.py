@@ -0,0 +1,151 @@
+"""
+Построение и разворачивание дерева деталей без рекурсии: результат совпадает
+с прежними рекурсивными реализациями, а глубокие и широкие деревья
+обрабатываются без RecursionError.
+"""
+import random
+import sys
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from database.crud import build_tree
+from utils import flattern_parts, iter_flat_parts
+
+
+def recursive_build_tree(existing_part, children_index, children_counts=None):
+    """
+    Прежняя рекурсивная реализация crud.build_tree.
+    """
+    children = [
+        recursive_build_tree(child, children_index, children_counts)
+        for child in children_index.get(existing_part.id, [])
+    ]
+    children_count = len(children)
+    if children_counts and existing_part.id in children_counts:
+        children_count = children_counts[existing_part.id]
+    return {
+        "id": existing_part.id,
+        "name": existing_part.name,
+        "unit_price": existing_part.unit_price,
+        "quantity": existing_part.quantity,
+        "parent_id": existing_part.parent_id,
+        "total_price": existing_part.unit_price * existing_part.quantity,
+        "children_count": children_count,
+        "children": children,
+    }
+
+
+def recursive_flattern_parts(parts):
+    """
+    Прежняя рекурсивная реализация utils.flattern_parts.
+    """
+    rows = []
+
+    def traverse(part, prefix=""):
+        rows.append({
+            "Наименование": str(prefix + ". " + part["name"]),
+            "Цена": part["unit_price"],
+            "Количество": part["quantity"],
+            "Стоимость": part["total_price"],
+        })
+        for idx, child in enumerate(part.get("children", []), start=1):
+            traverse(child, prefix=f"{prefix}.{idx}" if prefix else f"{idx}")
+
+    for idx, part in enumerate(parts, start=1):
+        traverse(part, prefix=f"{idx}")
+    return rows
+
+
+def make_rows(parent_ids):
+    """
+    Строки деталей и индекс parent_id → дочерние строки.
+
+    :param parent_ids: Родитель каждой детали (id деталей — 1, 2, ...)
+    :return: (корневые строки, индекс дочерних строк)
+    """
+    children_index = defaultdict(list)
+    roots = []
+    for part_id, parent_id in enumerate(parent_ids, start=1):
+        row = SimpleNamespace(
+            id=part_id,
+            name=f"Деталь {part_id}",
+            unit_price=part_id % 7,
+            quantity=part_id % 3 + 1,
+            parent_id=parent_id,
+        )
+        if parent_id is None:
+            roots.append(row)
+        else:
+            children_index[parent_id].append(row)
+    return roots, children_index
+
+
+def random_parent_ids(rng, size):
+    return [None if part_id == 1 or rng.random() < 0.05 else rng.randint(1, part_id - 1) for part_id in range(1, size + 1)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_build_tree_matches_recursive(seed):
+    rng = random.Random(seed)
+    roots, children_index = make_rows(random_parent_ids(rng, rng.randint(1, 2000)))
+
+    assert [build_tree(root, children_index) for root in roots] == [
+        recursive_build_tree(root, children_index) for root in roots
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_build_tree_keeps_children_counts(seed):
+    rng = random.Random(seed)
+    roots, children_index = make_rows(random_parent_ids(rng, 500))
+    children_counts = {part_id: rng.randint(0, 50) for part_id in rng.sample(range(1, 501), 50)}
+
+    assert [build_tree(root, children_index, children_counts) for root in roots] == [
+        recursive_build_tree(root, children_index, children_counts) for root in roots
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_flat_parts_match_recursive(seed):
+    rng = random.Random(seed)
+    roots, children_index = make_rows(random_parent_ids(rng, rng.randint(1, 2000)))
+    tree = [recursive_build_tree(root, children_index) for root in roots]
+
+    expected = recursive_flattern_parts(tree)
+    assert flattern_parts(tree) == expected
+    assert list(iter_flat_parts(tree)) == expected
+
+
+def test_deep_chain():
+    depth = 10000
+    assert depth > sys.getrecursionlimit()
+    roots, children_index = make_rows([None] + list(range(1, depth)))
+
+    tree = build_tree(roots[0], children_index)
+    node, levels = tree, 1
+    while node["children"]:
+        assert len(node["children"]) == 1 and node["children_count"] == 1
+        node = node["children"][0]
+        levels += 1
+    assert levels == depth and node["id"] == depth
+
+    rows = flattern_parts([tree])
+    assert len(rows) == depth
+    assert rows[0]["Наименование"] == "1. Деталь 1"
+    assert rows[-1]["Наименование"] == ".".join(["1"] * depth) + f". Деталь {depth}"
+
+
+def test_wide_level():
+    width = 100000
+    roots, children_index = make_rows([None] + [1] * width)
+
+    tree = build_tree(roots[0], children_index)
+    assert tree["children_count"] == width
+    assert [child["id"] for child in tree["children"]] == list(range(2, width + 2))
+
+    rows = list(iter_flat_parts([tree]))
+    assert len(rows) == width + 1
+    assert rows[-1]["Наименование"] == f"1.{width}. Деталь {width + 1}"
+    assert rows == recursive_flattern_parts([tree])
@@ -1,7 +1,8 @@
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
 import PartsList from './components/PartsList';
 import AddPartForm from './components/AddPartForm';
 import ExportButtons from './components/ExportButtons';
+import { applyChanges, hasSharedParts, type PartChanges } from './applyChanges';
 
 export interface Part {
   id: number;
@@ -10,38 +11,48 @@ export interface Part {
   quantity: number;
   total_price: number;
   parent_id: number | null;
+  // вхождение общей детали под ссылающейся на неё сборкой
+  shared?: boolean;
   children: Part[];
 }
 
 const App: React.FC = () => {
   const [parts, setParts] = useState<Part[]>([]);
 
-  useEffect(() => {
-    const fetchParts = async () => {
-      try {
-        const response = await fetch('http://localhost:8000', {
-          method: 'GET',
-          mode: 'cors',
-        });
-        if (!response.ok) {
-          throw new Error(`Ошибка загрузки деталей: ${response.statusText}`);
-        }
-        const data: Part[] = await response.json();
-        setParts(data);
-      } catch (error) {
-        console.error('Fetch parts error:', error);
-        alert('Не удалось загрузить данные деталей');
+  const fetchParts = useCallback(async () => {
+    try {
+      const response = await fetch('http://localhost:8000', {
+        method: 'GET',
+        mode: 'cors',
+      });
+      if (!response.ok) {
+        throw new Error(`Ошибка загрузки деталей: ${response.statusText}`);
       }
-    };
+      const data: Part[] = await response.json();
+      setParts(data);
+    } catch (error) {
+      console.error('Fetch parts error:', error);
+      alert('Не удалось загрузить данные деталей');
+    }
+  }, []);
 
+  useEffect(() => {
     fetchParts();
-  }, []);
+  }, [fetchParts]);
+
+  const handleChanges = (changes: PartChanges) => {
+    if (hasSharedParts(parts)) {
+      fetchParts();
+      return;
+    }
+    setParts(prevParts => applyChanges(prevParts, changes));
+  };
 
   return (
     <div className="pt-10 px-20">
       <h1 className="text-2xl text-center font-bold mb-16">Информация о деталях</h1>
-      <AddPartForm setParts={setParts} />
-      <PartsList parts={parts} setParts={setParts} />
+      <AddPartForm onChanges={handleChanges} />
+      <PartsList parts={parts} onChanges={handleChanges} />
       <ExportButtons />
     </div>
   );
@@ -0,0 +1,49 @@
+import type { Part } from './App';
+
+export interface PartChanges {
+  version: number;
+  updated: Part[];
+  deleted: number[];
+}
+
+// Применяет изменения, возвращённые сервером после записи, к локальному дереву,
+// чтобы не загружать всё дерево заново после каждой операции.
+// Подходит только для дерева без общих деталей (см. hasSharedParts).
+export const applyChanges = (parts: Part[], changes: PartChanges): Part[] => {
+  const nodes = new Map<number, Part>();
+  const collect = (list: Part[]) => {
+    list.forEach(part => {
+      nodes.set(part.id, { ...part, children: [] });
+      collect(part.children);
+    });
+  };
+  collect(parts);
+
+  changes.deleted.forEach(id => nodes.delete(id));
+  changes.updated.forEach(part => nodes.set(part.id, { ...part, children: [] }));
+
+  const roots: Part[] = [];
+  [...nodes.values()]
+    .sort((a, b) => a.id - b.id)
+    .forEach(part => {
+      const parent = part.parent_id !== null ? nodes.get(part.parent_id) : undefined;
+      (parent ? parent.children : roots).push(part);
+    });
+  return roots;
+};
+
+// Общая деталь входит в дерево несколько раз: на своём месте и под каждой
+// сборкой, которая на неё ссылается, вместе со всем поддеревом. Изменения
+// содержат только основное вхождение детали, поэтому, пока в дереве есть
+// общие детали, после записи дерево загружается заново.
+export const hasSharedParts = (parts: Part[]): boolean => {
+  const stack = [...parts];
+  while (stack.length) {
+    const part = stack.pop()!;
+    if (part.shared) {
+      return true;
+    }
+    stack.push(...part.children);
+  }
+  return false;
+};
@@ -1,20 +1,11 @@
 import React, { useState } from 'react';
-
-interface Part {
-  id: number;
-  name: string;
-  unit_price: number;
-  quantity: number;
-  parent_id: number | null;
-  total_price: number;
-  children: Part[];
-}
+import type { PartChanges } from '../applyChanges';
 
 interface AddPartFormProps {
-  setParts: React.Dispatch<React.SetStateAction<Part[]>>;
+  onChanges: (changes: PartChanges) => void;
 }
 
-const AddPartForm: React.FC<AddPartFormProps> = ({ setParts }) => {
+const AddPartForm: React.FC<AddPartFormProps> = ({ onChanges }) => {
   const [partName, setPartName] = useState('');
   const [unitPrice, setUnitPrice] = useState('');
   const [quantity, setQuantity] = useState('');
@@ -48,7 +39,7 @@ const AddPartForm: React.FC<AddPartFormProps> = ({ setParts }) => {
     }
 
     const data = await response.json();
-    setParts(prevParts => [...prevParts, data]);
+    onChanges(data.changes);
   };
 
   return (
@@ -1,4 +1,5 @@
 import React, { useState } from 'react'
+import type { PartChanges } from '../applyChanges';
 
 
 
@@ -9,16 +10,17 @@ interface Part {
   quantity: number;
   total_price: number;
   parent_id: number | null;
+  shared?: boolean;
   children: Part[];
 }
 
 interface PartItemProps {
   part: Part;
-  setParts: React.Dispatch<React.SetStateAction<Part[]>>;
+  onChanges: (changes: PartChanges) => void;
   prefix: string;
 }
 
-const PartItem: React.FC<PartItemProps> = ({ part, setParts, prefix }) => {
+const PartItem: React.FC<PartItemProps> = ({ part, onChanges, prefix }) => {
   const [isAdding, setIsAdding] = useState(false);
   const [newPart, setNewPart] = useState({
     name: '',
@@ -52,8 +54,8 @@ const PartItem: React.FC<PartItemProps> = ({ part, setParts, prefix }) => {
     });
 
     if (response.ok) {
-      const updatedParts = await fetch('http://localhost:8000/').then(res => res.json());
-      setParts(updatedParts);
+      const data = await response.json();
+      onChanges(data.changes);
       setIsAdding(false);
       setNewPart({ name: '', unit_price: '', quantity: '' });
     } else {
@@ -82,8 +84,8 @@ const PartItem: React.FC<PartItemProps> = ({ part, setParts, prefix }) => {
     });
   
     if (response.ok) {
-      const updatedParts = await fetch('http://localhost:8000/').then(res => res.json());
-      setParts(updatedParts);
+      const data = await response.json();
+      onChanges(data.changes);
       setIsEditing(false);
     } else {
       const err = await response.json();
@@ -100,8 +102,8 @@ const PartItem: React.FC<PartItemProps> = ({ part, setParts, prefix }) => {
     });
 
     if (response.ok) {
-      const updatedParts = await fetch('http://localhost:8000/').then(res => res.json());
-      setParts(updatedParts);
+      const changes = await response.json();
+      onChanges(changes);
     } else {
       const err = await response.json();
       alert(err.detail || 'Ошибка при удалении детали');
@@ -121,16 +123,22 @@ const PartItem: React.FC<PartItemProps> = ({ part, setParts, prefix }) => {
             className="px-3 py-1 bg-blue-500 text-white rounded">
               Добавить
           </button>
-          <button 
-            onClick={() => setIsEditing(true)}
-            className="px-3 py-1 bg-amber-400 text-white rounded">
-              Редактировать
-          </button>
-          <button 
-            onClick={handleDelete}
-            className="px-3 py-1 bg-rose-700 text-white rounded">
-              Удалить
-          </button>
+          {/* вхождение общей детали: parent_id указывает на ссылающуюся сборку,
+              поэтому деталь редактируется и удаляется на своём основном месте */}
+          {!part.shared && (
+            <>
+              <button 
+                onClick={() => setIsEditing(true)}
+                className="px-3 py-1 bg-amber-400 text-white rounded">
+                  Редактировать
+              </button>
+              <button 
+                onClick={handleDelete}
+                className="px-3 py-1 bg-rose-700 text-white rounded">
+                  Удалить
+              </button>
+            </>
+          )}
         </div>
       </div>
 
@@ -225,9 +233,9 @@ const PartItem: React.FC<PartItemProps> = ({ part, setParts, prefix }) => {
         <div>
           {part.children.map((child, index) => (
             <PartItem 
-              key={child.id} 
+              key={child.shared ? `shared-${child.id}` : child.id} 
               part={child} 
-              setParts={setParts} 
+              onChanges={onChanges} 
               prefix={`${prefix}.${index + 1}`} 
             />
           ))}
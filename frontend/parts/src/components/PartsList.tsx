@@ -1,6 +1,7 @@
 import React from 'react';
 import PartItem from './PartItem';
 import TableHeader from './TableHeader';
+import type { PartChanges } from '../applyChanges';
 
 interface Part {
   id: number;
@@ -9,20 +10,21 @@ interface Part {
   quantity: number;
   total_price: number;
   parent_id: number | null;
+  shared?: boolean;
   children: Part[];
 }
 
 interface PartsListProps {
   parts: Part[];
-  setParts: React.Dispatch<React.SetStateAction<Part[]>>;
+  onChanges: (changes: PartChanges) => void;
 }
 
-const PartsList: React.FC<PartsListProps> = ({ parts, setParts }) => {
+const PartsList: React.FC<PartsListProps> = ({ parts, onChanges }) => {
   return (
     <div>
       <TableHeader />
       {parts.map((part, index) => (
-        <PartItem key={part.id} part={part} setParts={setParts} prefix={`${index + 1}`} />
+        <PartItem key={part.shared ? `shared-${part.id}` : part.id} part={part} onChanges={onChanges} prefix={`${index + 1}`} />
       ))}
     </div>
   );